@@ -0,0 +1,6 @@
+"""Benchmarks for schemaperfect
+
+The benchmarks follow the conventions of airspeed velocity (asv), and can be
+run either with ``asv run`` from the repository root or, without asv, with
+``python -m benchmarks.run``.
+"""
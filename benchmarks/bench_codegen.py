@@ -0,0 +1,39 @@
+"""Benchmarks of code generation and of importing generated modules"""
+import importlib
+import shutil
+import sys
+import tempfile
+
+from schemaperfect import SchemaModuleGenerator
+
+from .schemas import SCHEMAS, write_module
+
+
+class ModuleCode:
+    params = list(SCHEMAS)
+    param_names = ['schema']
+
+    def setup(self, name):
+        self.schema, _ = SCHEMAS[name]()
+
+    def time_module_code(self, name):
+        SchemaModuleGenerator(self.schema).module_code()
+
+
+class ModuleImport:
+    params = list(SCHEMAS)
+    param_names = ['schema']
+
+    def setup(self, name):
+        self.directory = tempfile.mkdtemp()
+        self.modulename = write_module(name, self.directory)
+        sys.path.insert(0, self.directory)
+
+    def teardown(self, name):
+        sys.path.remove(self.directory)
+        sys.modules.pop(self.modulename, None)
+        shutil.rmtree(self.directory)
+
+    def time_import(self, name):
+        sys.modules.pop(self.modulename, None)
+        importlib.import_module(self.modulename)
@@ -0,0 +1,70 @@
+"""Benchmarks of SchemaBase operations on generated classes"""
+from schemaperfect.schemaperfect import set_valid_at_instantiation
+
+from .schemas import SCHEMAS, import_module, numeric_ndarray
+
+
+class Runtime:
+    params = list(SCHEMAS)
+    param_names = ['schema']
+
+    def setup(self, name):
+        module, self.instance = import_module(name)
+        self.Root = module.Root
+        set_valid_at_instantiation(False)
+        self.obj = self.Root.from_dict(self.instance)
+        self.json = self.obj.to_json()
+
+    def teardown(self, name):
+        set_valid_at_instantiation(True)
+
+    def time_instantiate(self, name):
+        self.Root(**self.instance)
+
+    def time_instantiate_validated(self, name):
+        set_valid_at_instantiation(True)
+        try:
+            self.Root(**self.instance)
+        finally:
+            set_valid_at_instantiation(False)
+
+    def time_to_dict(self, name):
+        self.obj.to_dict()
+
+    def time_to_json(self, name):
+        self.obj.to_json()
+
+    def time_from_dict(self, name):
+        self.Root.from_dict(self.instance)
+
+    def time_from_json(self, name):
+        self.Root.from_json(self.json)
+
+    def time_copy(self, name):
+        self.obj.copy()
+
+
+class NumericArrays:
+    """Objects holding the numbers of numeric_array as a list or a numpy array"""
+    params = ['list', 'ndarray']
+    param_names = ['values']
+
+    def setup(self, values):
+        module, instance = import_module('numeric_array')
+        if values == 'ndarray':
+            try:
+                _, instance = numeric_ndarray()
+            except ImportError:
+                raise NotImplementedError("numpy is not installed")
+        self.Root = module.Root
+        self.instance = instance
+        self.obj = self.Root(**instance)
+
+    def time_instantiate_validated(self, values):
+        self.Root(**self.instance)
+
+    def time_to_dict(self, values):
+        self.obj.to_dict()
+
+    def time_to_json(self, values):
+        self.obj.to_json()
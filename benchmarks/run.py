@@ -0,0 +1,120 @@
+"""Run the benchmarks without asv and store the results as JSON
+
+Usage::
+
+    python -m benchmarks.run [-o results.json] [-k PATTERN] [--compare OLD.json]
+
+Each benchmark is timed with ``timeit``; the best of several repeats is
+reported, in seconds per call. With ``--compare``, the ratio of each time to
+the one stored in an earlier results file is printed, so that regressions
+between runs or releases stand out.
+"""
+import argparse
+import datetime
+import importlib
+import inspect
+import json
+import pkgutil
+import platform
+import re
+import sys
+import timeit
+
+import schemaperfect
+
+
+def _benchmark_classes():
+    package = importlib.import_module(__package__)
+    for info in pkgutil.iter_modules(package.__path__):
+        if not info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module('{}.{}'.format(__package__, info.name))
+        for name, cls in sorted(inspect.getmembers(module, inspect.isclass)):
+            if cls.__module__ == module.__name__:
+                yield '{}.{}'.format(info.name, name), cls
+
+
+def _time(func, repeat, min_time):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'best': min(times), 'median': sorted(times)[len(times) // 2],
+            'number': number, 'repeat': repeat}
+
+
+def run(pattern=None, repeat=5, min_time=0.2, stream=None):
+    """Run the benchmarks whose names match the regular expression pattern
+
+    Returns
+    -------
+    results : dict
+        Maps benchmark names, such as
+        ``"bench_runtime.Runtime.time_to_dict(wide_object)"``, to their
+        timings.
+    """
+    results = {}
+    for class_name, cls in _benchmark_classes():
+        methods = sorted(name for name in dir(cls) if name.startswith('time_'))
+        for param in getattr(cls, 'params', [None]):
+            args = () if param is None else (param,)
+            names = ['{}.{}{}'.format(class_name, method, '({})'.format(param) if args else '')
+                     for method in methods]
+            names = [(method, name) for method, name in zip(methods, names)
+                     if pattern is None or re.search(pattern, name)]
+            if not names:
+                continue
+            for method, name in names:
+                bench = cls()
+                if hasattr(bench, 'setup'):
+                    try:
+                        bench.setup(*args)
+                    except NotImplementedError:
+                        # skipped, as by asv
+                        continue
+                try:
+                    func = getattr(bench, method)
+                    results[name] = _time(lambda: func(*args), repeat, min_time)
+                finally:
+                    if hasattr(bench, 'teardown'):
+                        bench.teardown(*args)
+                if stream is not None:
+                    stream.write('{:<70} {:.6g}s\n'.format(name, results[name]['best']))
+                    stream.flush()
+    return results
+
+
+def compare(results, previous, stream):
+    """Write the ratio of each time to its time in previous results"""
+    for name, timing in sorted(results.items()):
+        if name in previous:
+            ratio = timing['best'] / previous[name]['best']
+            flag = '  SLOWER' if ratio > 1.1 else '  faster' if ratio < 0.9 else ''
+            stream.write('{:<70} {:6.2f}x{}\n'.format(name, ratio, flag))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', help="file to write the results to, as JSON")
+    parser.add_argument('-k', '--pattern', help="only run benchmarks matching this regular expression")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="approximate duration of each repeat, in seconds")
+    parser.add_argument('--compare', help="results file of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.repeat, args.min_time, stream=sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'schemaperfect': schemaperfect.__version__,
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'date': datetime.datetime.now().isoformat(),
+                       'results': results}, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'], sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
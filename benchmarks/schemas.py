@@ -0,0 +1,143 @@
+"""Synthetic schemas stressing the code generator and the runtime
+
+Each builder returns a pair ``(schema, instance)`` of a root schema and an
+instance valid against it.
+"""
+import importlib
+import os
+import sys
+import tempfile
+
+from schemaperfect import SchemaModuleGenerator
+
+
+def wide_object(n=300):
+    """An object with n properties of assorted types"""
+    types = [({'type': 'integer'}, 42),
+             ({'type': 'string'}, 'value'),
+             ({'type': 'number'}, 3.5),
+             ({'type': 'boolean'}, True),
+             ({'type': 'array', 'items': {'type': 'string'}}, ['a', 'b', 'c'])]
+    properties, instance = {}, {}
+    for i in range(n):
+        schema, value = types[i % len(types)]
+        properties['p{}'.format(i)] = schema
+        instance['p{}'.format(i)] = value
+    return {'type': 'object', 'properties': properties}, instance
+
+
+def deep_nesting(depth=30):
+    """A chain of depth definitions, each holding the next"""
+    definitions = {}
+    for i in range(depth):
+        properties = {'value': {'type': 'integer'}}
+        if i + 1 < depth:
+            properties['child'] = {'$ref': '#/definitions/Level{}'.format(i + 1)}
+        definitions['Level{}'.format(i)] = {'type': 'object', 'properties': properties}
+    instance = {'value': depth - 1}
+    for i in reversed(range(depth - 1)):
+        instance = {'value': i, 'child': instance}
+    schema = {'definitions': definitions,
+              'type': 'object',
+              'properties': {'root': {'$ref': '#/definitions/Level0'}}}
+    return schema, {'root': instance}
+
+
+def many_definitions(n=2000):
+    """n small definitions, each referring to the previous one"""
+    definitions = {}
+    for i in range(n):
+        properties = {'name': {'type': 'string'}, 'size': {'type': 'number'}}
+        if i:
+            properties['previous'] = {'$ref': '#/definitions/Def{}'.format(i - 1)}
+        definitions['Def{}'.format(i)] = {'type': 'object', 'properties': properties}
+    schema = {'definitions': definitions,
+              'type': 'object',
+              'properties': {'first': {'$ref': '#/definitions/Def0'},
+                             'last': {'$ref': '#/definitions/Def{}'.format(n - 1)}}}
+    instance = {'first': {'name': 'first', 'size': 1},
+                'last': {'name': 'last', 'size': 2, 'previous': {'name': 'previous', 'size': 3}}}
+    return schema, instance
+
+
+def anyof_fanout(n=100, length=100):
+    """An array of items matching one of n object variants, mostly the last ones"""
+    definitions = {
+        'Variant{}'.format(i): {'type': 'object',
+                                'properties': {'kind': {'enum': ['v{}'.format(i)]},
+                                               'value': {'type': 'number'}},
+                                'required': ['kind'],
+                                'additionalProperties': False}
+        for i in range(n)}
+    schema = {'definitions': definitions,
+              'type': 'object',
+              'properties': {'items': {'type': 'array',
+                                       'items': {'anyOf': [{'$ref': '#/definitions/' + name}
+                                                           for name in definitions]}}}}
+    instance = {'items': [{'kind': 'v{}'.format(n - 1 - i % 10), 'value': i} for i in range(length)]}
+    return schema, instance
+
+
+def large_enum(n=10000, length=1000):
+    """An array of values of an enum with n members"""
+    schema = {'definitions': {'Color': {'type': 'string',
+                                        'enum': ['color{}'.format(i) for i in range(n)]}},
+              'type': 'object',
+              'properties': {'colors': {'type': 'array',
+                                        'items': {'$ref': '#/definitions/Color'}}}}
+    instance = {'colors': ['color{}'.format(n - 1 - i) for i in range(length)]}
+    return schema, instance
+
+
+def numeric_array(n=20000):
+    """An array of n numbers"""
+    schema = {'type': 'object',
+              'properties': {'values': {'type': 'array', 'items': {'type': 'number'}}}}
+    return schema, {'values': [i * 0.5 for i in range(n)]}
+
+
+def numeric_ndarray(n=20000):
+    """The numeric_array schema, with the n numbers given as a numpy array
+
+    Objects holding the array are validated with vectorized numpy operations;
+    the instance cannot be given to from_dict or validate, which only accept
+    JSON-like values.
+    """
+    import numpy as np
+    schema, _ = numeric_array(n)
+    return schema, {'values': np.arange(n) * 0.5}
+
+
+SCHEMAS = {
+    'wide_object': wide_object,
+    'deep_nesting': deep_nesting,
+    'many_definitions': many_definitions,
+    'anyof_fanout': anyof_fanout,
+    'large_enum': large_enum,
+    'numeric_array': numeric_array,
+}
+
+
+def write_module(name, directory):
+    """Write the generated module for the schema name to directory
+
+    Returns the name of the module, importable once directory is on sys.path.
+    """
+    schema, _ = SCHEMAS[name]()
+    modulename = 'schemaperfect_bench_{}'.format(name)
+    SchemaModuleGenerator(schema).write_module(os.path.join(directory, modulename + '.py'))
+    return modulename
+
+
+def import_module(name):
+    """Generate and import the module for the schema name; return (module, instance)"""
+    modulename = 'schemaperfect_bench_{}'.format(name)
+    if modulename not in sys.modules:
+        directory = tempfile.mkdtemp()
+        write_module(name, directory)
+        sys.path.insert(0, directory)
+        try:
+            importlib.import_module(modulename)
+        finally:
+            sys.path.remove(directory)
+    return sys.modules[modulename], SCHEMAS[name]()[1]
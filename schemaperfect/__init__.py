@@ -1,10 +1,13 @@
 """
 schemaperfect: tools for generating Python APIs from JSON schemas
 """
-from .schemaperfect import SchemaBase, Undefined, SchemaValidationError
+from .schemaperfect import (SchemaBase, Undefined, SchemaValidationError, register_converter, InputLimits,
+                           InputLimitError)
 from .decorator import schemaclass
 from .utils import SchemaInfo
 from .codegen import SchemaModuleGenerator
+from .bundler import bundle_schema
+from .profiling import profile
 from .version import version as __version__
 
 
@@ -14,5 +17,10 @@ __all__ = (
     "schemaclass",
     "SchemaInfo",
     "SchemaModuleGenerator",
-    "SchemaValidationError"
+    "SchemaValidationError",
+    "register_converter",
+    "profile",
+    "InputLimits",
+    "InputLimitError",
+    "bundle_schema"
 )
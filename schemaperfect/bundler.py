@@ -0,0 +1,284 @@
+"""Bundling of schemas split across local files
+
+``bundle_schema`` loads a schema whose ``$ref`` point into other files of
+its directory, and returns a single schema in which the referenced
+subschemas are copied into ``definitions``, so that every reference is
+local. The result can be given to ``SchemaModuleGenerator`` or used for
+validation without resolving references across files:
+
+>>> from schemaperfect.bundler import bundle_schema
+>>> schema = bundle_schema('schemas/main.json')  # doctest: +SKIP
+
+References are resolved against the ``$id`` (or ``id``) of the file
+containing them if it has one, and against the file's location otherwise.
+Files are found by location or by their ``$id``; references which resolve
+to neither a file of the directory nor a known ``$id`` are errors, so that
+nothing is ever fetched over the network. ``$id`` within subschemas and
+plain-name fragments (``#foo``) are not supported.
+"""
+import collections
+import copy
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import re
+import urllib.parse
+import urllib.request
+
+# bump when the bundled output changes, to invalidate cached bundles
+BUNDLE_FORMAT = 1
+
+
+def _pointer_parts(pointer):
+    """Return the unescaped parts of a JSON pointer"""
+    if not pointer:
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError("Unsupported reference fragment {!r}: only JSON pointers are supported".format(pointer))
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _resolve_pointer(document, pointer):
+    node = document
+    for part in _pointer_parts(pointer):
+        if isinstance(node, list):
+            part = int(part)
+        try:
+            node = node[part]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError("Unresolvable JSON pointer {!r}".format(pointer))
+    return node
+
+
+class SchemaBundler(object):
+    """Bundler of the schema files of a directory
+
+    Parameters
+    ----------
+    directory : string or Path
+        The directory holding the schema files (``*.json``, searched
+        recursively). References may only resolve to files within it.
+    cache_dir : string or Path (optional)
+        A directory in which bundled schemas are cached, keyed by the
+        contents of every schema file of the directory, so that a bundle is
+        reused as long as none of the files change.
+    """
+    def __init__(self, directory, cache_dir=None):
+        self.directory = os.path.abspath(os.fspath(directory))
+        self.cache_dir = os.fspath(cache_dir) if cache_dir is not None else None
+        self._files = None
+
+    def _schema_files(self):
+        """Return the contents of the schema files of the directory, by absolute path"""
+        if self._files is None:
+            files = {}
+            for dirpath, dirnames, filenames in os.walk(self.directory):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith('.json'):
+                        path = os.path.join(dirpath, filename)
+                        with open(path, 'rb') as f:
+                            files[path] = f.read()
+            self._files = files
+        return self._files
+
+    def bundle(self, path):
+        """Return the schema of the file path, with all references made local
+
+        Parameters
+        ----------
+        path : string or Path
+            The root schema file, within the directory.
+
+        Returns
+        -------
+        schema : dict
+            A new schema, in which each subschema referenced from another
+            file is added to ``definitions``, under the name of the
+            definition it comes from if that name is free.
+        """
+        path = self._local_path(os.path.abspath(os.fspath(path)))
+        key = None
+        if self.cache_dir is not None:
+            key = self._cache_key(path)
+            schema = self._cache_read(key)
+            if schema is not None:
+                return schema
+        schema = _Bundle(self, path).schema
+        if key is not None:
+            self._cache_write(key, schema)
+        return schema
+
+    def _local_path(self, path):
+        if os.path.commonpath([self.directory, path]) != self.directory:
+            raise ValueError("{} is outside the schema directory {}".format(path, self.directory))
+        return path
+
+    def _cache_key(self, path):
+        from .version import version
+        digests = [(os.path.relpath(filename, self.directory), hashlib.sha256(data).hexdigest())
+                   for filename, data in self._schema_files().items()]
+        text = json.dumps([BUNDLE_FORMAT, version, os.path.relpath(path, self.directory), digests])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, 'bundles', key + '.json')
+
+    def _cache_read(self, key):
+        try:
+            with open(self._cache_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_write(self, key, schema):
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(schema, f)
+        os.replace(tmp_path, path)
+
+
+class _Bundle(object):
+    """The bundling of one root schema file"""
+    def __init__(self, bundler, root_path):
+        self.bundler = bundler
+        self.root_path = root_path
+        self._documents = {}
+        self._ids = None
+        # maps (path, pointer) to the name of the definition of that subschema
+        self._names = {}
+        self._pending = collections.deque()
+
+        root = self._document(root_path)
+        if not isinstance(root, dict):
+            raise ValueError("The root schema must be an object")
+        self._taken = set(root.get('definitions', {}))
+        schema = self._rewrite(root, root_path)
+        definitions = {}
+        while self._pending:
+            path, pointer = self._pending.popleft()
+            definitions[self._names[path, pointer]] = self._rewrite(
+                _resolve_pointer(self._document(path), pointer), path)
+        if definitions:
+            schema['definitions'] = dict(schema.get('definitions', {}), **definitions)
+        self.schema = schema
+
+    def _document(self, path):
+        document = self._documents.get(path)
+        if document is None:
+            data = self.bundler._schema_files().get(path)
+            if data is None:
+                raise ValueError("Schema file {} not found".format(path))
+            document = self._documents[path] = json.loads(data.decode('utf-8'))
+        return document
+
+    def _id_index(self):
+        """Return the paths of the schema files of the directory, by $id"""
+        if self._ids is None:
+            self._ids = {}
+            for path in self.bundler._schema_files():
+                id_ = self._document_id(self._document(path))
+                if id_:
+                    self._ids.setdefault(urllib.parse.urldefrag(id_)[0], path)
+        return self._ids
+
+    @staticmethod
+    def _document_id(document):
+        if isinstance(document, dict):
+            id_ = document.get('$id', document.get('id'))
+            if isinstance(id_, str):
+                return id_
+        return None
+
+    def _base_uri(self, path):
+        id_ = self._document_id(self._document(path))
+        if id_ and urllib.parse.urlparse(id_).scheme:
+            return id_
+        return pathlib.Path(path).as_uri()
+
+    def _target(self, ref, path):
+        """Return the file and JSON pointer a reference within the file path points to"""
+        base = self._base_uri(path)
+        url, fragment = urllib.parse.urldefrag(urllib.parse.urljoin(base, ref))
+        fragment = urllib.parse.unquote(fragment)
+        if url == urllib.parse.urldefrag(base)[0]:
+            return path, fragment
+        target = self._id_index().get(url)
+        if target is None:
+            parsed = urllib.parse.urlparse(url)
+            if parsed.scheme != 'file':
+                raise ValueError("Reference {!r} in {} does not resolve to a local schema file "
+                                 "(remote references are not fetched)".format(ref, path))
+            target = self.bundler._local_path(os.path.abspath(urllib.request.url2pathname(parsed.path)))
+        return target, fragment
+
+    def _local_ref(self, path, pointer):
+        """Return the reference within the bundle to the subschema at pointer in the file path"""
+        if path == self.root_path:
+            return '#' + pointer
+        key = (path, pointer)
+        name = self._names.get(key)
+        if name is None:
+            name = self._names[key] = self._definition_name(path, pointer)
+            self._pending.append(key)
+        return '#/definitions/' + name
+
+    def _definition_name(self, path, pointer):
+        parts = _pointer_parts(pointer)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if len(parts) == 2 and parts[0] == 'definitions':
+            candidates = [parts[1], '{}_{}'.format(stem, parts[1])]
+        else:
+            candidates = ['_'.join([stem] + parts)]
+        candidates = [re.sub(r'[^0-9a-zA-Z_]', '_', name) for name in candidates]
+        numbered = ('{}_{}'.format(candidates[-1], i) for i in itertools.count(2))
+        for name in itertools.chain(candidates, numbered):
+            if name not in self._taken:
+                self._taken.add(name)
+                return name
+
+    def _rewrite(self, schema, path):
+        """Return a copy of schema with its references rewritten to local ones"""
+        schema = copy.deepcopy(schema)
+        stack = [schema]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                ref = node.get('$ref')
+                if isinstance(ref, str):
+                    node['$ref'] = self._local_ref(*self._target(ref, path))
+                # reversed, so that definitions are added in document order
+                stack.extend(reversed(list(node.values())))
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+        if path != self.root_path and isinstance(schema, dict):
+            # the identifiers of other files would change the base URI of
+            # the references within the bundle
+            schema.pop('$id', None)
+            schema.pop('id', None)
+        return schema
+
+
+def bundle_schema(path, directory=None, cache_dir=None):
+    """Return the schema of the file path, with references to other files made local
+
+    Parameters
+    ----------
+    path : string or Path
+        The root schema file.
+    directory : string or Path (optional)
+        The directory of the schema files; by default that of path.
+    cache_dir : string or Path (optional)
+        A directory in which to cache the bundled schema; see SchemaBundler.
+
+    Returns
+    -------
+    schema : dict
+    """
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(os.fspath(path)))
+    return SchemaBundler(directory, cache_dir=cache_dir).bundle(path)
@@ -0,0 +1,199 @@
+"""Command-line interface
+
+``schemaperfect generate`` writes the module (or package) of each of the
+given schema files, optionally in parallel, and prints the time spent in
+each phase of the generation of each schema::
+
+    $ schemaperfect generate schemas/*.json -o myapi --jobs 4
+
+Run ``schemaperfect generate --help`` for the list of options.
+"""
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import jsonschema
+
+from .bundler import bundle_schema
+from .codegen import PHASES, SchemaModuleGenerator
+from .schemaperfect import get_metaschema_version, set_metaschema_version
+from .utils import get_metaschema_validator, get_valid_identifier
+
+
+def _module_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return get_valid_identifier(stem.replace('-', '_').replace('.', '_'))
+
+
+def _load_schema(path, bundle):
+    if bundle:
+        return bundle_schema(path)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_file(path, output_dir, root_name='Root', package=False, bundle=False, cache_dir=None,
+                  dedupe=False, sidecar=None, sidecar_docs=False):
+    """Generate the module or package of the schema file path
+
+    Returns
+    -------
+    output : string
+        The path of the written module or package.
+    timings : dict
+        The seconds spent in each phase: 'loading' and the ``PHASES`` of
+        ``SchemaModuleGenerator``.
+    """
+    timings = {}
+    start = time.perf_counter()
+    schema = _load_schema(path, bundle)
+    timings['loading'] = time.perf_counter() - start
+    gen = SchemaModuleGenerator(schema, root_name=root_name, cache_dir=cache_dir, dedupe=dedupe)
+    name = _module_name(path)
+    if package:
+        output = gen.write_package(os.path.join(output_dir, name), sidecar=sidecar, sidecar_docs=sidecar_docs)
+    else:
+        output = gen.write_module(os.path.join(output_dir, name + '.py'), sidecar=sidecar,
+                                  sidecar_docs=sidecar_docs)
+    timings.update(gen.timings)
+    return output, timings
+
+
+def _init_worker(metaschema_version):
+    set_metaschema_version(metaschema_version)
+    # created once per process, and shared by the schemas it generates
+    get_metaschema_validator()
+
+
+def _generate_task(path, kwargs):
+    start = time.perf_counter()
+    try:
+        output, timings = generate_file(path, **kwargs)
+    except (ValueError, OSError, jsonschema.ValidationError) as err:
+        # errors in the schema files (including SchemaValidationError); any
+        # other exception is a bug, and is raised with its traceback
+        return path, None, '{}: {}'.format(type(err).__name__, err), {}, time.perf_counter() - start
+    return path, output, None, timings, time.perf_counter() - start
+
+
+def _iter_results(paths, kwargs, jobs):
+    """Generate each schema, yielding (path, output, error, timings, seconds) as they complete"""
+    if jobs == 1 or len(paths) < 2:
+        _init_worker(get_metaschema_version())
+        for path in paths:
+            yield _generate_task(path, kwargs)
+        return
+    with concurrent.futures.ProcessPoolExecutor(min(jobs, len(paths)), initializer=_init_worker,
+                                                initargs=(get_metaschema_version(),)) as executor:
+        futures = [executor.submit(_generate_task, path, kwargs) for path in paths]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def format_timings(rows):
+    """Return a table of the timings of each schema and their totals
+
+    rows is a list of (name, timings, seconds) tuples, where seconds is the
+    total time spent on the schema; the time not spent in any phase (e.g. in
+    formatting the class code) is shown as 'other'.
+    """
+    columns = ('loading',) + PHASES + ('other', 'total')
+    width = max([len('schema')] + [len(name) for name, _, _ in rows])
+    lines = ['{:<{}}'.format('schema', width) + ''.join(' {:>15}'.format(column) for column in columns)]
+    totals = dict.fromkeys(columns, 0.0)
+    for name, timings, seconds in rows:
+        values = dict(timings, other=max(0.0, seconds - sum(timings.values())), total=seconds)
+        lines.append('{:<{}}'.format(name, width) +
+                     ''.join(' {:>15.3f}'.format(values.get(column, 0.0)) for column in columns))
+        for column in columns:
+            totals[column] += values.get(column, 0.0)
+    if len(rows) > 1:
+        lines.append('{:<{}}'.format('(all)', width) +
+                     ''.join(' {:>15.3f}'.format(totals[column]) for column in columns))
+    return '\n'.join(lines) + '\n'
+
+
+def _duplicate_names(paths):
+    """Return the lists of paths whose modules would have the same name"""
+    names = collections.defaultdict(list)
+    for path in paths:
+        names[_module_name(path)].append(path)
+    return [same for same in names.values() if len(same) > 1]
+
+
+def generate(args):
+    duplicates = _duplicate_names(args.schemas)
+    if duplicates:
+        for paths in duplicates:
+            print('error: {} would all be written to the module {}; generate them into different '
+                  'output directories'.format(', '.join(paths), _module_name(paths[0])), file=sys.stderr)
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.metaschema_version:
+        set_metaschema_version(args.metaschema_version)
+    kwargs = dict(output_dir=args.output_dir, root_name=args.root_name, package=args.package,
+                  bundle=args.bundle, cache_dir=args.cache_dir, dedupe=args.dedupe, sidecar=args.sidecar,
+                  sidecar_docs=args.sidecar_docs)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    start = time.perf_counter()
+    results = {}
+    failed = False
+    for path, output, error, timings, seconds in _iter_results(args.schemas, kwargs, jobs):
+        results[path] = (timings, seconds)
+        if error is not None:
+            failed = True
+            print('{}: {}'.format(path, error), file=sys.stderr)
+        elif not args.quiet:
+            print('{} -> {}'.format(path, output))
+    if not args.quiet:
+        rows = [(path,) + results[path] for path in args.schemas]
+        print()
+        print(format_timings(rows), end='')
+        print('wall time: {:.3f}s'.format(time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='schemaperfect',
+                                     description='Generate Python APIs from JSON schemas')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    gen = subparsers.add_parser('generate', help='generate the modules of schema files',
+                                description='Generate a module (or package) for each schema file, '
+                                            'named after the file, and print the time spent in each '
+                                            'phase of the generation.')
+    gen.add_argument('schemas', nargs='+', help='the JSON schema files')
+    gen.add_argument('-o', '--output-dir', default='.', help='the directory of the generated modules')
+    gen.add_argument('--root-name', default='Root', help='the name of the root classes (default: Root)')
+    gen.add_argument('--package', action='store_true',
+                     help='write packages whose classes are loaded lazily, rather than modules')
+    gen.add_argument('--bundle', action='store_true',
+                     help='bundle references to other files of the directory of each schema')
+    gen.add_argument('-j', '--jobs', type=int, default=1,
+                     help='the number of schemas generated in parallel (0: one per CPU)')
+    gen.add_argument('--cache-dir', help='a directory in which to cache the generated class code')
+    gen.add_argument('--dedupe', action='store_true',
+                     help='alias structurally identical definitions to a single class')
+    gen.add_argument('--sidecar', choices=['json', 'marshal'],
+                     help='store the schemas in sidecar files, in this format')
+    gen.add_argument('--sidecar-docs', action='store_true', help='also store the docstrings in sidecar files')
+    gen.add_argument('--metaschema-version', help='the metaschema to validate the schemas against '
+                                                  '(e.g. draft4; default: draft7)')
+    gen.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+    gen.set_defaults(func=generate)
+    return parser
+
+
+def main(argv=None):
+    """Run the command line interface with the arguments argv (default: sys.argv[1:])"""
+    args = make_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,24 @@
 """Code generation utilities"""
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import json
+import marshal
 import os
 import pprint
 import re
 import sys
 import textwrap
+import time
 
 import jsonschema
 
-from .utils import (CustomPrettyPrinter, SchemaInfo, is_valid_identifier, indent_docstring, indent_arglist,
-                    load_metaschema)
-from importlib.util import module_from_spec, spec_from_loader
+from .sidecar import dump_file
+from .utils import (CustomPrettyPrinter, SchemaGraph, SchemaInfo, get_metaschema_validator, is_valid_identifier,
+                    indent_docstring, indent_arglist)
+from importlib.util import MAGIC_NUMBER, module_from_spec, spec_from_loader
 
 
 class CodeSnippet(object):
@@ -22,8 +31,34 @@ class CodeSnippet(object):
         return self.code
 
 
+# the phases of code generation timed by SchemaModuleGenerator
+PHASES = ('validation', 'analysis', 'docstrings', 'pretty_printing', 'writing')
+
+
+@contextlib.contextmanager
+def _timed(timings, phase):
+    """Add the time spent within the block to timings[phase], unless timings is None"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
 def _get_args(info):
     """Return the list of args & kwds for building the __init__ function"""
+    args = info._memo.get('_get_args')
+    if args is None:
+        args = info._memo['_get_args'] = _compute_args(info)
+    # copy the sets, which callers may modify
+    nonkeyword, required, kwds, invalid_kwds, additional = args
+    return (nonkeyword, set(required), set(kwds), set(invalid_kwds), additional)
+
+
+def _compute_args(info):
     # TODO: - set additional properties correctly
     #       - handle patternProperties etc.
     required = set()
@@ -82,13 +117,25 @@ class SchemaClassGenerator(object):
     rootschemarepr : CodeSnippet or object, optional
         An object whose repr will be used in the place of the explicit root
         schema.
+    docrepr : CodeSnippet or object, optional
+        An object whose repr is assigned to ``__doc__`` in the place of the
+        docstring, e.g. an expression loading the docstring lazily.
+    graph : SchemaGraph, optional
+        The index of the root schema's SchemaInfo nodes, shared between the
+        generators of the classes of a module.
+    aliases : list of dict, optional
+        Schemas structurally identical to the schema, which the class also
+        stands for (see ``SchemaBase._schema_aliases``).
+    timings : dict, optional
+        If given, the time spent analysing the schema and rendering the
+        docstring is added to its 'analysis' and 'docstrings' entries.
     """
     schema_class_template = textwrap.dedent('''
     class {classname}({basename}):
-        """{docstring}"""
+        {doc}
         _schema = {schema!r}
         _rootschema = {rootschema!r}
-        _property_names = {property_names!r}
+        _property_names = {property_names!r}{aliases}
 
         {init_code}
     ''')
@@ -103,7 +150,7 @@ class SchemaClassGenerator(object):
 
     def __init__(self, classname, schema, rootschema=None,
                  basename='SchemaBase', schemarepr=None, rootschemarepr=None,
-                 nodefault=()):
+                 nodefault=(), docrepr=None, graph=None, aliases=(), timings=None):
         self.classname = classname
         self.schema = schema
         self.rootschema = rootschema
@@ -111,6 +158,21 @@ class SchemaClassGenerator(object):
         self.schemarepr = schemarepr
         self.rootschemarepr = rootschemarepr
         self.nodefault = nodefault
+        self.docrepr = docrepr
+        self.graph = graph
+        self.aliases = aliases
+        self.timings = timings
+        self._schema_info = None
+
+    def _info(self):
+        """Return the SchemaInfo of the schema, from the graph if given"""
+        if self._schema_info is None:
+            rootschema = self.rootschema or self.schema
+            if self.graph is not None and self.graph.rootschema is rootschema:
+                self._schema_info = self.graph.info(self.schema)
+            else:
+                self._schema_info = SchemaInfo(self.schema, self.rootschema)
+        return self._schema_info
 
     def schema_class(self):
         """Generate code for a schema class"""
@@ -126,14 +188,25 @@ class SchemaClassGenerator(object):
                 rootschemarepr = CodeSnippet('_schema')
             else:
                 rootschemarepr = rootschema
+        with _timed(self.timings, 'analysis'):
+            init_code = self.init_code(indent=4)
+        if self.docrepr is not None:
+            doc = '__doc__ = {!r}'.format(self.docrepr)
+        else:
+            with _timed(self.timings, 'docstrings'):
+                doc = '"""{}"""'.format(self.docstring(indent=4))
+        aliases = ''
+        if self.aliases:
+            aliases = '\n    _schema_aliases = {!r}'.format(tuple(self.aliases))
         return self.schema_class_template.format(
                 classname=self.classname,
                 basename=self.basename,
                 schema=schemarepr,
                 rootschema=rootschemarepr,
-                docstring=self.docstring(indent=4),
-                init_code=self.init_code(indent=4),
-                property_names=property_names
+                doc=doc,
+                init_code=init_code,
+                property_names=property_names,
+                aliases=aliases
         )
 
     def docstring(self, indent=0):
@@ -141,7 +214,7 @@ class SchemaClassGenerator(object):
         #       for example, a non-object definition should list valid type, enum
         #       values, etc.
         # TODO: use _get_args here for more information on allOf objects
-        info = SchemaInfo(self.schema, self.rootschema)
+        info = self._info()
         doc = ["{} schema wrapper".format(self.classname),
                '',
                info.medium_description]
@@ -166,7 +239,7 @@ class SchemaClassGenerator(object):
 
     def init_code(self, indent=0):
         """Return code suitablde for the __init__ function of a Schema class"""
-        info = SchemaInfo(self.schema, rootschema=self.rootschema)
+        info = self._info()
         nonkeyword, required, kwds, invalid_kwds, additional = _get_args(info)
 
         nodefault = set(self.nodefault)
@@ -202,6 +275,166 @@ class SchemaClassGenerator(object):
         return initfunc
 
 
+def _iter_refs(schema):
+    """Iterate over the $ref values within schema"""
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str):
+                yield ref
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _digest(*parts):
+    """Return a stable hex digest of JSON-serializable parts, in order"""
+    text = json.dumps(parts, sort_keys=False, separators=(',', ':'), default=repr)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# the SchemaModuleGenerator of the current worker process, when generating
+# class code in parallel
+_worker_generator = None
+
+
+def _init_worker(generator):
+    global _worker_generator
+    _worker_generator = generator
+
+
+def _worker_class_code(name, options):
+    _worker_generator.timings = {}
+    return _worker_generator._class_code(name, options), _worker_generator.timings
+
+
+# options of the generated classes which are not generator settings
+_ClassOptions = collections.namedtuple('_ClassOptions', ['basename', 'sidecar', 'sidecar_docs'])
+# the defaults argument of namedtuple needs Python 3.7
+_ClassOptions.__new__.__defaults__ = ('SchemaBase', False, False)
+
+
+def _strongly_connected_components(graph):
+    """Return the strongly connected components of graph, dependencies first
+
+    graph maps each node to the set of nodes it references. This is an
+    iterative version of Tarjan's algorithm, so that long chains of
+    references do not hit the recursion limit.
+    """
+    index, low = {}, {}
+    stack, on_stack, components = [], set(), []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target not in index:
+                    index[target] = low[target] = len(index)
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(graph[target])))
+                    break
+                elif target in on_stack:
+                    low[node] = min(low[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+# keywords whose value is a subschema, a list of subschemas or a dict of
+# subschemas, and keywords which only document a schema
+_SUBSCHEMA_KEYWORDS = ('additionalItems', 'additionalProperties', 'contains', 'else', 'if', 'items', 'not',
+                       'propertyNames', 'then')
+_SUBSCHEMA_LIST_KEYWORDS = ('allOf', 'anyOf', 'items', 'oneOf')
+_SUBSCHEMA_DICT_KEYWORDS = ('definitions', 'dependencies', 'patternProperties', 'properties')
+_ANNOTATION_KEYWORDS = ('description', 'title')
+
+
+def _structure(schema, ref_target):
+    """Return schema without annotations, with each $ref replaced by ref_target(ref)
+
+    Keywords are sorted, while the order of properties is kept, as it
+    determines that of the arguments of the generated classes.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    structure = {}
+    for key in sorted(schema):
+        value = schema[key]
+        if key in _ANNOTATION_KEYWORDS:
+            continue
+        elif key == '$ref' and isinstance(value, str):
+            value = ref_target(value)
+        elif key in _SUBSCHEMA_DICT_KEYWORDS and isinstance(value, dict):
+            value = {name: _structure(subschema, ref_target) for name, subschema in value.items()}
+        elif key in _SUBSCHEMA_LIST_KEYWORDS and isinstance(value, list):
+            value = [_structure(subschema, ref_target) for subschema in value]
+        elif key in _SUBSCHEMA_KEYWORDS:
+            value = _structure(value, ref_target)
+        structure[key] = value
+    return structure
+
+
+def _structural_aliases(definitions):
+    """Return the first structurally identical definition of each definition, by name
+
+    Definitions are structurally identical when they differ only in their
+    title and description, and reference definitions which are themselves
+    identical. Definitions within reference cycles are only matched with
+    those of a cycle of the same shape, defined in the same order.
+    """
+    prefix = '#/definitions/'
+    shapes, refs = {}, {}
+    for name, schema in definitions.items():
+        targets = refs[name] = []
+
+        def ref_target(ref, targets=targets):
+            target = ref[len(prefix):] if ref.startswith(prefix) else None
+            if target not in definitions:
+                return ref
+            # the target is replaced by its fingerprint below
+            targets.append(target)
+            return None
+
+        shapes[name] = json.dumps(_structure(schema, ref_target))
+
+    # fingerprint definitions after those they reference
+    order = {name: i for i, name in enumerate(definitions)}
+    fingerprints, interned = {}, {}
+    graph = {name: set(targets) for name, targets in refs.items()}
+    for component in _strongly_connected_components(graph):
+        members = sorted(component, key=order.get)
+        local = {name: ('local', i) for i, name in enumerate(members)}
+        if len(members) == 1 and members[0] not in graph[members[0]]:
+            local = {}
+        key = tuple((shapes[name], tuple(local.get(target) or fingerprints[target] for target in refs[name]))
+                    for name in members)
+        for i, name in enumerate(members):
+            fingerprints[name] = interned.setdefault((key, i), len(interned))
+
+    first = {}
+    return {name: first.setdefault(fingerprints[name], name) for name in definitions}
+
+
 class SchemaModuleGenerator(object):
     """Generate a Python module implementing the schema
 
@@ -213,6 +446,27 @@ class SchemaModuleGenerator(object):
         The name of the root class (default: 'Root')
     schemaperfect_import : string
         The import path for schemaperfect (default: 'schemaperfect')
+    cache_dir : string or Path (optional)
+        A directory in which the generated code of each class is cached.
+        Code is reused when the class's definition, the definitions it
+        references (transitively) and the generator settings are unchanged,
+        so that only changed definitions are regenerated.
+    jobs : integer
+        The number of processes generating class code; 1 (default) generates
+        it in the current process, and 0 or less uses one process per CPU.
+        The output does not depend on the number of processes.
+    dedupe : boolean
+        If True, definitions which are structurally identical to an earlier
+        one (differing only in titles and descriptions, see
+        ``_structural_aliases``) are not given a class of their own, but are
+        aliases of the class of the earlier definition. The class lists their
+        schemas in ``_schema_aliases``, so that from_dict still maps them to it.
+
+    Attributes
+    ----------
+    timings : dict
+        The seconds spent in each of the ``PHASES`` of code generation by
+        this generator, summed over the processes generating class code.
     """
 
     schema_module_header = textwrap.dedent("""
@@ -221,56 +475,270 @@ class SchemaModuleGenerator(object):
     from {schemaperfect} import SchemaBase, Undefined
     """)
 
-    def __init__(self, schema, root_name='Root', schemaperfect_import='schemaperfect'):
+    # bump when the generated code changes in ways not captured by the
+    # version of schemaperfect, to invalidate cached fragments
+    cache_format = 2
+
+    def __init__(self, schema, root_name='Root', schemaperfect_import='schemaperfect', cache_dir=None,
+                 jobs=1, dedupe=False):
         self.schema = schema
         self.root_name = root_name
         self.schemaperfect_import = schemaperfect_import
-        self._validate()
+        self.cache_dir = os.fspath(cache_dir) if cache_dir is not None else None
+        self.jobs = jobs if jobs > 0 else os.cpu_count() or 1
+        self.dedupe = dedupe
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = {}
+        self._validated = False
+        self._graph = None
+        # maps alias definitions to their canonical definition, and canonical
+        # definitions to their aliases
+        self._canonical = {}
+        self._aliases = {}
+
+    def __getstate__(self):
+        # the graph is rebuilt by each worker process rather than pickled
+        state = self.__dict__.copy()
+        state['_graph'] = None
+        return state
+
+    def _schema_graph(self):
+        """Return the SchemaGraph of the schema, shared by the class generators"""
+        if self._graph is None:
+            self._graph = SchemaGraph(self.schema)
+        return self._graph
 
     def _validate(self):
-        metaschema = load_metaschema()
-        jsonschema.validate(self.schema, metaschema)
+        error = jsonschema.exceptions.best_match(get_metaschema_validator().iter_errors(self.schema))
+        if error is not None:
+            raise error
 
     def module_code(self):
         """Generate a Python module implementing the schema"""
-        definitions = self.schema.get('definitions', {})
-
-        if self.root_name in definitions:
-            raise ValueError(f"root_name='{self.root_name}' exists in definitions; "
-                             "please choose a different name")
-
+        self._check_schema()
         code = ['"""Module generated by SchemaModuleGenerator"""',
                 f"from {self.schemaperfect_import} import SchemaBase, Undefined"]
+        code.extend(code for code, _ in self._class_fragments().values() if code)
 
-        pretty_printer_kwargs = dict(width=140, compact=False, indent=4)
-        if sys.version_info.major == 3 and sys.version_info.minor >= 8:
-            pretty_printer_kwargs['sort_dicts'] = False
+        return '\n\n'.join(code)
 
-        pretty_printer = CustomPrettyPrinter(**pretty_printer_kwargs)
-        schemarepr = textwrap.indent(pretty_printer.pformat(object=self.schema), 4 * ' ').lstrip()
-        root = SchemaClassGenerator(self.root_name, self.schema,
-                                    schemarepr=CodeSnippet(schemarepr), )
-        code.append(root.schema_class())
+    def _check_schema(self):
+        """Validate the schema against the metaschema (once), and check the root name
 
-        for name, subschema in definitions.items():
-            schemarepr = f"{{'$ref': '#/definitions/{name}'}}"
-            rootschemarepr = f'{self.root_name}._schema'
-            gen = SchemaClassGenerator(classname=name,
-                                       schema=subschema,
-                                       rootschema=self.schema,
-                                       schemarepr=CodeSnippet(schemarepr),
-                                       rootschemarepr=CodeSnippet(rootschemarepr))
-            code.append(gen.schema_class())
+        Validation is deferred until code is generated, so that import_as
+        can skip it when the module is cached.
+        """
+        if not self._validated:
+            with _timed(self.timings, 'validation'):
+                self._validate()
+            self._validated = True
+        if self.root_name in self.schema.get('definitions', {}):
+            raise ValueError(f"root_name='{self.root_name}' exists in definitions; "
+                             "please choose a different name")
 
-        return '\n\n'.join(code)
+    def _class_fragments(self, options=None):
+        """Return the code and docstring of each class, by definition name (None for the root class)
 
-    def write_module(self, modulename):
+        Classes are taken from the cache where possible, and generated
+        otherwise. Docstrings are None unless ``options.sidecar_docs``. The
+        code of alias definitions is empty, as the aliases are assigned after
+        the class of their canonical definition.
+        """
+        options = options or _ClassOptions()
+        # start from a fresh graph, in case the schema was modified in place
+        self._graph = None
+        self._find_aliases()
+        names = [None] + list(self.schema.get('definitions', {}))
+        keys = self._fragment_keys(options) if self.cache_dir is not None else {}
+        fragments = {name: self._cache_read(keys.get(name)) for name in names}
+        pending = [name for name in names if fragments[name] is None]
+        for name, fragment in zip(pending, self._generate_fragments(pending, options)):
+            fragments[name] = fragment
+            self._cache_write(keys.get(name), fragment)
+        return fragments
+
+    def _find_aliases(self):
+        self._canonical, self._aliases = {}, {}
+        if not self.dedupe:
+            return
+        for name, canonical in _structural_aliases(self.schema.get('definitions', {})).items():
+            if name != canonical:
+                self._canonical[name] = canonical
+                self._aliases.setdefault(canonical, []).append(name)
+
+    def _class_code(self, name, options):
+        """Generate the code and docstring of the class for the definition name (None for the root)"""
+        if name in self._canonical:
+            return '', None
+        if name is None:
+            gen = self._root_class_generator(options)
+        else:
+            gen = self._definition_class_generator(name, self.schema['definitions'][name], options)
+        code = gen.schema_class()
+        if name in self._aliases:
+            code += '\n\n' + ''.join(f'{alias} = {name}\n' for alias in self._aliases[name])
+        if options.sidecar_docs:
+            with _timed(self.timings, 'docstrings'):
+                return code, gen.docstring(indent=4)
+        return code, None
+
+    def _generate_fragments(self, names, options):
+        """Return the list of the code and docstrings of the classes for names, in order"""
+        if self.jobs == 1 or len(names) < 2:
+            return [self._class_code(name, options) for name in names]
+        jobs = min(self.jobs, len(names))
+        # the generator is sent once to each worker, rather than with each task
+        with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                                    initargs=(self,)) as executor:
+            results = list(executor.map(functools.partial(_worker_class_code, options=options), names,
+                                        chunksize=max(1, len(names) // (4 * jobs))))
+        for _, timings in results:
+            for phase, seconds in timings.items():
+                self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        return [fragment for fragment, _ in results]
+
+    def _root_class_generator(self, options):
+        """Return the SchemaClassGenerator of the root class"""
+        if options.sidecar:
+            schemarepr = CodeSnippet('_sidecar.lazy_schema()')
+        else:
+            pretty_printer_kwargs = dict(width=140, compact=False, indent=4)
+            if sys.version_info.major == 3 and sys.version_info.minor >= 8:
+                pretty_printer_kwargs['sort_dicts'] = False
+
+            pretty_printer = CustomPrettyPrinter(**pretty_printer_kwargs)
+            with _timed(self.timings, 'pretty_printing'):
+                schemarepr = CodeSnippet(textwrap.indent(pretty_printer.pformat(object=self.schema),
+                                                         4 * ' ').lstrip())
+        return SchemaClassGenerator(self.root_name, self.schema, basename=options.basename,
+                                    schemarepr=schemarepr, docrepr=self._docrepr(self.root_name, options),
+                                    graph=self._schema_graph(), timings=self.timings)
+
+    def _definition_class_generator(self, name, subschema, options):
+        """Return the SchemaClassGenerator of the class for the definition name"""
+        schemarepr = f"{{'$ref': '#/definitions/{name}'}}"
+        if options.sidecar:
+            # refer to the sidecar rather than to the root class, so that
+            # defining the class does not load the schema
+            rootschemarepr = '_sidecar.lazy_schema()'
+        else:
+            rootschemarepr = f'{self.root_name}._schema'
+        return SchemaClassGenerator(classname=name,
+                                    schema=subschema,
+                                    rootschema=self.schema,
+                                    basename=options.basename,
+                                    schemarepr=CodeSnippet(schemarepr),
+                                    rootschemarepr=CodeSnippet(rootschemarepr),
+                                    docrepr=self._docrepr(name, options),
+                                    graph=self._schema_graph(),
+                                    aliases=[{'$ref': f'#/definitions/{alias}'}
+                                             for alias in self._aliases.get(name, ())],
+                                    timings=self.timings)
+
+    @staticmethod
+    def _docrepr(classname, options):
+        if options.sidecar_docs:
+            return CodeSnippet(f'_sidecar.lazy_doc({classname!r})')
+        return None
+
+    def _settings_digest(self, options):
+        """Digest of everything besides the schema that affects generated classes"""
+        from .version import version
+        generator = SchemaClassGenerator
+        return _digest(self.cache_format, version, sys.version_info[:2],
+                       type(self).__module__, type(self).__qualname__,
+                       generator.schema_class_template, generator.init_template,
+                       self.root_name, self.dedupe, options)
+
+    def _fragment_keys(self, options):
+        """Return the cache key of each class, by definition name (None for the root class)
+
+        The key of a definition covers its own schema and those of the
+        definitions it references, directly or not. References to anything
+        but a definition make the key cover the whole root schema.
+        """
+        definitions = self.schema.get('definitions', {})
+        settings = self._settings_digest(options)
+        own = {name: _digest(name, subschema) for name, subschema in definitions.items()}
+        prefix = '#/definitions/'
+        refs = {}
+        external = set()
+        for name, subschema in definitions.items():
+            refs[name] = set()
+            for ref in _iter_refs(subschema):
+                target = ref[len(prefix):] if ref.startswith(prefix) else None
+                if target in definitions:
+                    refs[name].add(target)
+                else:
+                    external.add(name)
+
+        keys = {None: _digest('root', settings, self.schema)}
+        whole_schema = _digest(self.schema) if external else None
+        # definitions referencing each other share a component digest; the
+        # components are visited after all those they reference
+        component_keys = {}
+        for component in _strongly_connected_components(refs):
+            members = set(component)
+            parts = sorted(own[name] for name in component)
+            dependencies = {component_keys[target] for name in component for target in refs[name]
+                            if target not in members}
+            if members & external:
+                dependencies.add(whole_schema)
+            digest = _digest(parts, sorted(dependencies))
+            for name in component:
+                component_keys[name] = digest
+                keys[name] = _digest('definition', settings, own[name], digest)
+        for name, aliases in self._aliases.items():
+            keys[name] = _digest(keys[name], aliases)
+        for name in self._canonical:
+            keys[name] = None
+        return keys
+
+    def _cache_read(self, key):
+        """Return the fragment stored under key in the cache, or None"""
+        if key is None:
+            return None
+        try:
+            with open(self._cache_path(key), encoding='utf-8') as f:
+                code, doc = json.load(f)
+        except (OSError, ValueError):
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        return code, doc
+
+    def _cache_write(self, key, fragment):
+        if key is None:
+            return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so that concurrent or interrupted
+        # runs never leave a partial fragment behind
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(fragment), f)
+        os.replace(tmp_path, path)
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def write_module(self, modulename, sidecar=None, sidecar_docs=False):
         """Write the schema module to the given filename
         
         Parameters
         ----------
         modulename : string or Path
             the path to the module (should end with a .py extension)
+        sidecar : string (optional)
+            If 'json' or 'marshal', the root schema is not embedded in the
+            module, but written next to it to a file in that format (named
+            after the module, e.g. ``myschema.schema.json``), from which it
+            is loaded on first use.
+        sidecar_docs : boolean
+            If True (and a sidecar format is given), the class docstrings are
+            also written to a sidecar file, and loaded on first access of a
+            ``__doc__``.
 
         Returns
         -------
@@ -278,14 +746,163 @@ class SchemaModuleGenerator(object):
             the full absolute path to the written module
         """
         modulename = os.fspath(modulename)  # support pathlib.Path & others
-        code = self.module_code()
-        with open(modulename, 'w') as f:
+        if sidecar is None:
+            code = self.module_code()
+        else:
+            self._check_schema()
+            stem = os.path.splitext(os.path.basename(modulename))[0]
+            options = _ClassOptions(sidecar=True, sidecar_docs=sidecar_docs)
+            fragments = self._class_fragments(options)
+            files = self._sidecar_files(fragments, stem, sidecar, sidecar_docs)
+            code = ['"""Module generated by SchemaModuleGenerator"""',
+                    f"from {self.schemaperfect_import} import SchemaBase, Undefined\n"
+                    f"from {self.schemaperfect_import}.sidecar import SchemaSidecar\n\n"
+                    f"_sidecar = SchemaSidecar(__file__, {', '.join(map(repr, files))})"]
+            code.extend(code for code, _ in fragments.values() if code)
+            code = '\n\n'.join(code)
+            directory = os.path.dirname(os.path.abspath(modulename))
+            with _timed(self.timings, 'writing'):
+                for filename, value in files.items():
+                    dump_file(os.path.join(directory, filename), value)
+        with _timed(self.timings, 'writing'), open(modulename, 'w') as f:
             f.write(code)
         return os.path.abspath(modulename)
 
+    def _sidecar_files(self, fragments, stem, sidecar, sidecar_docs):
+        """Return the contents of the sidecar files, by file name"""
+        if sidecar not in ('json', 'marshal'):
+            raise ValueError("sidecar must be 'json' or 'marshal'")
+        files = {'{}.schema.{}'.format(stem, sidecar): self.schema}
+        if sidecar_docs:
+            docs = {name if name is not None else self.root_name: doc
+                    for name, (_, doc) in fragments.items() if name not in self._canonical}
+            files['{}.docs.{}'.format(stem, sidecar)] = docs
+        return files
+
+    package_base_template = textwrap.dedent('''
+    """Base class of the classes of this package"""
+    import importlib
+
+    from {schemaperfect} import SchemaBase
+    {sidecar}
+    # the submodules defining the classes of this package
+    _MODULES = {modules!r}
+
+
+    class {basename}(SchemaBase):
+        @classmethod
+        def _default_wrapper_classes(cls):
+            # load every class, so that from_dict can find them all
+            for module in _MODULES:
+                importlib.import_module('.' + module, __package__)
+            return {basename}.__subclasses__()
+    ''').lstrip()
+
+    package_init_template = textwrap.dedent('''
+    """Package generated by SchemaModuleGenerator
+
+    Classes are defined in submodules, which are imported on first access.
+    """
+    import importlib
+
+    _CLASS_MODULES = {class_modules}
+
+    __all__ = {names!r}
+
+
+    def __getattr__(name):
+        module = _CLASS_MODULES.get(name)
+        if module is None:
+            raise AttributeError("module {{!r}} has no attribute {{!r}}".format(__name__, name))
+        value = getattr(importlib.import_module('.' + module, __name__), name)
+        globals()[name] = value
+        return value
+
+
+    def __dir__():
+        return sorted(set(globals()) | set(_CLASS_MODULES))
+    ''').lstrip()
+
+    def write_package(self, dirname, classes_per_module=100, sidecar=None, sidecar_docs=False):
+        """Write the schema classes as a package whose classes are loaded lazily
+
+        The classes are split across submodules, which the package imports
+        on first access of one of their classes (through a module-level
+        ``__getattr__``, see PEP 562), so that importing the package does not
+        execute the code of every class. ``from_dict`` still finds all
+        classes, by importing every submodule when it is first called.
+
+        Parameters
+        ----------
+        dirname : string or Path
+            The directory of the package; it is created if needed.
+        classes_per_module : integer
+            The number of definition classes per submodule.
+        sidecar, sidecar_docs :
+            Store the root schema, and optionally the docstrings, in sidecar
+            files within the package; see ``write_module``.
+
+        Returns
+        -------
+        packagepath : string
+            the full absolute path to the written package
+        """
+        self._check_schema()
+        dirname = os.fspath(dirname)
+        basename = '_PackageSchemaBase'
+        options = _ClassOptions(basename, sidecar is not None, sidecar is not None and sidecar_docs)
+        fragments = self._class_fragments(options)
+        header = ['"""Module generated by SchemaModuleGenerator"""',
+                  f"from {self.schemaperfect_import} import Undefined\n"
+                  f"from ._base import {basename}" + (", _sidecar" if sidecar else "")]
+        files = {}
+        sidecar_code = ''
+        if sidecar is not None:
+            files = self._sidecar_files(fragments, '_schema', sidecar, sidecar_docs)
+            sidecar_code = (f"from {self.schemaperfect_import}.sidecar import SchemaSidecar\n\n"
+                            f"_sidecar = SchemaSidecar(__file__, {', '.join(map(repr, files))})\n")
+
+        definitions = list(self.schema.get('definitions', {}))
+        modules = {'_root': ['\n\n'.join(header + [fragments[None][0]])]}
+        class_modules = {self.root_name: '_root'}
+        for start in range(0, len(definitions), classes_per_module):
+            module = '_definitions{}'.format(start // classes_per_module)
+            names = definitions[start:start + classes_per_module]
+            code = header[:-1] + [header[-1] + f"\nfrom ._root import {self.root_name}"]
+            code.extend(fragments[name][0] for name in names if name not in self._canonical)
+            modules[module] = ['\n\n'.join(code)]
+            class_modules.update((name, module) for name in names)
+        # aliases are assigned in the module of their canonical class
+        class_modules.update((name, class_modules[canonical]) for name, canonical in self._canonical.items())
+
+        with _timed(self.timings, 'writing'):
+            os.makedirs(dirname, exist_ok=True)
+            for filename, value in files.items():
+                dump_file(os.path.join(dirname, filename), value)
+        files = {
+            '_base.py': self.package_base_template.format(
+                schemaperfect=self.schemaperfect_import, basename=basename, modules=list(modules),
+                sidecar=sidecar_code),
+            '__init__.py': self.package_init_template.format(
+                class_modules='{\n' + ''.join(f'    {name!r}: {module!r},\n'
+                                               for name, module in class_modules.items()) + '}',
+                names=list(class_modules)),
+        }
+        files.update((module + '.py', code[0]) for module, code in modules.items())
+        with _timed(self.timings, 'writing'):
+            for filename, code in files.items():
+                with open(os.path.join(dirname, filename), 'w') as f:
+                    f.write(code)
+        return os.path.abspath(dirname)
+
     def import_as(self, modulename, add_to_sys_modules=True):
         """Import wrapper as a dynamically-generated module.
 
+        If the generator has a ``cache_dir``, the compiled code of the module
+        is cached there, keyed by the schema, the generator settings and the
+        Python version, so that later imports of the same schema skip
+        metaschema validation, code generation and compilation.
+
         Parameters
         ----------
         modulename : string
@@ -300,7 +917,32 @@ class SchemaModuleGenerator(object):
             the dynamically-created module.
         """
         module = module_from_spec(spec_from_loader(modulename, loader=None))
-        exec(self.module_code(), module.__dict__)
+        exec(self._module_code_object(modulename), module.__dict__)
         if add_to_sys_modules:
             sys.modules[modulename] = module
         return module
+
+    def _module_code_object(self, modulename):
+        """Return the compiled code of the module, from the cache if possible"""
+        filename = '<schemaperfect:{}>'.format(modulename)
+        if self.cache_dir is None:
+            return compile(self.module_code(), filename, 'exec')
+        key = _digest('module', self._settings_digest(_ClassOptions()), self.schemaperfect_import,
+                      filename, MAGIC_NUMBER.hex(), self.schema)
+        path = os.path.join(self.cache_dir, 'modules', key + '.marshal')
+        try:
+            with open(path, 'rb') as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        else:
+            self.cache_hits += 1
+            return code
+        self.cache_misses += 1
+        code = compile(self.module_code(), filename, 'exec')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(code, f)
+        os.replace(tmp_path, path)
+        return code
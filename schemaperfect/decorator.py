@@ -1,8 +1,35 @@
+import functools
 import warnings
 from . import codegen, SchemaBase, Undefined
+from .sidecar import LazyAttribute
 
 
-def schemaclass(*args, init_func=True, docstring=True, property_map=True):
+def _init_function(cls, gen):
+    """Return the __init__ function generated for cls by the SchemaClassGenerator gen"""
+    init_code = gen.init_code()
+    globals_ = {cls.__name__: cls, 'Undefined': Undefined}
+    locals_ = {}
+    exec(init_code, globals_, locals_)
+    return locals_['__init__']
+
+
+class _LazyInit(object):
+    """Stand-in for the __init__ of a class, generated on first access
+
+    On first access (including through instantiation), the function is
+    generated and replaces this object in the class.
+    """
+    def __init__(self, cls, generator):
+        self._cls = cls
+        self._generator = generator
+
+    def __get__(self, obj, owner=None):
+        init = _init_function(self._cls, self._generator())
+        setattr(self._cls, '__init__', init)
+        return init.__get__(obj, owner)
+
+
+def schemaclass(*args, init_func=True, docstring=True, property_map=True, lazy=False):
     """A decorator to add boilerplate to a schema class
 
     This will read the _json_schema attribute of a SchemaBase class, and add
@@ -26,24 +53,36 @@ def schemaclass(*args, init_func=True, docstring=True, property_map=True):
         @schemaclass(init_func=True, docstring=False)
         class MySchema(SchemaBase):
             _schema = {...}
+
+    With ``lazy=True``, the __init__ function and the docstring are only
+    generated when first used (on instantiation or first access of
+    ``__init__``, and on first access of ``__doc__``), so that modules
+    defining many decorated classes import quickly:
+
+        @schemaclass(lazy=True)
+        class MySchema(SchemaBase):
+            _schema = {...}
     """
-    def _decorator(cls, init_func=init_func, docstring=docstring):
+    def _decorator(cls, init_func=init_func, docstring=docstring, lazy=lazy):
         if not (isinstance(cls, type) and issubclass(cls, SchemaBase)):
             warnings.warn("class is not an instance of SchemaBase.")
 
-        name = cls.__name__
-        gen = codegen.SchemaClassGenerator(name, schema=cls._schema,
-                                      rootschema=cls._rootschema)
+        @functools.lru_cache(maxsize=None)
+        def generator():
+            return codegen.SchemaClassGenerator(cls.__name__, schema=cls._schema,
+                                                rootschema=cls._rootschema)
 
         if init_func and '__init__' not in cls.__dict__:
-            init_code = gen.init_code()
-            globals_ = {name: cls, 'Undefined': Undefined}
-            locals_ = {}
-            exec(init_code, globals_, locals_)
-            setattr(cls, '__init__', locals_['__init__'])
+            if lazy:
+                setattr(cls, '__init__', _LazyInit(cls, generator))
+            else:
+                setattr(cls, '__init__', _init_function(cls, generator()))
 
         if docstring and not cls.__doc__:
-            setattr(cls, '__doc__', gen.docstring())
+            if lazy:
+                setattr(cls, '__doc__', LazyAttribute(lambda: generator().docstring()))
+            else:
+                setattr(cls, '__doc__', generator().docstring())
         return cls
 
     if len(args) == 0:
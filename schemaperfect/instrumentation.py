@@ -0,0 +1,177 @@
+"""Runtime performance counters and hooks for SchemaBase operations
+
+Instrumentation is disabled by default; while disabled, instrumented methods
+only pay for a single flag check. Once enabled, the number of calls and the
+cumulative wall-clock time of each event are recorded per schema class:
+
+- ``instantiate``: SchemaBase.__init__, including validation at instantiation
+- ``validate``: validation of to_dict output and calls to SchemaBase.validate
+- ``to_dict``: SchemaBase.to_dict
+- ``from_dict``: SchemaBase.from_dict, including validation and wrapping
+- ``union_attempt``: anyOf/oneOf branches tried while wrapping a dict
+- ``copy``: SchemaBase.copy
+
+Times are inclusive, so nested events (e.g. the validation within a
+``to_dict`` call) are counted under both.
+
+>>> from schemaperfect import instrumentation
+>>> instrumentation.enable()
+>>> # ... exercise SchemaBase objects ...
+>>> stats = instrumentation.snapshot()
+>>> instrumentation.disable()
+"""
+import collections
+import functools
+import threading
+import time
+
+EVENTS = ('instantiate', 'validate', 'to_dict', 'from_dict', 'union_attempt', 'copy')
+
+ENABLED = False
+
+_stats = collections.defaultdict(lambda: [0, 0.0])
+_lock = threading.Lock()
+_pre_hooks = []
+_post_hooks = []
+
+
+def enable():
+    """Start recording counters and calling hooks"""
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """Stop recording counters and calling hooks; recorded counters are kept"""
+    global ENABLED
+    ENABLED = False
+
+
+def is_enabled():
+    return ENABLED
+
+
+def reset():
+    """Discard all recorded counters"""
+    with _lock:
+        _stats.clear()
+
+
+def add_hook(pre=None, post=None):
+    """Register functions called around every instrumented event
+
+    Parameters
+    ----------
+    pre : callable (optional)
+        Called as ``pre(event, cls)`` before the event.
+    post : callable (optional)
+        Called as ``post(event, cls, seconds)`` after the event, whether or
+        not it raised an exception.
+
+    Returns
+    -------
+    hook : tuple
+        A handle to pass to ``remove_hook``.
+    """
+    if pre is not None:
+        _pre_hooks.append(pre)
+    if post is not None:
+        _post_hooks.append(post)
+    return (pre, post)
+
+
+def remove_hook(hook):
+    """Unregister the functions registered by ``add_hook``"""
+    pre, post = hook
+    if pre is not None:
+        _pre_hooks.remove(pre)
+    if post is not None:
+        _post_hooks.remove(post)
+
+
+def _class_name(cls):
+    return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+
+def record(event, cls, seconds):
+    """Add a call of event taking the given time to the counters of cls"""
+    key = (_class_name(cls), event)
+    with _lock:
+        stats = _stats[key]
+        stats[0] += 1
+        stats[1] += seconds
+
+
+def call(event, cls, func, *args, **kwargs):
+    """Call func(*args, **kwargs), recording it as event for cls and running hooks"""
+    for hook in _pre_hooks:
+        hook(event, cls)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        record(event, cls, seconds)
+        for hook in _post_hooks:
+            hook(event, cls, seconds)
+
+
+def instrumented(event):
+    """Decorator recording calls of a SchemaBase method or classmethod as event"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self_or_cls, *args, **kwargs):
+            if not ENABLED:
+                return func(self_or_cls, *args, **kwargs)
+            cls = self_or_cls if isinstance(self_or_cls, type) else type(self_or_cls)
+            return call(event, cls, func, self_or_cls, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Return the recorded counters as a dict
+
+    Returns
+    -------
+    stats : dict
+        Maps class names ("module.ClassName") to dicts mapping each recorded
+        event to a dict with its ``count`` and cumulative ``seconds``.
+    """
+    result = {}
+    with _lock:
+        for (name, event), (count, seconds) in sorted(_stats.items()):
+            result.setdefault(name, {})[event] = {'count': count, 'seconds': seconds}
+    return result
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(stream=None, prefix='schemaperfect'):
+    """Return the recorded counters in the Prometheus text exposition format
+
+    Parameters
+    ----------
+    stream : file-like object (optional)
+        If given, the text is also written to it.
+    prefix : string
+        The prefix of the metric names.
+    """
+    stats = snapshot()
+    lines = []
+    for metric, field, help_text in [
+            ('calls_total', 'count', 'Number of SchemaBase operations'),
+            ('seconds_total', 'seconds', 'Cumulative time spent in SchemaBase operations')]:
+        name = '{}_{}'.format(prefix, metric)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} counter'.format(name))
+        for cls_name, events in stats.items():
+            for event, values in events.items():
+                lines.append('{}{{class="{}",event="{}"}} {!r}'.format(
+                    name, _escape_label(cls_name), event, values[field]))
+    text = '\n'.join(lines) + '\n'
+    if stream is not None:
+        stream.write(text)
+    return text
@@ -0,0 +1,222 @@
+"""Memory accounting for SchemaBase objects
+
+``snapshot`` reports, for each schema class, the number of instances and the
+memory they hold:
+
+- ``instances``: the number of objects of the class
+- ``object_bytes``: the objects themselves and their attribute dicts
+- ``args_bytes`` / ``kwds_bytes``: the ``_args`` and ``_kwds`` containers and
+  the data within them, excluding nested SchemaBase objects (which are
+  counted under their own class)
+- ``undefined``: the number of ``Undefined`` placeholders in ``_kwds``
+- ``errors`` / ``error_bytes``: the number of retained ``_validation_error``
+  objects and their size, including the failing instance they hold on to
+
+Objects shared between several places are counted once. Sizes are computed
+with ``sys.getsizeof`` and so are approximate.
+
+Snapshots are taken either of the trees below some given objects, or of all
+live instances created while tracking is enabled:
+
+>>> from schemaperfect import memory
+>>> memory.enable_tracking()
+>>> before = memory.snapshot()
+>>> # ... create SchemaBase objects ...
+>>> growth = memory.snapshot().diff(before)
+>>> memory.disable_tracking()
+"""
+import collections
+import sys
+import weakref
+
+FIELDS = ('instances', 'object_bytes', 'args_bytes', 'kwds_bytes', 'undefined', 'errors', 'error_bytes')
+
+TRACKING = False
+
+# SchemaBase objects are not hashable, so they are keyed by id
+_live = weakref.WeakValueDictionary()
+
+
+def enable_tracking():
+    """Start recording SchemaBase objects as they are created"""
+    global TRACKING
+    TRACKING = True
+
+
+def disable_tracking():
+    """Stop recording new SchemaBase objects; recorded live objects are kept"""
+    global TRACKING
+    TRACKING = False
+
+
+def is_tracking():
+    return TRACKING
+
+
+def track(obj):
+    """Record obj as a live object; called on instantiation while tracking"""
+    _live[id(obj)] = obj
+
+
+def live_objects():
+    """Return a list of the tracked SchemaBase objects still alive"""
+    return list(_live.values())
+
+
+class MemorySnapshot(object):
+    """Memory held by SchemaBase objects, per class
+
+    Attributes
+    ----------
+    stats : dict
+        Maps class names ("module.ClassName") to dicts with the counters
+        listed in ``FIELDS``.
+    """
+    def __init__(self, stats=None):
+        self.stats = stats if stats is not None else {}
+
+    def __getitem__(self, name):
+        return self.stats[name]
+
+    def __iter__(self):
+        return iter(self.stats)
+
+    def __len__(self):
+        return len(self.stats)
+
+    def total(self):
+        """Return the counters summed over all classes"""
+        return {field: sum(stats[field] for stats in self.stats.values()) for field in FIELDS}
+
+    def diff(self, other):
+        """Return the change in each counter since the snapshot other
+
+        Classes whose counters did not change are left out.
+        """
+        stats = {}
+        for name in set(self.stats) | set(other.stats):
+            new = self.stats.get(name, {})
+            old = other.stats.get(name, {})
+            delta = {field: new.get(field, 0) - old.get(field, 0) for field in FIELDS}
+            if any(delta.values()):
+                stats[name] = delta
+        return MemorySnapshot(stats)
+
+    def report(self, sort='total_bytes', limit=None):
+        """Return a table of classes, largest first
+
+        Parameters
+        ----------
+        sort : string
+            'total_bytes' (default; the sum of all byte counters) or one of
+            the counters in ``FIELDS``.
+        limit : integer (optional)
+            The maximum number of rows to include.
+        """
+        if sort != 'total_bytes' and sort not in FIELDS:
+            raise ValueError("sort must be 'total_bytes' or one of {}".format(FIELDS))
+
+        def key(item):
+            stats = item[1]
+            if sort == 'total_bytes':
+                value = _total_bytes(stats)
+            else:
+                value = stats[sort]
+            return (-value, item[0])
+
+        rows = sorted(self.stats.items(), key=key)
+        if limit is not None:
+            rows = rows[:limit]
+        lines = [' '.join('{:>12}'.format(field) for field in FIELDS + ('total_bytes',)) + '  class']
+        for name, stats in rows:
+            values = [stats[field] for field in FIELDS] + [_total_bytes(stats)]
+            lines.append(' '.join('{:>12}'.format(value) for value in values) + '  ' + name)
+        return '\n'.join(lines) + '\n'
+
+
+def _total_bytes(stats):
+    return sum(stats[field] for field in FIELDS if field.endswith('_bytes'))
+
+
+def _sizeof(obj, seen, children):
+    """Return the size of obj and the native containers within it
+
+    Objects already in seen are not counted again. SchemaBase objects are
+    not counted, but appended to children.
+    """
+    from .schemaperfect import SchemaBase
+
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        if isinstance(obj, SchemaBase):
+            children.append(obj)
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+def _error_sizeof(error, seen):
+    """Return the size of a retained validation error and the data it holds
+
+    The schemas referenced by the error belong to the schema classes and are
+    not counted.
+    """
+    size = 0
+    for err in (error, getattr(error, '_err', None)):
+        if err is None or id(err) in seen:
+            continue
+        seen.add(id(err))
+        size += sys.getsizeof(err) + sys.getsizeof(err.__dict__)
+        for attr in ('path', 'schema_path', 'relative_path', 'relative_schema_path', 'context'):
+            size += _sizeof(getattr(err, attr, None), seen, [])
+        size += _sizeof(err.instance, seen, [])
+    return size
+
+
+def snapshot(*objs):
+    """Measure the memory held by SchemaBase objects
+
+    Parameters
+    ----------
+    *objs : SchemaBase objects
+        The roots of the trees to measure. If none are given, all tracked
+        objects which are still alive are measured (see ``enable_tracking``).
+
+    Returns
+    -------
+    snapshot : MemorySnapshot
+    """
+    from .schemaperfect import Undefined
+
+    if not objs:
+        objs = live_objects()
+    stats = collections.defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    seen = set()
+    stack = list(objs)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        cls = type(obj)
+        counters = stats['{}.{}'.format(cls.__module__, cls.__qualname__)]
+        counters['instances'] += 1
+        counters['object_bytes'] += sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+        counters['args_bytes'] += _sizeof(obj._args, seen, stack)
+        counters['kwds_bytes'] += _sizeof(obj._kwds, seen, stack)
+        counters['undefined'] += sum(1 for value in obj._kwds.values() if value is Undefined)
+        error = obj.__dict__.get('_validation_error')
+        if error is not None:
+            counters['errors'] += 1
+            counters['error_bytes'] += _error_sizeof(error, seen)
+    return MemorySnapshot(dict(stats))
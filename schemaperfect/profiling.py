@@ -0,0 +1,177 @@
+"""Attribution of validation cost to JSON schema paths
+
+Within a ``profile()`` block, every schema keyword evaluated while
+validating SchemaBase objects is counted and timed, and attributed to its
+location in the schema as a JSON pointer such as
+``#/definitions/Encoding/anyOf/3/type``. Schemas that are not part of a
+root schema (e.g. the ``{'$ref': ...}`` schema of a generated class) are
+labelled by the class that validated them, as in ``<Encoding>/$ref``.
+
+>>> import schemaperfect
+>>> with schemaperfect.profile() as prof:
+...     pass  # ... exercise SchemaBase objects ...
+>>> report = prof.report()
+>>> stacks = prof.collapsed()
+
+Results taken from or stored in the validation cache are not re-validated,
+and so are not attributed; disable the cache for a complete profile.
+"""
+import collections
+import contextlib
+import threading
+import time
+
+import jsonschema
+
+ACTIVE = None
+
+
+class ValidationProfile(object):
+    """Counts and times of schema keywords evaluated during validation
+
+    Attributes
+    ----------
+    stats : dict
+        Maps keyword paths to lists ``[count, seconds, self_seconds]``, where
+        ``seconds`` includes the time spent in nested keywords (e.g. the
+        branches of an ``anyOf``) and ``self_seconds`` excludes it.
+    stacks : dict
+        Maps tuples of nested keyword paths to the self time spent in the
+        innermost keyword.
+    """
+    def __init__(self):
+        self.stats = collections.defaultdict(lambda: [0, 0.0, 0.0])
+        self.stacks = collections.defaultdict(float)
+        self._paths = {}
+        self._roots = []
+        self._validators = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _index(self, schema, label):
+        """Record the path of every node of schema, unless already known"""
+        stack = [(schema, label)]
+        while stack:
+            node, path = stack.pop()
+            if id(node) in self._paths:
+                continue
+            self._paths[id(node)] = path
+            if isinstance(node, dict):
+                children = node.items()
+            else:
+                children = enumerate(node)
+            for key, child in children:
+                if isinstance(child, (dict, list)):
+                    key = str(key).replace('~', '~0').replace('/', '~1')
+                    stack.append((child, '{}/{}'.format(path, key)))
+        # keep indexed schemas alive, so that their ids are not reused
+        self._roots.append(schema)
+
+    def _instrument(self, cls, schema, rootschema, validator_class):
+        """Return a profiling version of validator_class for validating schema"""
+        with self._lock:
+            if id(rootschema) not in self._paths:
+                count = sum(path.endswith('#') for path in self._paths.values())
+                self._index(rootschema, 'root{}#'.format(count) if count else '#')
+            if id(schema) not in self._paths:
+                self._index(schema, '<{}>'.format(cls.__name__))
+            profiled = self._validators.get(validator_class)
+            if profiled is None:
+                profiled = jsonschema.validators.extend(validator_class, {
+                    keyword: self._wrap(keyword, func)
+                    for keyword, func in validator_class.VALIDATORS.items()})
+                self._validators[validator_class] = profiled
+        return profiled
+
+    def _wrap(self, keyword, func):
+        def profiled(validator, value, instance, schema):
+            frames = self._frames()
+            node = self._paths.get(id(schema))
+            if node is None:
+                node = (frames[-1][0] if frames else '') + '/?'
+            path = '{}/{}'.format(node, keyword)
+            frame = [path, 0.0]
+            frames.append(frame)
+            start = time.perf_counter()
+            try:
+                for error in func(validator, value, instance, schema) or ():
+                    yield error
+            finally:
+                seconds = time.perf_counter() - start
+                frames.pop()
+                if frames:
+                    frames[-1][1] += seconds
+                self._record(tuple(f[0] for f in frames) + (path,), seconds, seconds - frame[1])
+        return profiled
+
+    def _frames(self):
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _record(self, stack, seconds, self_seconds):
+        with self._lock:
+            stats = self.stats[stack[-1]]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += self_seconds
+            self.stacks[stack] += self_seconds
+
+    def report(self, sort='self_seconds', limit=None):
+        """Return a table of keyword paths, most expensive first
+
+        Parameters
+        ----------
+        sort : string
+            The column to sort by: 'self_seconds' (default), 'seconds' or
+            'count'.
+        limit : integer (optional)
+            The maximum number of rows to include.
+        """
+        columns = ('count', 'seconds', 'self_seconds')
+        if sort not in columns:
+            raise ValueError("sort must be one of {}".format(columns))
+        index = columns.index(sort)
+        rows = sorted(self.stats.items(), key=lambda item: (-item[1][index], item[0]))
+        if limit is not None:
+            rows = rows[:limit]
+        lines = ['{:>10} {:>12} {:>12}  {}'.format('count', 'seconds', 'self', 'path')]
+        for path, (count, seconds, self_seconds) in rows:
+            lines.append('{:>10} {:>12.6f} {:>12.6f}  {}'.format(count, seconds, self_seconds, path))
+        return '\n'.join(lines) + '\n'
+
+    def collapsed(self, stream=None):
+        """Return the profile in the collapsed-stack format of flamegraph tools
+
+        Each line holds a semicolon-separated stack of keyword paths and the
+        self time of the innermost one, in microseconds.
+
+        Parameters
+        ----------
+        stream : file-like object (optional)
+            If given, the text is also written to it.
+        """
+        lines = ['{} {}'.format(';'.join(stack), int(round(seconds * 1e6)))
+                 for stack, seconds in sorted(self.stacks.items())]
+        text = '\n'.join(lines) + '\n' if lines else ''
+        if stream is not None:
+            stream.write(text)
+        return text
+
+
+@contextlib.contextmanager
+def profile():
+    """Context manager profiling the validation within its block
+
+    Yields
+    ------
+    profile : ValidationProfile
+        The profile, filled in as validation runs within the block.
+    """
+    global ACTIVE
+    previous, ACTIVE = ACTIVE, ValidationProfile()
+    try:
+        yield ACTIVE
+    finally:
+        ACTIVE = previous
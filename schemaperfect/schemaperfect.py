@@ -1,9 +1,27 @@
+import asyncio
 import collections
 import contextlib
+import datetime
+import decimal
+import enum
+import functools
+import hashlib
+import itertools
 import json
+import math
+import random
+import re
+import sys
+import threading
+import uuid
+import weakref
 
 import jsonschema
 
+from . import instrumentation as _instrumentation
+from . import memory as _memory
+from . import profiling as _profiling
+
 # If ENABLE_VALIDATION_AT_INSTANTIATION is True, then schema objects are converted to dict and
 # validated at creation time. This slows things down, particularly for
 # larger specs, but leads to much more useful tracebacks for the user.
@@ -46,6 +64,329 @@ def debug_mode(arg):
         ENABLE_VALIDATION_AT_INSTANTIATION = original
 
 
+# VALIDATION_LEVEL is the level used wherever validation is requested with
+# validate=True (including validation at instantiation): True for full
+# validation, "deep", "shallow", or a Sample instance. Individual schema
+# classes can override it with the class-level _validation_level attribute.
+VALIDATION_LEVEL = True
+
+
+class Sample(object):
+    """A validation level that fully validates a random fraction of calls
+
+    Failures are counted rather than raised (unless raise_errors is True),
+    giving a cheap statistical check for data drifting away from the schema.
+    A Sample instance keeps its counters for as long as it is in use, so the
+    same instance can be shared between classes or replaced to reset them.
+
+    Parameters
+    ----------
+    rate : float
+        The fraction of calls to validate, between 0 and 1.
+    seed : int (optional)
+        Seed for the random number generator choosing calls to validate.
+    raise_errors : boolean
+        If True, re-raise validation errors of sampled calls.
+
+    Attributes
+    ----------
+    calls : int
+        The number of validations requested.
+    validated : int
+        The number of validations performed.
+    failures : int
+        The number of validations which failed.
+    last_error : jsonschema.ValidationError or None
+        The most recent failure.
+    """
+
+    def __init__(self, rate, seed=None, raise_errors=False):
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+        self.rate = rate
+        self.raise_errors = raise_errors
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.validated = 0
+        self.failures = 0
+        self.last_error = None
+
+    def _run(self, func, *args):
+        """Call func(*args) for the sampled fraction of calls, recording validation errors"""
+        self.calls += 1
+        if self._random.random() >= self.rate:
+            return
+        self.validated += 1
+        try:
+            func(*args)
+        except jsonschema.ValidationError as err:
+            self.failures += 1
+            self.last_error = err
+            if self.raise_errors:
+                raise
+
+    def __repr__(self):
+        return "Sample(rate={!r}, calls={}, validated={}, failures={})".format(
+            self.rate, self.calls, self.validated, self.failures)
+
+
+def _check_validation_level(level):
+    if not (isinstance(level, (bool, Sample)) or level in ('deep', 'shallow')):
+        raise ValueError("Unknown validation level {!r}: expected a boolean, "
+                         "'deep', 'shallow' or a Sample instance".format(level))
+
+
+def set_validation_level(level):
+    """Sets the validation level used when validation is requested with validate=True."""
+    global VALIDATION_LEVEL
+    _check_validation_level(level)
+    VALIDATION_LEVEL = level
+
+
+@contextlib.contextmanager
+def validation_level(level):
+    """Context manager temporarily setting the validation level"""
+    global VALIDATION_LEVEL
+    _check_validation_level(level)
+    original = VALIDATION_LEVEL
+    VALIDATION_LEVEL = level
+    try:
+        yield
+    finally:
+        VALIDATION_LEVEL = original
+
+
+_FINGERPRINT_SCALARS = frozenset([str, int, float, bool, type(None)])
+
+
+def _tag_containers(obj):
+    """Return obj with each container replaced by a dict tagged with its type
+
+    The items of dicts are listed as [key, value] pairs sorted by the JSON
+    of their keys, so that keys of different types remain distinct.
+    """
+    kind = type(obj)
+    if kind is dict:
+        items = sorted((json.dumps(key), _tag_containers(value)) for key, value in obj.items())
+        return {'dict': [[json.loads(key), value] for key, value in items]}
+    elif kind is list or kind is tuple:
+        return {kind.__name__: [_tag_containers(item) for item in obj]}
+    return obj
+
+
+class ValidationCache(object):
+    """A bounded LRU cache of validation results
+
+    Results are keyed by the identity of the schema and root schema and by
+    a fingerprint of the instance's content (a digest of a canonical,
+    type-tagged encoding), so repeated identical values are only validated
+    once, whatever the order of their keys. Values which validate
+    differently always have different fingerprints: e.g. NaN and None, lists
+    and tuples, 1 and 1.0, or the keys 1 and '1'. The fingerprint does not
+    depend on the JSON backend. Entries keep a reference to their schemas,
+    which therefore must not be modified while the cache is in use.
+    Instances holding anything but dicts, lists, tuples, strings, numbers,
+    booleans and None (of exactly these types) are not cached.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of results to keep; the least recently used
+        results are evicted first.
+    """
+
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(instance):
+        """Return a digest of the content of instance, or None if it cannot be cached"""
+        # only values of exactly these types are fingerprinted, as subclasses
+        # (e.g. enums) may validate differently from equal values; containers
+        # found twice may be cycles, and are not fingerprinted either
+        stack = [instance]
+        seen = set()
+        tagged = False
+        while stack:
+            obj = stack.pop()
+            kind = type(obj)
+            if kind in _FINGERPRINT_SCALARS:
+                continue
+            elif id(obj) in seen:
+                return None
+            seen.add(id(obj))
+            if kind is dict:
+                for key in obj:
+                    if type(key) is not str:
+                        if type(key) not in _FINGERPRINT_SCALARS:
+                            return None
+                        tagged = True
+                stack.extend(obj.values())
+            elif kind is list:
+                stack.extend(obj)
+            elif kind is tuple:
+                tagged = True
+                stack.extend(obj)
+            else:
+                return None
+        # the stdlib's JSON tells apart all other values which validate
+        # differently (e.g. NaN and None, 1 and 1.0); tuples and non-string
+        # keys need the containers to be tagged with their type
+        try:
+            if tagged:
+                data = b't' + json.dumps(_tag_containers(instance)).encode('utf-8')
+            else:
+                data = b'j' + json.dumps(instance, sort_keys=True).encode('utf-8')
+        except (RecursionError, TypeError, ValueError):
+            return None
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def lookup(self, schema, rootschema, instance, fingerprint=None):
+        """Return a (key, valid) tuple for instance
+
+        valid is True or False if the result is cached, and None otherwise.
+        key is passed to ``store`` to cache the result, and is None if the
+        instance cannot be cached. fingerprint, if given, is that of
+        instance, e.g. when it is looked up against several schemas, or False
+        if instance is already known not to be cacheable.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(instance)
+        if not fingerprint:
+            return None, None
+        key = (id(schema), id(rootschema), fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is schema and entry[1] is rootschema:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, entry[2]
+            self.misses += 1
+        return key, None
+
+    def store(self, key, schema, rootschema, valid):
+        """Cache the result of validating the instance with the given key"""
+        with self._lock:
+            self._entries[key] = (schema, rootschema, valid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all results and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Return the cache counters and size as a dict"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "ValidationCache({})".format(', '.join(
+            '{}={}'.format(key, val) for key, val in self.info().items()))
+
+
+# The validation cache is opt-in: None disables it.
+VALIDATION_CACHE = None
+
+
+def enable_validation_cache(maxsize=4096):
+    """Enables caching of validation results and returns the ValidationCache used"""
+    global VALIDATION_CACHE
+    VALIDATION_CACHE = ValidationCache(maxsize)
+    return VALIDATION_CACHE
+
+
+def disable_validation_cache():
+    """Disables caching of validation results"""
+    global VALIDATION_CACHE
+    VALIDATION_CACHE = None
+
+
+def get_validation_cache():
+    """Gets the ValidationCache in use, or None if caching is disabled"""
+    return VALIDATION_CACHE
+
+
+_TYPE_ONLY_KEYWORDS = ('additionalProperties', 'additionalItems', 'contains', 'propertyNames')
+_DROPPED_SHALLOW_KEYWORDS = ('definitions', 'not', 'if', 'then', 'else', 'dependencies')
+
+
+def _schema_types(schema, resolve):
+    """Return the list of JSON types allowed by schema, or None if it can't be determined"""
+    schema = resolve(schema)
+    if not isinstance(schema, dict):
+        return None
+    if 'type' in schema:
+        types = schema['type']
+        return [types] if isinstance(types, str) else list(types)
+    branches = schema.get('anyOf', []) + schema.get('oneOf', [])
+    if not branches:
+        return None
+    types = []
+    for branch in branches:
+        branch_types = _schema_types(branch, resolve)
+        if branch_types is None:
+            return None
+        types.extend(t for t in branch_types if t not in types)
+    return types
+
+
+def _type_only(schema, resolve):
+    """Reduce a subschema to a check of the type of the value"""
+    if isinstance(schema, bool):
+        return schema
+    types = _schema_types(schema, resolve)
+    if types is None:
+        return {}
+    return {'type': types[0] if len(types) == 1 else types}
+
+
+def _shallow_schema(schema, resolve):
+    """Reduce schema to its own keywords and the types of direct children
+
+    Subschemas applying to child values are reduced to their type, and
+    keywords whose reduction could reject valid data (not, if/then/else,
+    dependencies) are dropped; oneOf becomes anyOf for the same reason.
+    The result therefore accepts everything the full schema accepts.
+    """
+    schema = resolve(schema)
+    if not isinstance(schema, dict):
+        return schema
+    result = {}
+    for key, val in schema.items():
+        if key in _DROPPED_SHALLOW_KEYWORDS:
+            continue
+        elif key in ('properties', 'patternProperties'):
+            result[key] = {k: _type_only(v, resolve) for k, v in val.items()}
+        elif key in _TYPE_ONLY_KEYWORDS:
+            result[key] = _type_only(val, resolve)
+        elif key == 'items':
+            if isinstance(val, list):
+                result[key] = [_type_only(v, resolve) for v in val]
+            else:
+                result[key] = _type_only(val, resolve)
+        elif key in ('anyOf', 'oneOf', 'allOf'):
+            branches = [_shallow_schema(branch, resolve) for branch in val]
+            result.setdefault('allOf' if key == 'allOf' else 'anyOf', []).extend(branches)
+        else:
+            result[key] = val
+    return result
+
+
 METASCHEMA_VERSION = 'draft7'
 
 
@@ -63,6 +404,412 @@ def get_metaschema_version():
     return METASCHEMA_VERSION
 
 
+class JSONBackend(object):
+    """JSON encoder/decoder used by to_json and from_json, based on the stdlib json module
+
+    Alternative backends subclass this and override ``dumps_bytes`` (and
+    optionally ``dumps`` and ``loads``), deferring to the stdlib
+    implementation for arguments they do not support.
+    """
+    name = 'json'
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string; kwargs are those of ``json.dumps()``"""
+        return json.dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Serialize obj to UTF-8 encoded JSON bytes"""
+        return JSONBackend.dumps(self, obj, **kwargs).encode('utf-8')
+
+    def loads(self, data, **kwargs):
+        """Deserialize a JSON str or bytes object; kwargs are those of ``json.loads()``"""
+        return json.loads(data, **kwargs)
+
+
+# floats which orjson writes in exponent notation, which differs from that of
+# the stdlib (1e16 rather than 1e+16); may also match within strings
+_EXPONENT_FLOAT = re.compile(rb'[0-9]e-?[0-9]')
+# integers which may not fit in 64 bits, which orjson parses as floats; may
+# also match within strings and floats
+_LONG_INTEGER = re.compile('[0-9]{19}')
+_LONG_INTEGER_BYTES = re.compile(_LONG_INTEGER.pattern.encode('ascii'))
+
+
+def _has_nonfinite_float(obj):
+    """Return whether obj holds NaN or an infinite float"""
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            if not math.isfinite(obj):
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+class OrjsonBackend(JSONBackend):
+    """JSON backend using the optional orjson package
+
+    The output is the same as that of the stdlib: orjson is only used for
+    the arguments it supports (``indent`` of 2 with the default separators,
+    or no indent with ``separators=(',', ':')``, ``sort_keys`` and
+    ``ensure_ascii``), and the stdlib is used instead when orjson's output
+    would differ, i.e. for non-ASCII text and DEL (``\\x7f``) unless
+    ``ensure_ascii=False``, non-finite floats and floats written in exponent
+    notation, or data orjson encodes differently or not at all (e.g.
+    subclasses of builtin types, datetimes or non-string keys). Likewise,
+    text orjson
+    cannot parse (e.g. ``NaN``) or would parse differently (integers beyond
+    64 bits, which orjson turns into floats) is parsed by the stdlib.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def _option(self, indent=None, sort_keys=False, ensure_ascii=True, separators=None, **kwargs):
+        if kwargs:
+            return None
+        # types the stdlib cannot encode are passed to the (missing) default
+        # function, so that they fall back to the stdlib and raise there
+        option = (self._orjson.OPT_PASSTHROUGH_DATACLASS | self._orjson.OPT_PASSTHROUGH_DATETIME |
+                  self._orjson.OPT_PASSTHROUGH_SUBCLASS)
+        if indent == 2 and separators in (None, (',', ': ')):
+            option |= self._orjson.OPT_INDENT_2
+        elif not (indent is None and separators == (',', ':')):
+            return None
+        if sort_keys:
+            option |= self._orjson.OPT_SORT_KEYS
+        return option
+
+    def _dumps(self, obj, option, ensure_ascii=True, **kwargs):
+        """Return the output of orjson, or None if it would differ from that of the stdlib"""
+        try:
+            data = self._orjson.dumps(obj, option=option)
+        except TypeError:
+            return None
+        # the stdlib escapes DEL, which is ASCII, as well as non-ASCII text
+        if ensure_ascii and (not data.isascii() or b'\x7f' in data):
+            return None
+        if _EXPONENT_FLOAT.search(data) or (b'null' in data and _has_nonfinite_float(obj)):
+            return None
+        return data
+
+    def dumps(self, obj, **kwargs):
+        option = self._option(**kwargs)
+        data = self._dumps(obj, option, **kwargs) if option is not None else None
+        if data is None:
+            return JSONBackend.dumps(self, obj, **kwargs)
+        return data.decode('utf-8')
+
+    def dumps_bytes(self, obj, **kwargs):
+        option = self._option(**kwargs)
+        if option is not None:
+            data = self._dumps(obj, option, **kwargs)
+            if data is not None:
+                return data
+        return JSONBackend.dumps_bytes(self, obj, **kwargs)
+
+    def loads(self, data, **kwargs):
+        long_integer = _LONG_INTEGER if isinstance(data, str) else _LONG_INTEGER_BYTES
+        if not kwargs and not long_integer.search(data):
+            try:
+                return self._orjson.loads(data)
+            except self._orjson.JSONDecodeError:
+                pass
+        return JSONBackend.loads(self, data, **kwargs)
+
+
+_JSON_BACKENDS = {'json': JSONBackend, 'orjson': OrjsonBackend}
+JSON_BACKEND = None
+
+
+def set_json_backend(backend='auto'):
+    """Sets the JSON backend used by to_json and from_json.
+
+    Parameters
+    ----------
+    backend : string or JSONBackend
+        "json" for the stdlib (the default backend), "orjson", a JSONBackend
+        instance, or "auto" (default) to use orjson when it is installed and
+        the stdlib otherwise.
+    """
+    global JSON_BACKEND
+    if backend == 'auto':
+        try:
+            backend = OrjsonBackend()
+        except ImportError:
+            backend = JSONBackend()
+    elif isinstance(backend, str):
+        if backend not in _JSON_BACKENDS:
+            raise ValueError('Unknown JSON backend {!r}; expected one of {}'
+                             ''.format(backend, sorted(_JSON_BACKENDS)))
+        backend = _JSON_BACKENDS[backend]()
+    JSON_BACKEND = backend
+
+
+def get_json_backend():
+    """Gets the JSON backend used by to_json and from_json (by default the stdlib)."""
+    global JSON_BACKEND
+    if JSON_BACKEND is None:
+        JSON_BACKEND = JSONBackend()
+    return JSON_BACKEND
+
+
+# Executor and concurrency limit used by the awaitable SchemaBase methods
+# (ato_dict, ato_json, afrom_json, avalidate). An executor of None uses the
+# event loop's default thread pool.
+ASYNC_EXECUTOR = None
+ASYNC_MAX_CONCURRENCY = None
+_async_semaphores = weakref.WeakKeyDictionary()
+
+
+def set_async_executor(executor=None, max_concurrency=None):
+    """Sets the executor used by the awaitable SchemaBase methods.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor (optional)
+        The executor running validation and (de)serialization. If None
+        (default), the event loop's default executor is used. With a
+        ProcessPoolExecutor, objects and classes must be picklable, and state
+        such as ``validation_error`` is only set in the worker process.
+    max_concurrency : int (optional)
+        The maximum number of calls allowed to run at once on each event
+        loop; further calls wait for a free slot. None (default) means no limit.
+    """
+    global ASYNC_EXECUTOR, ASYNC_MAX_CONCURRENCY
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError("max_concurrency must be a positive integer or None")
+    ASYNC_EXECUTOR = executor
+    ASYNC_MAX_CONCURRENCY = max_concurrency
+    _async_semaphores.clear()
+
+
+async def _run_in_executor(func, *args, **kwargs):
+    """Run func(*args, **kwargs) in the configured executor without blocking the event loop"""
+    loop = asyncio.get_event_loop()
+    call = functools.partial(func, *args, **kwargs)
+    if ASYNC_MAX_CONCURRENCY is None:
+        return await loop.run_in_executor(ASYNC_EXECUTOR, call)
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _async_semaphores[loop] = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+    async with semaphore:
+        return await loop.run_in_executor(ASYNC_EXECUTOR, call)
+
+
+class InputLimitError(ValueError):
+    """Raised when input to from_dict or from_json exceeds an InputLimits budget
+
+    Attributes
+    ----------
+    limit : string
+        The name of the exceeded limit, e.g. 'max_depth'.
+    maximum : integer
+        The configured value of the limit.
+    """
+    def __init__(self, limit, maximum, path=()):
+        self.limit = limit
+        self.maximum = maximum
+        self.path = tuple(path)
+        location = ' at {}'.format('/'.join(map(str, self.path))) if self.path else ''
+        super(InputLimitError, self).__init__('Input exceeds {}={}{}'.format(limit, maximum, location))
+
+    def __reduce__(self):
+        return (self.__class__, (self.limit, self.maximum, self.path))
+
+
+class InputLimits(object):
+    """Budget for untrusted input to from_dict and from_json
+
+    The structure of the input is checked in a single pass before it is
+    validated or converted, so that oversized input fails fast with an
+    InputLimitError. A limit of None (the default) is not enforced.
+
+    Parameters
+    ----------
+    max_depth : integer (optional)
+        The maximum nesting depth of lists and dicts; a scalar has depth 0
+        and ``{'a': [1]}`` depth 2.
+    max_nodes : integer (optional)
+        The maximum number of values (dicts, lists and scalars) in the input.
+        The items of a container are all counted when it is reached, so
+        that a single huge list or dict fails without being walked.
+    max_string_length : integer (optional)
+        The maximum length of string values and dict keys.
+    max_array_length : integer (optional)
+        The maximum number of items of a list.
+    max_union_attempts : integer (optional)
+        The maximum number of anyOf/oneOf branches tried while converting
+        the input to SchemaBase objects, over the whole conversion.
+    max_json_length : integer (optional)
+        The maximum length of the JSON text given to from_json, in
+        characters (or bytes).
+
+    The JSON text given to from_json is checked against max_json_length and
+    max_depth before it is parsed, so that deeply nested text cannot
+    exhaust the parser's stack.
+    """
+    def __init__(self, max_depth=None, max_nodes=None, max_string_length=None,
+                 max_array_length=None, max_union_attempts=None, max_json_length=None):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_string_length = max_string_length
+        self.max_array_length = max_array_length
+        self.max_union_attempts = max_union_attempts
+        self.max_json_length = max_json_length
+
+    def __repr__(self):
+        args = ('{}={!r}'.format(key, val) for key, val in self.__dict__.items() if val is not None)
+        return '{}({})'.format(self.__class__.__name__, ', '.join(args))
+
+    def check(self, instance):
+        """Raise InputLimitError if the structure of instance exceeds the limits"""
+        max_depth, max_nodes = self.max_depth, self.max_nodes
+        max_string, max_array = self.max_string_length, self.max_array_length
+        if max_depth is None and max_nodes is None and max_string is None and max_array is None:
+            return
+        # the items of each container are charged to the node budget as soon
+        # as it is reached, and the limits of a container are checked before
+        # its items are pushed, so that oversized input fails immediately
+        nodes = 1
+        if max_nodes is not None and nodes > max_nodes:
+            raise InputLimitError('max_nodes', max_nodes, ())
+        # entries are (value, depth, parent entry, key) so that the path of
+        # the offending value is only built on failure; scalars other than
+        # strings are only counted, and never pushed
+        containers = (dict, list, tuple)
+        pushed = containers + (str,) if max_string is not None else containers
+        stack = [(instance, 0, None, None)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            entry = pop()
+            value, depth = entry[0], entry[1]
+            if isinstance(value, str):
+                if max_string is not None and len(value) > max_string:
+                    raise InputLimitError('max_string_length', max_string, _entry_path(entry))
+                continue
+            elif not isinstance(value, containers):
+                continue
+            elif isinstance(value, dict):
+                if max_string is not None:
+                    for key in value:
+                        if isinstance(key, str) and len(key) > max_string:
+                            raise InputLimitError('max_string_length', max_string, _entry_path(entry) + (key,))
+            elif max_array is not None and len(value) > max_array:
+                raise InputLimitError('max_array_length', max_array, _entry_path(entry))
+            if not value:
+                continue
+            if max_depth is not None and depth >= max_depth:
+                raise InputLimitError('max_depth', max_depth, _entry_path(entry))
+            if max_nodes is not None and nodes + len(value) > max_nodes:
+                # the path of the first item beyond the budget
+                index = max_nodes - nodes
+                key = next(itertools.islice(value, index, None)) if isinstance(value, dict) else index
+                raise InputLimitError('max_nodes', max_nodes, _entry_path(entry) + (key,))
+            nodes += len(value)
+            if isinstance(value, dict):
+                items = [(key, val) for key, val in value.items() if isinstance(val, pushed)]
+                for key, val in reversed(items):
+                    push((val, depth + 1, entry, key))
+            else:
+                for i in range(len(value) - 1, -1, -1):
+                    if isinstance(value[i], pushed):
+                        push((value[i], depth + 1, entry, i))
+
+
+    def check_json(self, json_text):
+        """Raise InputLimitError if json_text (str or bytes) exceeds the limits
+
+        Only the length of the text and the nesting of its brackets (outside
+        of strings) are checked; the parsed value is to be checked with
+        ``check``. Text nested more deeply than max_depth allows always
+        raises, whether or not it is valid JSON.
+        """
+        if self.max_json_length is not None and len(json_text) > self.max_json_length:
+            raise InputLimitError('max_json_length', self.max_json_length)
+        # the innermost non-empty container is at depth nesting - 2
+        if self.max_depth is not None and _json_nesting_exceeds(json_text, self.max_depth + 1):
+            raise InputLimitError('max_depth', self.max_depth)
+
+
+_NOT_BRACKETS = bytes(set(range(256)) - set(b'[]{}'))
+_BRACKETS = bytes.maketrans(b'[{]}', b'(())')
+
+
+def _json_nesting_exceeds(text, limit):
+    """Return True if the brackets of JSON text outside of strings nest more than limit deep
+
+    The text is reduced to its brackets with bytes operations, and matched
+    pairs of brackets are removed, innermost first, at most limit times: if
+    brackets remain, their nesting is computed character by character. Text
+    of ordinary depth is thus checked without being walked in Python.
+    """
+    if isinstance(text, str):
+        text = text.encode('utf-8', 'surrogatepass')
+    text = bytes(text)
+    if text.count(b'[') + text.count(b'{') <= limit:
+        return False
+    if b'\\' in text:
+        # escaped backslashes first, so that those before a quote are not
+        # taken for the escape of the quote
+        text = text.replace(b'\\\\', b'').replace(b'\\"', b'')
+    brackets = b''.join(text.split(b'"')[::2]).translate(_BRACKETS, _NOT_BRACKETS)
+    passes = 0
+    while passes < limit and b'()' in brackets:
+        brackets = brackets.replace(b'()', b'')
+        passes += 1
+    if not brackets:
+        return False
+    deltas = (1 if char == ord('(') else -1 for char in brackets)
+    return passes + max(itertools.accumulate(deltas)) > limit
+
+
+def _entry_path(entry):
+    path = []
+    while entry[2] is not None:
+        path.append(entry[3])
+        entry = entry[2]
+    return tuple(reversed(path))
+
+
+INPUT_LIMITS = None
+
+
+def set_input_limits(limits=None, **kwargs):
+    """Set the InputLimits applied by from_dict and from_json
+
+    Either pass an InputLimits object, or its parameters as keyword
+    arguments. Calling with no arguments removes all limits.
+    """
+    global INPUT_LIMITS
+    if kwargs:
+        if limits is not None:
+            raise ValueError("Pass either an InputLimits object or keyword arguments, not both")
+        limits = InputLimits(**kwargs)
+    INPUT_LIMITS = limits
+
+
+def get_input_limits():
+    return INPUT_LIMITS
+
+
+@contextlib.contextmanager
+def input_limits(limits=None, **kwargs):
+    """Temporarily set the InputLimits applied by from_dict and from_json"""
+    previous = INPUT_LIMITS
+    set_input_limits(limits, **kwargs)
+    try:
+        yield INPUT_LIMITS
+    finally:
+        set_input_limits(previous)
+
+
 class SchemaValidationError(jsonschema.ValidationError):
     """A wrapper for jsonschema.ValidationError with friendlier traceback"""
 
@@ -70,7 +817,22 @@ class SchemaValidationError(jsonschema.ValidationError):
         super(SchemaValidationError, self).__init__(**self._get_contents(err))
         self._err = err
         self.obj = obj
-        self.message = str(self)
+
+    @property
+    def message(self):
+        """The formatted error message, built on first access"""
+        if self._formatted_message is None:
+            self._formatted_message = str(self)
+        return self._formatted_message
+
+    @message.setter
+    def message(self, value):
+        self._raw_message = value
+        self._formatted_message = None
+
+    def __reduce__(self):
+        # allows errors raised in a process executor to reach the caller
+        return (self.__class__, (self.obj, self._err))
 
     @staticmethod
     def _get_contents(err):
@@ -90,7 +852,47 @@ class SchemaValidationError(jsonschema.ValidationError):
         {}, validating {!r}
 
         {}
-        """.format(schema_path, self.validator, self.message)
+        """.format(schema_path, self.validator, self._raw_message)
+
+
+class ValidationErrorRecord(object):
+    """A lightweight record of a validation failure, as returned by SchemaBase.check
+
+    The full message is only formatted when ``message`` is read or the record
+    is converted to a SchemaValidationError.
+    """
+    __slots__ = ('obj', 'error')
+
+    def __init__(self, obj, error):
+        self.obj = obj
+        self.error = error
+
+    @property
+    def path(self):
+        """The path to the failing value within the object's dict representation"""
+        return tuple(self.error.absolute_path)
+
+    @property
+    def schema_path(self):
+        """The path to the failing keyword within the object's schema"""
+        return tuple(self.error.absolute_schema_path)
+
+    @property
+    def validator(self):
+        """The name of the failing keyword"""
+        return self.error.validator
+
+    @property
+    def message(self):
+        return self.to_exception().message
+
+    def to_exception(self):
+        """Return the SchemaValidationError describing this failure"""
+        return SchemaValidationError(self.obj, self.error)
+
+    def __repr__(self):
+        return "ValidationErrorRecord(path={!r}, validator={!r}, schema_path={!r})".format(
+            self.path, self.validator, self.schema_path)
 
 
 class UndefinedType(object):
@@ -109,17 +911,219 @@ class UndefinedType(object):
 Undefined = UndefinedType()
 
 
+_JSON_NATIVE_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def _decimal_to_float(val):
+    """Convert a Decimal to the float with the same value
+
+    Raises
+    ------
+    ValueError :
+        if no float has exactly the value of val (e.g. Decimal('0.1') is
+        converted to 0.1, but Decimal('0.10000000000000000001') raises).
+    """
+    result = float(val)
+    if decimal.Decimal(repr(result)) != val:
+        raise ValueError("{!r} cannot be converted to a float without losing precision; "
+                         "register a converter for decimal.Decimal to serialize it "
+                         "differently (e.g. as a string)".format(val))
+    return result
+
+
+# Leaf converters used by SchemaBase.to_dict, keyed by exact type. Lookups for
+# types without an entry walk the MRO once and the outcome is cached.
+_converters = {
+    datetime.datetime: datetime.datetime.isoformat,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: datetime.time.isoformat,
+    decimal.Decimal: _decimal_to_float,
+    uuid.UUID: str,
+    enum.Enum: lambda val: val.value,
+}
+_converter_cache = {}
+
+
+def register_converter(type_, converter):
+    """Register a function converting instances of type_ in to_dict
+
+    The converter is called with the value and must return a JSON-compatible
+    object; its output is not traversed any further. It applies to type_ and
+    to all subclasses of type_ without a more specific converter.
+
+    The built-in converters write dates, times and datetimes in ISO format,
+    UUIDs as strings, enums as their values and Decimals as floats. A
+    Decimal is only converted if a float has exactly its value, and raises
+    a ValueError otherwise, rather than silently losing precision.
+
+    >>> register_converter(complex, lambda val: [val.real, val.imag])
+    >>> get_converter(complex)(1 + 2j)
+    [1.0, 2.0]
+    >>> unregister_converter(complex)
+    """
+    _converters[type_] = converter
+    _converter_cache.clear()
+
+
+def unregister_converter(type_):
+    """Remove the converter registered for type_"""
+    del _converters[type_]
+    _converter_cache.clear()
+
+
+def get_converter(type_):
+    """Return the to_dict converter for type_, or None if there is none
+
+    numpy arrays and scalars are converted to native Python objects unless a
+    converter has been registered for them.
+    """
+    try:
+        return _converter_cache[type_]
+    except KeyError:
+        pass
+    converter = None
+    for base in type_.__mro__:
+        if base in _converters:
+            converter = _converters[base]
+            break
+    else:
+        np = sys.modules.get('numpy')
+        if np is not None and issubclass(type_, np.ndarray):
+            converter = np.ndarray.tolist
+        elif np is not None and issubclass(type_, np.generic):
+            converter = np.generic.item
+    _converter_cache[type_] = converter
+    return converter
+
+
+_NUMERIC_ARRAY_KEYWORDS = frozenset(['type', 'items', 'minItems', 'maxItems',
+                                     'title', 'description'])
+_NUMERIC_ITEM_KEYWORDS = frozenset(['type', 'minimum', 'maximum', 'exclusiveMinimum',
+                                    'exclusiveMaximum', 'multipleOf', 'title', 'description'])
+
+
+def _is_numeric_ndarray(val):
+    """Return True if val is a one-dimensional numpy array of integers or floats
+
+    numpy is never imported here: if it has not been imported yet, val cannot
+    be an array.
+    """
+    np = sys.modules.get('numpy')
+    return (np is not None and isinstance(val, np.ndarray)
+            and val.ndim == 1 and val.dtype.kind in 'iuf')
+
+
+def _numeric_items_schema(schema, resolve):
+    """Return the resolved items schema if schema is a plain array of numbers
+
+    Only schemas made up entirely of keywords which can be checked with
+    vectorized numpy operations qualify; for anything else None is returned
+    and validation falls back to jsonschema.
+    """
+    if (not isinstance(schema, dict) or schema.get('type') != 'array'
+            or not _NUMERIC_ARRAY_KEYWORDS.issuperset(schema)):
+        return None
+    items = schema.get('items')
+    if not isinstance(items, dict):
+        return None
+    items = resolve(items)
+    if (items.get('type') not in ('number', 'integer')
+            or not _NUMERIC_ITEM_KEYWORDS.issuperset(items)):
+        return None
+    return items
+
+
+def _validate_numeric_array(arr, schema, items, path=(), schema_path=()):
+    """Validate a numpy array against a numeric array schema using vectorized operations
+
+    Raises
+    ------
+    jsonschema.ValidationError :
+        describing the first failing keyword, with the same path, schema path
+        and validator fields jsonschema would report.
+    """
+    np = sys.modules['numpy']
+
+    def fail(message, validator, index=None):
+        if index is None:
+            instance, error_path = arr, path
+            keyword_path, error_schema = (validator,), schema
+        else:
+            instance, error_path = arr[index].item(), path + (index,)
+            keyword_path, error_schema = ('items', validator), items
+        raise jsonschema.ValidationError(message, validator=validator,
+                                         validator_value=error_schema[validator],
+                                         path=error_path, instance=instance,
+                                         schema=error_schema,
+                                         schema_path=schema_path + keyword_path)
+
+    if 'minItems' in schema and len(arr) < schema['minItems']:
+        fail('array of {} items is too short'.format(len(arr)), 'minItems')
+    if 'maxItems' in schema and len(arr) > schema['maxItems']:
+        fail('array of {} items is too long'.format(len(arr)), 'maxItems')
+    if not len(arr):
+        return
+
+    def check(failed, message, validator):
+        bad = np.flatnonzero(failed)
+        if len(bad):
+            index = int(bad[0])
+            fail(message.format(arr[index].item(), items[validator]), validator, index)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if items['type'] == 'integer' and arr.dtype.kind == 'f':
+            check(~np.isfinite(arr) | (arr != np.floor(arr)),
+                  "{!r} is not of type {!r}", 'type')
+
+        minimum, maximum = items.get('minimum'), items.get('maximum')
+        exclusive_minimum = items.get('exclusiveMinimum')
+        exclusive_maximum = items.get('exclusiveMaximum')
+        if minimum is not None:
+            if exclusive_minimum is True:  # draft 4 boolean modifier
+                check(arr <= minimum, "{!r} is less than or equal to the minimum of {!r}", 'minimum')
+            else:
+                check(arr < minimum, "{!r} is less than the minimum of {!r}", 'minimum')
+        if maximum is not None:
+            if exclusive_maximum is True:
+                check(arr >= maximum, "{!r} is greater than or equal to the maximum of {!r}", 'maximum')
+            else:
+                check(arr > maximum, "{!r} is greater than the maximum of {!r}", 'maximum')
+        if not isinstance(exclusive_minimum, (bool, type(None))):
+            check(arr <= exclusive_minimum,
+                  "{!r} is less than or equal to the minimum of {!r}", 'exclusiveMinimum')
+        if not isinstance(exclusive_maximum, (bool, type(None))):
+            check(arr >= exclusive_maximum,
+                  "{!r} is greater than or equal to the maximum of {!r}", 'exclusiveMaximum')
+
+        multiple_of = items.get('multipleOf')
+        if multiple_of is not None:
+            if isinstance(multiple_of, float) or arr.dtype.kind == 'f':
+                quotient = arr / multiple_of
+                failed = quotient != np.trunc(quotient)
+            else:
+                failed = arr % multiple_of != 0
+            check(failed, "{!r} is not a multiple of {!r}", 'multipleOf')
+
+
+_shallow_schemas = weakref.WeakKeyDictionary()
+
+
 class SchemaBase(object):
     """Base class for schema wrappers.
 
     Each derived class should set the _schema class attribute (and optionally
-    the _rootschema class attribute) which is used for validation.
+    the _rootschema class attribute) which is used for validation. Classes
+    standing for several structurally identical schemas list the others in
+    _schema_aliases, so that from_dict maps them all to the class.
     """
     _schema = None
     _rootschema = None
+    _schema_aliases = ()
     _property_names = None
     _class_is_valid_at_instantiation = True
+    _validation_level = None
 
+    @_instrumentation.instrumented('instantiate')
     def __init__(self, *args, **kwds):
         # Two valid options for initialization, which should be handled by
         # derived classes:
@@ -140,12 +1144,15 @@ class SchemaBase(object):
         self._args = args
         self._kwds = kwds
         self._validation_error = None
+        if _memory.TRACKING:
+            _memory.track(self)
 
         if ENABLE_VALIDATION_AT_INSTANTIATION and self._class_is_valid_at_instantiation:
             self.to_dict(validate=True)
 
 
 
+    @_instrumentation.instrumented('copy')
     def copy(self, deep=True, exclude: typing.Optional[typing.Union[typing.AbstractSet, typing.Sequence]] = None):
         """Return a copy of the object
 
@@ -159,31 +1166,14 @@ class SchemaBase(object):
             only stored by reference.
         """
 
-        def _deep_copy(obj, exclude=()):
-            if isinstance(obj, SchemaBase):
-                args = tuple(_deep_copy(arg) for arg in obj._args)
-                kwds = {k: (_deep_copy(v, exclude=exclude)
-                            if k not in exclude else v)
-                        for k, v in obj._kwds.items()}
-                with debug_mode(False):
-                    return obj.__class__(*args, **kwds)
-            elif isinstance(obj, typing.Sequence) and not isinstance(obj, str):
-                return [_deep_copy(v, exclude=exclude) for v in obj]
-            elif isinstance(obj, typing.Mapping):
-                return {k: (_deep_copy(v, exclude=exclude)
-                            if k not in exclude else v)
-                        for k, v in obj.items()}
-            else:
-                return obj
-
         if exclude is None:
             exclude = ()
         exclude = frozenset(exclude)
 
-        if deep:
-            return _deep_copy(self, exclude=exclude)
-        else:
-            with debug_mode(False):
+        with debug_mode(False):
+            if deep:
+                return _deep_copy(self, exclude)
+            else:
                 return self.__class__(*self._args, **self._kwds)
 
     def __getattr__(self, attr):
@@ -228,17 +1218,55 @@ class SchemaBase(object):
     @property
     def is_valid(self) -> bool:
         """Checks if the instance is currently valid and returns bool. Validation error can be obtained via 'instance.validation_error'"""
-        try:
-            self.to_dict(validate=True)
-            return True
-        except SchemaValidationError:
+        errors = self.check(first=True)
+        if errors:
+            object.__setattr__(self, '_validation_error', errors[0].to_exception())
             return False
+        return True
 
     @property
     def validation_error(self):
         """The latest validation error for this instance."""
-        return object.__getattr__(self, '_validation_error')
+        return object.__getattribute__(self, '_validation_error')
+
+    def iter_errors(self, context: typing.Optional[typing.Mapping] = None):
+        """Iterate over the validation errors of this object without raising
+
+        Errors are yielded as ValidationErrorRecord objects as soon as they
+        are found, so iteration can be stopped early.
+
+        Parameters
+        ----------
+        context : dict (optional)
+            A context dictionary that will be passed to all child to_dict
+            function calls
+        """
+        result = self.to_dict(validate=False, context=context)
+        for error in self._iter_result_errors(result):
+            yield ValidationErrorRecord(self, error)
 
+    def check(self, first=False, context: typing.Optional[typing.Mapping] = None):
+        """Return a list of the validation errors of this object without raising
+
+        Parameters
+        ----------
+        first : boolean
+            If True, stop at the first error found.
+        context : dict (optional)
+            A context dictionary that will be passed to all child to_dict
+            function calls
+
+        Returns
+        -------
+        errors : list of ValidationErrorRecord
+            Empty if the object is valid.
+        """
+        errors = self.iter_errors(context=context)
+        if first:
+            return list(itertools.islice(errors, 1))
+        return list(errors)
+
+    @_instrumentation.instrumented('to_dict')
     def to_dict(self,
                 validate=True,
                 include: typing.Optional[typing.Union[typing.AbstractSet, typing.Sequence]] = None,
@@ -248,11 +1276,17 @@ class SchemaBase(object):
 
         Parameters
         ----------
-        validate : boolean or string
+        validate : boolean, string or Sample
             If True (default), then validate the output dictionary
-            against the schema. If "deep" then recursively validate
-            all objects in the spec. This takes much more time, but
-            it results in friendlier tracebacks for large objects.
+            against the schema at the level set for the class or by
+            ``validation_level`` (full validation unless set otherwise).
+            If "deep" then every object in the spec
+            validates its own output, and parents skip the parts already
+            validated by their children. This takes more time, but it
+            results in friendlier tracebacks for large objects.
+            If "shallow", only check the object's own keywords and the types
+            of its direct children. A Sample instance fully validates a
+            random fraction of calls and counts the failures.
         include : list
             A list of property names / keys to include. Defaults to self._property_names. Not passed to recursive calls.
         exclude : list
@@ -280,45 +1314,181 @@ class SchemaBase(object):
         if context is None:
             context = {}
 
-        sub_validate = 'deep' if validate == 'deep' else False
-
-        def _todict(val):
-            if isinstance(val, SchemaBase):
-                return val.to_dict(validate=sub_validate, context=context)
-            elif isinstance(val, typing.Sequence):
-                if not isinstance(val, str):
-                    return [_todict(v) for v in val]
-                else:
-                    return str(val)
-            elif isinstance(val, (set, frozenset)):
-                return list(sorted(map(_todict, val)))
-            elif isinstance(val, typing.Mapping):
-                return {k: _todict(v) for k, v in val.items()
-                        if v is not Undefined}
-            elif str(getattr(type(val), '__name__')).startswith('numpy'):  # convert most numpy types to python native.
-                return val.item()
-            else:
-                return val
+        validate = self._get_validation_level(validate)
+        return _to_dict(self, validate, include, exclude, context)
 
+    def _payload(self, include=None, exclude=None):
+        """Return the value or the dict of properties to be serialized by to_dict"""
         if self._args and not self._kwds:
-            result = _todict(self._args[0])
+            return self._args[0]
         elif not self._args:
-            _keys = tuple(self._kwds.keys())
-            if include is not None:
-                _keys = tuple(k for k in _keys if k in include)
-            if exclude is not None:
-                _keys = tuple(k for k in _keys if k not in exclude)
-            result = _todict({k: self._kwds[k] for k in _keys if self._kwds[k] is not Undefined})
+            kwds = self._kwds
+            return {k: v for k, v in kwds.items()
+                    if v is not Undefined
+                    and (include is None or k in include)
+                    and (exclude is None or k not in exclude)}
         else:
             raise ValueError("{} instance has both a value and properties : "
                              "cannot serialize to dict".format(self.__class__))
-        if validate:
-            try:
-                self.validate(result)
-            except jsonschema.ValidationError as err:
-                object.__setattr__(self, '_validation_error', SchemaValidationError(self, err))
-                raise self._validation_error
-        return result
+
+    @classmethod
+    def _get_validation_level(cls, validate):
+        """Return the validation level requested by the validate argument
+
+        validate=True stands for the class-level _validation_level if set, and
+        the level set by set_validation_level/validation_level otherwise.
+        """
+        if validate is True:
+            if cls._validation_level is not None:
+                return cls._validation_level
+            return VALIDATION_LEVEL
+        return validate
+
+    @classmethod
+    def _shallow_schema(cls):
+        """Return the reduced class schema used for validate='shallow'"""
+        try:
+            return _shallow_schemas[cls]
+        except KeyError:
+            schema = _shallow_schemas[cls] = _shallow_schema(cls._schema, cls.resolve_references)
+            return schema
+
+    def _validate_result(self, result, level=True):
+        """Validate the output of to_dict against the class schema at the given level"""
+        if isinstance(level, Sample):
+            level._run(self._check_result, result)
+        else:
+            self._check_result(result, level)
+
+    @_instrumentation.instrumented('validate')
+    def _check_result(self, result, level=True):
+        """Run the validation of _validate_result, for a level other than a Sample"""
+        if level == 'shallow':
+            errors = self._get_validator(self._shallow_schema()).iter_errors(result)
+        else:
+            errors = self._iter_result_errors(result, deep=level == 'deep')
+        error = jsonschema.exceptions.best_match(errors)
+        if error is not None:
+            object.__setattr__(self, '_validation_error', SchemaValidationError(self, error))
+            raise self._validation_error
+
+    def _iter_result_errors(self, result, deep=False):
+        """Iterate over the errors of validating the output of to_dict
+
+        One-dimensional numpy arrays of numbers, whether wrapped directly or
+        assigned to properties whose schema is a plain array of numbers, are
+        checked with vectorized numpy operations; jsonschema then validates
+        the rest of the result without descending into them.
+
+        If deep is True, all SchemaBase children have already validated
+        themselves, and the subschemas they are known to satisfy are skipped.
+        """
+        schema = self._schema
+        if sys.modules.get('numpy') is not None:
+            resolved = self.resolve_references(schema)
+            if self._args and not self._kwds:
+                if _is_numeric_ndarray(self._args[0]):
+                    items = _numeric_items_schema(resolved, self.resolve_references)
+                    if items is not None:
+                        try:
+                            _validate_numeric_array(self._args[0], resolved, items)
+                        except jsonschema.ValidationError as err:
+                            yield err
+                        return
+            else:
+                properties = resolved.get('properties', {})
+                checked = []
+                for key, val in self._kwds.items():
+                    if key not in result or key not in properties or not _is_numeric_ndarray(val):
+                        continue
+                    prop_schema = self.resolve_references(properties[key])
+                    items = _numeric_items_schema(prop_schema, self.resolve_references)
+                    if items is not None:
+                        try:
+                            _validate_numeric_array(val, prop_schema, items, path=(key,),
+                                                    schema_path=('properties', key))
+                        except jsonschema.ValidationError as err:
+                            yield err
+                        checked.append(key)
+                if checked:
+                    schema = dict(resolved, properties=dict(properties, **dict.fromkeys(checked, {})))
+        if deep:
+            schema = self._prune_validated(schema, self._args[0] if self._args else self._kwds)
+        cache, key = VALIDATION_CACHE, None
+        if cache is not None and schema is self._schema:
+            key, valid = cache.lookup(schema, self._rootschema or self._schema, result)
+            if valid:
+                return
+        valid = True
+        for error in self._get_validator(schema).iter_errors(result):
+            if valid and key is not None:
+                cache.store(key, schema, self._rootschema or self._schema, False)
+            valid = False
+            yield error
+        if valid and key is not None:
+            cache.store(key, schema, self._rootschema or self._schema, True)
+
+    def _prune_validated(self, schema, value):
+        """Remove the parts of schema already checked by validated SchemaBase children
+
+        Returns a copy of schema in which the subschemas matched against
+        SchemaBase objects within value are reduced to what the object's own
+        schema does not guarantee: a subschema resolving to the object's
+        schema is replaced by the empty schema, and an anyOf with such a
+        branch is removed, keeping its sibling keywords. Keywords of schema
+        itself are always kept. If nothing can be pruned, schema is returned
+        unchanged.
+        """
+        if not isinstance(schema, dict):
+            return schema
+        elif isinstance(value, SchemaBase):
+            remainder = self._unsatisfied_part(schema, value)
+            return schema if remainder is None else remainder
+        elif isinstance(value, typing.Mapping):
+            resolved = self.resolve_references(schema)
+            properties = resolved.get('properties')
+            if not properties:
+                return schema
+            pruned = {}
+            for key, val in value.items():
+                if key in properties and isinstance(val, (SchemaBase, typing.Mapping, list, tuple)):
+                    subschema = self._prune_validated(properties[key], val)
+                    if subschema is not properties[key]:
+                        pruned[key] = subschema
+            if not pruned:
+                return schema
+            return dict(resolved, properties=dict(properties, **pruned))
+        elif isinstance(value, (list, tuple)) and value:
+            resolved = self.resolve_references(schema)
+            items = resolved.get('items')
+            if not isinstance(items, dict):
+                return schema
+            remainders = [self._unsatisfied_part(items, val) if isinstance(val, SchemaBase) else None
+                          for val in value]
+            # the items schema is the same for all items, so it can only be
+            # pruned if all of them leave the same part of it
+            if remainders[0] is not None and all(remainder == remainders[0] for remainder in remainders):
+                return dict(resolved, items=remainders[0])
+        return schema
+
+    def _unsatisfied_part(self, schema, obj):
+        """Return the part of schema obj validating against its own schema does not imply
+
+        The empty schema is returned if schema resolves to the schema of obj,
+        and schema without its anyOf if one of its branches does; its other
+        keywords (e.g. required) are still to be checked. None is returned if
+        neither applies.
+        """
+        rootschema = self._rootschema or self._schema
+        if (obj._rootschema or obj._schema) is not rootschema:
+            return None
+        obj_schema = obj.resolve_references(obj._schema)
+        schema = self.resolve_references(schema)
+        if schema is obj_schema or schema == obj_schema:
+            return {}
+        if any(self.resolve_references(branch) is obj_schema for branch in schema.get('anyOf', ())):
+            return {key: value for key, value in schema.items() if key != 'anyOf'}
+        return None
 
     def to_json(self, validate=True, exclude: typing.Optional[typing.Union[typing.AbstractSet, typing.Sequence]] = None, context: typing.Optional[typing.Mapping] = None,
                 indent=2, sort_keys=True, **kwargs):
@@ -355,7 +1525,22 @@ class SchemaBase(object):
             context = {}
 
         dct = self.to_dict(validate=validate, exclude=exclude, context=context)
-        return json.dumps(dct, indent=indent, sort_keys=sort_keys, **kwargs)
+        return get_json_backend().dumps(dct, indent=indent, sort_keys=sort_keys, **kwargs)
+
+    def to_json_bytes(self, validate=True, exclude: typing.Optional[typing.Union[typing.AbstractSet, typing.Sequence]] = None,
+                      context: typing.Optional[typing.Mapping] = None, indent=None, sort_keys=False, **kwargs):
+        """Emit the JSON representation for this object as UTF-8 encoded bytes.
+
+        Takes the same arguments as ``to_json``, but defaults to compact,
+        unsorted output suitable for writing directly to a socket or file.
+
+        Returns
+        -------
+        spec : bytes
+            The JSON specification of the chart object.
+        """
+        dct = self.to_dict(validate=validate, exclude=exclude, context=context)
+        return get_json_backend().dumps_bytes(dct, indent=indent, sort_keys=sort_keys, **kwargs)
 
     @classmethod
     def _default_wrapper_classes(cls):
@@ -363,15 +1548,21 @@ class SchemaBase(object):
         return SchemaBase.__subclasses__()
 
     @classmethod
-    def from_dict(cls, dct, validate=True, _wrapper_classes=None):
+    @_instrumentation.instrumented('from_dict')
+    def from_dict(cls, dct, validate=True, _wrapper_classes=None, limits=None):
         """Construct class from a dictionary representation
 
         Parameters
         ----------
         dct : dictionary
             The dict from which to construct the class
-        validate : boolean
-            If True (default), then validate the input against the schema.
+        validate : boolean, string or Sample
+            If True (default), then validate the input against the schema
+            at the level set for the class or by ``validation_level``. See
+            ``to_dict`` for the other levels.
+        limits : InputLimits (optional)
+            The budget the input must fit in; by default, the limits set with
+            ``set_input_limits``, if any.
         _wrapper_classes : list (optional)
             The set of SchemaBase classes to use when constructing wrappers
             of the dict inputs. If not specified, the result of
@@ -386,25 +1577,40 @@ class SchemaBase(object):
         ------
         jsonschema.ValidationError :
             if validate=True and dct does not conform to the schema
+        InputLimitError :
+            if dct exceeds the input limits
         """
-        if validate:
+        if limits is None:
+            limits = INPUT_LIMITS
+        if limits is not None:
+            limits.check(dct)
+        level = cls._get_validation_level(validate)
+        if isinstance(level, Sample):
+            level._run(cls.validate, dct)
+        elif level == 'shallow':
+            cls.validate(dct, cls._shallow_schema())
+        elif level:
             cls.validate(dct)
         if _wrapper_classes is None:
             _wrapper_classes = cls._default_wrapper_classes()
-        converter = _FromDict(_wrapper_classes)
+        converter = _FromDict(_wrapper_classes,
+                              max_union_attempts=limits.max_union_attempts if limits is not None else None)
         return converter.from_dict(constructor=cls, root=cls,
                                    schema=cls._schema, dct=dct)
 
     @classmethod
-    def from_json(cls, json_string, validate=True, **kwargs):
+    def from_json(cls, json_string, validate=True, limits=None, **kwargs):
         """Instantiate the object from a valid JSON string
 
         Parameters
         ----------
-        json_string : string
+        json_string : string or bytes
             The string containing a valid JSON chart specification.
         validate : boolean
             If True (default), then validate the input against the schema.
+        limits : InputLimits (optional)
+            The budget the input must fit in; see ``from_dict``. The length
+            and nesting depth of json_string are checked before it is parsed.
         **kwargs :
             Additional keyword arguments are passed to json.loads
 
@@ -413,19 +1619,68 @@ class SchemaBase(object):
         chart : Chart object
             The altair Chart object built from the specification.
         """
-        dct = json.loads(json_string, **kwargs)
-        return cls.from_dict(dct, validate=validate)
+        if limits is None:
+            limits = INPUT_LIMITS
+        if limits is not None:
+            limits.check_json(json_string)
+        dct = get_json_backend().loads(json_string, **kwargs)
+        return cls.from_dict(dct, validate=validate, limits=limits)
 
     @classmethod
+    @_instrumentation.instrumented('validate')
     def validate(cls, instance, schema=None):
         """
         Validate the instance against the class schema in the context of the
         rootschema.
         """
+        if schema is None:
+            schema = cls._schema
+        cache, key = VALIDATION_CACHE, None
+        if cache is not None:
+            key, valid = cache.lookup(schema, cls._rootschema or cls._schema, instance)
+            if valid:
+                return
+        error = jsonschema.exceptions.best_match(cls._get_validator(schema).iter_errors(instance))
+        if key is not None:
+            cache.store(key, schema, cls._rootschema or cls._schema, error is None)
+        if error is not None:
+            raise error
+
+    @classmethod
+    def _is_valid_instance(cls, instance, schema=None, fingerprint=None):
+        """Return True if instance is valid against schema (default: the class schema)
+
+        Both valid and invalid results are taken from and stored in the
+        validation cache, if enabled; fingerprint is the cache fingerprint of
+        instance, if already computed.
+        """
+        if schema is None:
+            schema = cls._schema
+        cache, key = VALIDATION_CACHE, None
+        if cache is not None:
+            key, valid = cache.lookup(schema, cls._rootschema or cls._schema, instance, fingerprint)
+            if valid is not None:
+                return valid
+        valid = cls._get_validator(schema).is_valid(instance)
+        if key is not None:
+            cache.store(key, schema, cls._rootschema or cls._schema, valid)
+        return valid
+
+    @classmethod
+    def _get_validator(cls, schema=None):
+        """Return a jsonschema validator for schema (default: the class schema)
+
+        Unlike ``jsonschema.validate``, the schema itself is not checked
+        against the metaschema on every call.
+        """
         if schema is None:
             schema = cls._schema
         resolver = jsonschema.RefResolver.from_schema(cls._rootschema or cls._schema)
-        return jsonschema.validate(instance, schema, resolver=resolver)
+        validator_class = jsonschema.validators.validator_for(schema)
+        if _profiling.ACTIVE is not None:
+            validator_class = _profiling.ACTIVE._instrument(cls, schema, cls._rootschema or cls._schema,
+                                                            validator_class)
+        return validator_class(schema, resolver=resolver)
 
     @classmethod
     def resolve_references(cls, schema):
@@ -438,10 +1693,151 @@ class SchemaBase(object):
                 schema = resolved
         return schema
 
+    async def ato_dict(self, *args, **kwargs):
+        """Awaitable version of ``to_dict``, run in the executor set by ``set_async_executor``"""
+        return await _run_in_executor(self.to_dict, *args, **kwargs)
+
+    async def ato_json(self, *args, **kwargs):
+        """Awaitable version of ``to_json``, run in the executor set by ``set_async_executor``"""
+        return await _run_in_executor(self.to_json, *args, **kwargs)
+
+    @classmethod
+    async def afrom_json(cls, json_string, validate=True, **kwargs):
+        """Awaitable version of ``from_json``, run in the executor set by ``set_async_executor``"""
+        return await _run_in_executor(cls.from_json, json_string, validate=validate, **kwargs)
+
+    @classmethod
+    async def avalidate(cls, instance, schema=None):
+        """Awaitable version of ``validate``, run in the executor set by ``set_async_executor``"""
+        return await _run_in_executor(cls.validate, instance, schema)
+
     def __dir__(self):
         return list(self._kwds.keys())
 
 
+# Operations on the explicit stacks used by _to_dict, _deep_copy and
+# _FromDict.from_dict in place of recursion.
+_ENTER, _EXIT, _SORT = range(3)
+
+
+def _to_dict(obj, validate, include, exclude, context):
+    """Iteratively convert a SchemaBase object and its contents to JSON-compatible objects
+
+    Each SchemaBase object found is serialized by calling its own ``to_dict``
+    if a subclass overrides it; otherwise it is serialized in place, with its
+    own property names as ``include``. Objects are validated after their
+    contents have been converted: the root object if validate is truthy and
+    every object if validate is "deep".
+    """
+    sub_validate = 'deep' if validate == 'deep' else False
+    native_types = _JSON_NATIVE_TYPES
+    out = [None]
+    stack = [(_ENTER, obj, out, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        op, val, target, key = pop()
+        if op == _ENTER:
+            # Containers are copied with their JSON-native values in place;
+            # only the remaining values are pushed onto the stack.
+            typ = type(val)
+            if typ is list or typ is tuple:
+                result = target[key] = list(val)
+                for i in range(len(result) - 1, -1, -1):
+                    if type(result[i]) not in native_types:
+                        push((_ENTER, result[i], result, i))
+            elif typ is dict:
+                result = target[key] = {k: v for k, v in val.items() if v is not Undefined}
+                for k, v in reversed([(k, v) for k, v in result.items()
+                                      if type(v) not in native_types]):
+                    push((_ENTER, v, result, k))
+            elif typ in native_types:
+                target[key] = val
+            elif isinstance(val, SchemaBase):
+                if val is obj:
+                    node_validate = validate
+                    payload = val._payload(include, exclude)
+                elif type(val).to_dict is not SchemaBase.to_dict:
+                    target[key] = val.to_dict(validate=sub_validate, context=context)
+                    continue
+                else:
+                    node_validate = sub_validate
+                    node_include = val._property_names
+                    payload = val._payload(None if node_include is None else frozenset(node_include))
+                if node_validate:
+                    push((_EXIT, (val, node_validate), target, key))
+                push((_ENTER, payload, target, key))
+            else:
+                converter = get_converter(type(val))
+                if converter is not None:
+                    target[key] = converter(val)
+                elif isinstance(val, typing.Sequence):
+                    if isinstance(val, str):
+                        target[key] = str(val)
+                    else:
+                        result = target[key] = [None] * len(val)
+                        for i in range(len(val) - 1, -1, -1):
+                            push((_ENTER, val[i], result, i))
+                elif isinstance(val, (set, frozenset)):
+                    result = target[key] = [None] * len(val)
+                    push((_SORT, None, target, key))
+                    for i, v in enumerate(val):
+                        push((_ENTER, v, result, i))
+                elif isinstance(val, typing.Mapping):
+                    items = [(k, v) for k, v in val.items() if v is not Undefined]
+                    result = target[key] = dict.fromkeys(k for k, v in items)
+                    for k, v in reversed(items):
+                        push((_ENTER, v, result, k))
+                else:
+                    target[key] = val
+        elif op == _EXIT:
+            node, level = val
+            node._validate_result(target[key], level)
+        else:
+            target[key].sort()
+    return out[0]
+
+
+def _deep_copy(obj, exclude):
+    """Iteratively copy all dict, list, and SchemaBase objects within obj
+
+    Values of keys in exclude are stored by reference; exclude does not apply
+    to the positional arguments of SchemaBase objects.
+    """
+    native_types = _JSON_NATIVE_TYPES
+    out = [None]
+    stack = [(_ENTER, obj, out, 0, exclude)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        op, val, target, key, exclude = pop()
+        if op == _EXIT:
+            cls, args, kwds = val
+            target[key] = cls(*args, **kwds)
+        elif type(val) in native_types:
+            target[key] = val
+        elif isinstance(val, SchemaBase):
+            args = list(val._args)
+            kwds = dict(val._kwds)
+            push((_EXIT, (val.__class__, args, kwds), target, key, None))
+            for k, v in reversed(list(kwds.items())):
+                if k not in exclude and type(v) not in native_types:
+                    push((_ENTER, v, kwds, k, exclude))
+            for i in range(len(args) - 1, -1, -1):
+                push((_ENTER, args[i], args, i, frozenset()))
+        elif type(val) is list or (isinstance(val, typing.Sequence) and not isinstance(val, str)):
+            result = target[key] = list(val)
+            for i in range(len(result) - 1, -1, -1):
+                if type(result[i]) not in native_types:
+                    push((_ENTER, result[i], result, i, exclude))
+        elif isinstance(val, typing.Mapping):
+            result = target[key] = dict(val.items())
+            for k, v in reversed(list(result.items())):
+                if k not in exclude and type(v) not in native_types:
+                    push((_ENTER, v, result, k, exclude))
+        else:
+            target[key] = val
+    return out[0]
+
+
 class _FromDict(object):
     """Class used to construct SchemaBase class hierarchies from a dict
 
@@ -451,13 +1847,17 @@ class _FromDict(object):
     """
     _hash_exclude_keys = ('definitions', 'title', 'description', '$schema', 'id')
 
-    def __init__(self, class_list):
+    def __init__(self, class_list, max_union_attempts=None):
         # Create a mapping of a schema hash to a list of matching classes
         # This lets us quickly determine the correct class to construct
+        self.max_union_attempts = max_union_attempts
+        self.union_attempts = 0
         self.class_dict = collections.defaultdict(list)
         for cls in class_list:
             if cls._schema is not None:
                 self.class_dict[self.hash_schema(cls._schema)].append(cls)
+            for alias in getattr(cls, '_schema_aliases', ()):
+                self.class_dict[self.hash_schema(alias)].append(cls)
 
     @classmethod
     def hash_schema(cls, schema, use_json=True):
@@ -502,51 +1902,87 @@ class _FromDict(object):
         else:
             raise ValueError("Both args and kwds supplied")
 
+    def _get_constructor(self, root, schema):
+        """Return the wrapper class for schema and the resolved schema"""
+        # TODO: do something more than simply selecting the last match?
+        hash_ = self.hash_schema(schema)
+        matches = self.class_dict[hash_]
+        constructor = matches[-1] if matches else self._passthrough
+        schema = root.resolve_references(schema)
+        return constructor, schema
+
+    def _select_union_branch(self, root, schema, dct, fingerprint=None):
+        """Return the constructor and schema of the first anyOf/oneOf branch dct validates against
+
+        fingerprint is that of dct in the validation cache, if enabled.
+        """
+        schemas = schema.get('anyOf', []) + schema.get('oneOf', [])
+        for this_schema in schemas:
+            this_constructor, this_schema = self._get_constructor(root, this_schema)
+            self.union_attempts += 1
+            if self.max_union_attempts is not None and self.union_attempts > self.max_union_attempts:
+                raise InputLimitError('max_union_attempts', self.max_union_attempts)
+            if _instrumentation.ENABLED:
+                cls = this_constructor if isinstance(this_constructor, type) else root
+                valid = _instrumentation.call('union_attempt', cls, root._is_valid_instance,
+                                              dct, this_schema, fingerprint)
+            else:
+                valid = root._is_valid_instance(dct, this_schema, fingerprint)
+            if valid:
+                return this_constructor, this_schema
+        return None
+
     def from_dict(self, constructor, root, schema, dct):
-        """Construct an object from a dict representation"""
+        """Construct an object from a dict representation
+
+        The input is walked iteratively: wrappers are constructed once all of
+        their contents have been, so deeply nested input does not hit the
+        recursion limit.
+        """
         # TODO: introspect lists, objects, etc. when they don't have a wrapper.
         #       could do this by passing the schema rather than cls.
-        schema = root.resolve_references(schema)
-
-        def _get_constructor(schema):
-            # TODO: do something more than simply selecting the last match?
-            hash_ = self.hash_schema(schema)
-            matches = self.class_dict[hash_]
-            constructor = matches[-1] if matches else self._passthrough
+        out = [None]
+        stack = [(_ENTER, constructor, schema, dct, out, 0)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            op, constructor, schema, dct, target, key = pop()
+            if op == _EXIT:
+                target[key] = constructor(**dct) if isinstance(dct, dict) else constructor(dct)
+                continue
             schema = root.resolve_references(schema)
-            return constructor, schema
-
-        if 'anyOf' in schema or 'oneOf' in schema:
-            schemas = schema.get('anyOf', []) + schema.get('oneOf', [])
-            for this_schema in schemas:
-                this_constructor, this_schema = _get_constructor(this_schema)
-                try:
-                    root.validate(dct, this_schema)
-                except jsonschema.ValidationError:
-                    continue
+
+            # the fingerprint of dct in the validation cache is the same for
+            # all the branches of nested unions
+            fingerprint = None
+            if VALIDATION_CACHE is not None and ('anyOf' in schema or 'oneOf' in schema):
+                fingerprint = VALIDATION_CACHE.fingerprint(dct) or False
+            while 'anyOf' in schema or 'oneOf' in schema:
+                branch = self._select_union_branch(root, schema, dct, fingerprint)
+                if branch is None or branch[1] is schema:
+                    break
+                constructor, schema = branch
+
+            if isinstance(dct, typing.Mapping):
+                # TODO: handle schemas for additionalProperties/patternProperties
+                props = schema.get('properties', {})
+                kwds = dict(dct.items())
+                push((_EXIT, constructor, None, kwds, target, key))
+                for key_, val in reversed(list(kwds.items())):
+                    if key_ in props:
+                        prop_constructor, prop_schema = self._get_constructor(root, props[key_])
+                        push((_ENTER, prop_constructor, prop_schema, val, kwds, key_))
+
+            elif isinstance(dct, typing.Sequence) and not isinstance(dct, str):
+                if 'items' in schema:
+                    item_schema = schema['items']
+                    item_constructor, item_schema = self._get_constructor(root, item_schema)
                 else:
-                    return self.from_dict(this_constructor, root, this_schema, dct)
-
-        if isinstance(dct, typing.Mapping):
-            # TODO: handle schemas for additionalProperties/patternProperties
-            props = schema.get('properties', {})
-            kwds = {}
-            for key, val in dct.items():
-                if key in props:
-                    prop_constructor, prop_schema = _get_constructor(props[key])
-                    val = self.from_dict(prop_constructor, root, prop_schema, val)
-                kwds[key] = val
-            return constructor(**kwds)
-
-        elif isinstance(dct, typing.Sequence) and not isinstance(dct, str):
-            if 'items' in schema:
-                item_schema = schema['items']
-                item_constructor, item_schema = _get_constructor(item_schema)
+                    item_schema = {}
+                    item_constructor = self._passthrough
+                items = list(dct)
+                push((_EXIT, constructor, None, items, target, key))
+                for i in range(len(items) - 1, -1, -1):
+                    push((_ENTER, item_constructor, item_schema, items[i], items, i))
             else:
-                item_schema = {}
-                item_constructor = self._passthrough
-            dct = [self.from_dict(item_constructor, root, item_schema, val)
-                   for val in dct]
-            return constructor(dct)
-        else:
-            return constructor(dct)
+                target[key] = constructor(dct)
+        return out[0]
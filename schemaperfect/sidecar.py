@@ -0,0 +1,81 @@
+"""Lazily loaded schemas and docstrings of generated modules
+
+Modules written by ``SchemaModuleGenerator.write_module`` (or
+``write_package``) with the ``sidecar`` option do not embed the root schema
+as a literal. It is stored in a JSON or marshal file next to the module and
+read on first use. Optionally, the same is done for the class docstrings.
+"""
+import json
+import marshal
+import os
+import threading
+
+
+class LazyAttribute(object):
+    """Class attribute whose value is computed by load() on first access
+
+    The value is the same for access through the class and its instances,
+    which allows its use for ``_schema``, ``_rootschema`` and ``__doc__``.
+    """
+    def __init__(self, load):
+        self._load = load
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __get__(self, obj, owner=None):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._load()
+                    self._loaded = True
+        return self._value
+
+
+def load_file(path):
+    """Load a sidecar file, in the marshal format if it ends with '.marshal', else JSON"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.marshal'):
+        return marshal.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def dump_file(path, value):
+    """Write value to a sidecar file, in the format given by its extension"""
+    if path.endswith('.marshal'):
+        data = marshal.dumps(value)
+    else:
+        data = json.dumps(value).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class SchemaSidecar(object):
+    """The sidecar files of a generated module
+
+    Parameters
+    ----------
+    module_file : string
+        The ``__file__`` of the generated module; sidecar file names are
+        relative to its directory.
+    schema_file : string
+        The name of the file holding the root schema.
+    docs_file : string (optional)
+        The name of the file holding a dict of docstrings by class name.
+    """
+    def __init__(self, module_file, schema_file, docs_file=None):
+        directory = os.path.dirname(os.path.abspath(module_file))
+        self.schema_path = os.path.join(directory, schema_file)
+        self.docs_path = os.path.join(directory, docs_file) if docs_file else None
+        # a single attribute object, so that every class shares the same dict
+        self._schema = LazyAttribute(lambda: load_file(self.schema_path))
+        self._docs = LazyAttribute(lambda: load_file(self.docs_path))
+
+    def lazy_schema(self):
+        """Return a class attribute holding the root schema, loaded on first access"""
+        return self._schema
+
+    def lazy_doc(self, name):
+        """Return a class attribute holding the docstring of class name, loaded on first access"""
+        return LazyAttribute(lambda: self._docs.__get__(None).get(name))
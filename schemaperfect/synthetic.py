@@ -0,0 +1,549 @@
+"""Generation of random instances of JSON schemas
+
+``InstanceGenerator`` produces pseudo-random instances valid against a
+schema, reproducibly for a given seed, e.g. to produce data for load tests
+and benchmarks:
+
+>>> from schemaperfect.synthetic import InstanceGenerator
+>>> schema = {'type': 'object',
+...           'properties': {'name': {'type': 'string'},
+...                          'tags': {'type': 'array', 'items': {'enum': ['a', 'b']}}},
+...           'required': ['name']}
+>>> gen = InstanceGenerator(schema, seed=0)
+>>> instance = gen.generate()
+>>> sorted(instance) in (['name'], ['name', 'tags'])
+True
+
+Supported are the type, enum, const, properties, required,
+additionalProperties, items, minItems/maxItems, uniqueItems,
+minLength/maxLength, minimum/maximum (and their exclusive forms),
+multipleOf, anyOf, oneOf and allOf keywords, and the date-time, date, time,
+email, uri and uuid string formats. Strings with a ``pattern`` are drawn
+from the enum or examples of their schema if any, and are otherwise
+generated from the regular expression. ``not`` is ignored, and
+``patternProperties`` only used for required properties missing from
+``properties``. The branches of a ``oneOf`` are not checked to be mutually
+exclusive.
+
+Each instance is validated against the schema, and drawn again if it is
+invalid (e.g. because of a ``not``). Schemas which cannot be satisfied
+this way, such as a required property forbidden by
+``additionalProperties: false``, a pattern using lookarounds or a range
+without multiples of ``multipleOf``, raise a ValueError rather than
+producing invalid instances.
+"""
+import collections
+import datetime
+import fractions
+import itertools
+import json
+import math
+import random
+import re
+import string
+import uuid
+
+import jsonschema
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from .utils import SchemaInfo
+
+# used in place of missing subschemas; SchemaInfo objects are cached by the id
+# of their schema, so this must not be a temporary object
+_EMPTY_SCHEMA = {}
+
+# the characters of strings generated from patterns, besides literals
+_PATTERN_ALPHABET = string.ascii_letters + string.digits + string.punctuation + ' '
+_PATTERN_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: re.compile(r'\d'),
+    sre_parse.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    sre_parse.CATEGORY_SPACE: re.compile(r'\s'),
+    sre_parse.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+    sre_parse.CATEGORY_WORD: re.compile(r'\w'),
+    sre_parse.CATEGORY_NOT_WORD: re.compile(r'\W'),
+}
+# the maximum number of repeats of a repetition in a pattern beyond its
+# minimum, unless minLength requires more
+_PATTERN_MAX_EXTRA_REPEATS = 4
+_PATTERN_ATTEMPTS = 100
+# the number of times an invalid instance or number is drawn again
+_ATTEMPTS = 20
+
+
+class _UnsupportedPattern(Exception):
+    pass
+
+
+def _in_set(items, char):
+    """Return True if char is in the parsed character set items (without NEGATE)"""
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            found = char == chr(av)
+        elif op == sre_parse.RANGE:
+            found = av[0] <= ord(char) <= av[1]
+        elif op == sre_parse.CATEGORY and av in _PATTERN_CATEGORIES:
+            found = _PATTERN_CATEGORIES[av].match(char) is not None
+        else:
+            raise _UnsupportedPattern(op)
+        if found:
+            return True
+    return False
+
+
+def _exact(number):
+    """Return the Fraction of a number, with floats taken as their shortest repr"""
+    return fractions.Fraction(repr(number) if isinstance(number, float) else number)
+
+
+class InstanceGenerator(object):
+    """Generator of random instances of a schema
+
+    Parameters
+    ----------
+    schema : dict, SchemaBase class or SchemaInfo
+        The schema of the instances.
+    rootschema : dict (optional)
+        The root schema, within which references are resolved.
+    seed : integer or None
+        The seed of the random number generator; the same seed produces the
+        same sequence of instances.
+    max_depth : integer
+        The nesting depth beyond which optional properties are left out,
+        arrays are kept to their minimum length and union branches which are
+        not objects or arrays are preferred.
+    min_items, max_items : integer
+        The bounds of the length of arrays, within those set by the schema.
+    optional_probability : float
+        The probability with which each optional property is included.
+    string_length : integer
+        The length of strings, within the bounds set by the schema.
+    branch : string or callable
+        How to choose the branch of an anyOf/oneOf: 'random' (default),
+        'first', 'last', or a function called as ``branch(infos, rng)`` with
+        the list of SchemaInfo of the branches and the random number
+        generator, and returning the index of the branch to use.
+    validate : boolean
+        Whether each instance is validated against the schema, and drawn
+        again if invalid; a ValueError is raised if none of several attempts
+        is valid. The elements of top-level arrays and the values of
+        top-level objects streamed by iter_json are validated one at a time.
+    """
+    def __init__(self, schema, rootschema=None, seed=None, max_depth=5, min_items=0, max_items=5,
+                 optional_probability=0.5, string_length=8, branch='random', validate=True):
+        if isinstance(schema, SchemaInfo):
+            info = schema
+        else:
+            info = SchemaInfo(schema, rootschema)
+        if branch not in ('random', 'first', 'last') and not callable(branch):
+            raise ValueError("branch must be 'random', 'first', 'last' or a callable")
+        self.info = info
+        self.rootschema = info.rootschema
+        self.rng = random.Random(seed)
+        self.max_depth = max_depth
+        self.min_items = min_items
+        self.max_items = max_items
+        self.optional_probability = optional_probability
+        self.string_length = string_length
+        self.branch = branch
+        self.validate = validate
+        self._infos = {id(info.raw_schema): info}
+        self._validator_class = jsonschema.validators.validator_for(self.rootschema)
+        self._resolver = jsonschema.RefResolver.from_schema(self.rootschema)
+        self._validators = {}
+
+    def _info(self, schema):
+        """Return the (cached) SchemaInfo of a subschema of the root schema"""
+        info = self._infos.get(id(schema))
+        if info is None:
+            info = self._infos[id(schema)] = SchemaInfo(schema, self.rootschema)
+        return info
+
+    def generate(self):
+        """Return a new random instance"""
+        return self._generate_valid(self.info, 0)
+
+    def _validator(self, schema):
+        """Return the (cached) validator of a subschema of the root schema"""
+        entry = self._validators.get(id(schema))
+        if entry is None:
+            # keep schema alive, so that its id is not reused
+            entry = self._validators[id(schema)] = (
+                schema, self._validator_class(schema, resolver=self._resolver))
+        return entry[1]
+
+    def _generate_valid(self, info, depth):
+        """Return a new instance of info, validated if self.validate is True"""
+        if not self.validate:
+            return self._generate(info, depth)
+        validator = self._validator(info.raw_schema)
+        for _ in range(_ATTEMPTS):
+            instance = self._generate(info, depth)
+            error = jsonschema.exceptions.best_match(validator.iter_errors(instance))
+            if error is None:
+                return instance
+        raise ValueError("Cannot generate instances valid against the schema: {} of {} attempts "
+                         "failed, the last with: {}".format(_ATTEMPTS, _ATTEMPTS, error.message))
+
+    def iter_instances(self, count=None):
+        """Iterate over count new instances (default: indefinitely)"""
+        counter = itertools.count() if count is None else range(count)
+        for _ in counter:
+            yield self.generate()
+
+    def iter_json(self, count=None):
+        """Iterate over the chunks of the JSON text of a new instance
+
+        The elements of a top-level array and the properties of a top-level
+        object are generated and serialized one at a time, so that very
+        large instances need not be held in memory at once. If count is
+        given, the text is instead that of an array of count instances,
+        each generated as it is serialized.
+        """
+        if count is not None:
+            yield '['
+            for i, instance in enumerate(self.iter_instances(count)):
+                yield (',' if i else '') + json.dumps(instance)
+            yield ']'
+            return
+        schema = self._resolve(self.info)
+        kind = None
+        if not any(key in schema for key in ('const', 'enum', 'anyOf', 'oneOf')):
+            kind = self._choose_type(schema)
+        items = schema.get('items', _EMPTY_SCHEMA)
+        if kind == 'array' and isinstance(items, dict):
+            yield '['
+            for i in range(self._array_length(schema, 0)):
+                yield (',' if i else '') + json.dumps(self._generate_valid(self._info(items), 1))
+            yield ']'
+        elif kind == 'object':
+            yield '{'
+            for i, (name, value) in enumerate(self._iter_properties(schema, 0, top_level=True)):
+                yield '{}{}: {}'.format(',' if i else '', json.dumps(name), json.dumps(value))
+            yield '}'
+        else:
+            yield json.dumps(self._generate_valid(self.info, 0))
+
+    def write_json(self, stream, count=None):
+        """Write the JSON text of iter_json(count) to the file-like object stream"""
+        for chunk in self.iter_json(count):
+            stream.write(chunk)
+
+    def _resolve(self, info):
+        """Return the resolved schema of info, with any allOf merged into it"""
+        schema = info.schema
+        if 'allOf' in schema:
+            merged = {key: value for key, value in schema.items() if key != 'allOf'}
+            for child in schema['allOf']:
+                child = self._resolve(self._info(child))
+                for key, value in child.items():
+                    if key == 'properties':
+                        merged['properties'] = dict(merged.get('properties', {}), **value)
+                    elif key == 'required':
+                        merged['required'] = list(merged.get('required', [])) + list(value)
+                    else:
+                        merged.setdefault(key, value)
+            schema = merged
+        return schema
+
+    def _choose_branch(self, branches, depth):
+        infos = [self._info(branch) for branch in branches]
+        if self.branch == 'first':
+            return infos[0]
+        elif self.branch == 'last':
+            return infos[-1]
+        elif callable(self.branch):
+            return infos[self.branch(infos, self.rng)]
+        if depth >= self.max_depth:
+            leaves = [info for info in infos
+                      if self._choose_type(self._resolve(info), choose=False) not in ('object', 'array')]
+            if leaves:
+                infos = leaves
+        return self.rng.choice(infos)
+
+    def _choose_type(self, schema, choose=True):
+        """Return the type of instance to generate for a resolved schema"""
+        types = schema.get('type')
+        if isinstance(types, list):
+            if not choose:
+                return types[0] if len(types) == 1 else None
+            return self.rng.choice(types)
+        elif types is not None:
+            return types
+        elif any(key in schema for key in ('properties', 'required', 'additionalProperties')):
+            return 'object'
+        elif 'items' in schema:
+            return 'array'
+        return None
+
+    def _generate(self, info, depth):
+        schema = self._resolve(info)
+        if 'const' in schema:
+            return schema['const']
+        elif 'enum' in schema:
+            return self.rng.choice(schema['enum'])
+        for key in ('anyOf', 'oneOf'):
+            if key in schema:
+                return self._generate(self._choose_branch(schema[key], depth), depth)
+        return self._generate_value(schema, self._choose_type(schema), depth)
+
+    def _generate_value(self, schema, kind, depth):
+        if kind == 'object':
+            return dict(self._iter_properties(schema, depth))
+        elif kind == 'array':
+            return self._generate_array(schema, depth)
+        elif kind == 'string' or kind is None:
+            return self._generate_string(schema)
+        elif kind in ('integer', 'number'):
+            return self._generate_number(schema, kind)
+        elif kind == 'boolean':
+            return self.rng.random() < 0.5
+        elif kind == 'null':
+            return None
+        raise ValueError("Unknown type {!r}".format(kind))
+
+    def _iter_properties(self, schema, depth, top_level=False):
+        """Iterate over the (name, value) pairs of a new object of schema
+
+        The values of top-level objects are validated one at a time.
+        """
+        properties = schema.get('properties', {})
+        generate = self._generate_valid if top_level else self._generate
+        for name in self._property_names(schema, depth):
+            subschema = properties[name] if name in properties else self._additional_schema(schema, name)
+            yield name, generate(self._info(subschema), depth + 1)
+
+    def _property_names(self, schema, depth):
+        """Return the names of the properties of a new object, within minProperties and maxProperties"""
+        properties = schema.get('properties', {})
+        required = list(collections.OrderedDict.fromkeys(schema.get('required', [])))
+        min_properties = schema.get('minProperties', 0)
+        max_properties = schema.get('maxProperties')
+        if max_properties is not None and (len(required) > max_properties or min_properties > max_properties):
+            raise ValueError("Cannot generate objects with the required properties {} and at most {} "
+                             "properties".format(required, max_properties))
+        names = [name for name in properties
+                 if name in required or (depth < self.max_depth and self.rng.random() < self.optional_probability)]
+        names += [name for name in required if name not in properties]
+        optional = [name for name in names if name not in required]
+        while max_properties is not None and len(names) > max_properties:
+            names.remove(optional.pop(self.rng.randrange(len(optional))))
+        if len(names) < min_properties:
+            names += [name for name in properties if name not in names][:min_properties - len(names)]
+        for i in itertools.count():
+            if len(names) >= min_properties:
+                break
+            name = 'property{}'.format(i)
+            if name not in properties and name not in names:
+                self._additional_schema(schema, name, 'minProperties requires the additional property')
+                names.append(name)
+        return names
+
+    @staticmethod
+    def _additional_schema(schema, name, reason='The required property'):
+        """Return the schema of the property name, which is not in the properties of schema"""
+        for pattern, subschema in schema.get('patternProperties', {}).items():
+            if re.search(pattern, name):
+                return subschema
+        additional = schema.get('additionalProperties', True)
+        if additional is False:
+            raise ValueError("{} {!r} is not allowed by additionalProperties: false".format(reason, name))
+        return additional if isinstance(additional, dict) else _EMPTY_SCHEMA
+
+    def _array_length(self, schema, depth):
+        maximum = schema.get('maxItems', max(self.max_items, self.min_items))
+        low = max(schema.get('minItems', 0), min(self.min_items, maximum))
+        high = max(low, min(self.max_items, maximum))
+        if depth >= self.max_depth:
+            return low
+        return self.rng.randint(low, high)
+
+    def _generate_array(self, schema, depth):
+        items = schema.get('items', _EMPTY_SCHEMA)
+        if isinstance(items, list):
+            return [self._generate(self._info(item), depth + 1) for item in items]
+        info = self._info(items)
+        length = self._array_length(schema, depth)
+        if not schema.get('uniqueItems'):
+            return [self._generate(info, depth + 1) for _ in range(length)]
+        result, attempts = [], 0
+        while len(result) < length and attempts < 10 * length + 10:
+            value = self._generate(info, depth + 1)
+            if value not in result:
+                result.append(value)
+            attempts += 1
+        return result
+
+    def _generate_string(self, schema):
+        fmt = schema.get('format')
+        if fmt == 'date-time':
+            return self._random_datetime().isoformat() + 'Z'
+        elif fmt == 'date':
+            return self._random_datetime().date().isoformat()
+        elif fmt == 'time':
+            return self._random_datetime().time().isoformat()
+        elif fmt == 'uuid':
+            return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+        elif fmt == 'email':
+            return '{}@example.com'.format(self._random_text(self.string_length))
+        elif fmt in ('uri', 'url'):
+            return 'https://example.com/{}'.format(self._random_text(self.string_length))
+        elif 'pattern' in schema:
+            if schema.get('examples'):
+                return self.rng.choice(schema['examples'])
+            return self._generate_pattern(schema)
+        length = max(schema.get('minLength', 0),
+                     min(self.string_length, schema.get('maxLength', self.string_length)))
+        return self._random_text(length)
+
+    def _generate_pattern(self, schema):
+        """Return a random string matching the pattern and length bounds of schema
+
+        Strings are generated from the parsed regular expression; those which
+        do not match it (e.g. because of anchors in the middle of the pattern
+        or lookarounds, which are not generated) or are not within minLength
+        and maxLength are drawn again a few times before giving up.
+        """
+        pattern = schema['pattern']
+        min_length = schema.get('minLength', 0)
+        max_length = schema.get('maxLength')
+        # repetitions may have to be long enough for minLength
+        extra_repeats = max(_PATTERN_MAX_EXTRA_REPEATS, min_length)
+        try:
+            parsed = sre_parse.parse(pattern)
+            for _ in range(_PATTERN_ATTEMPTS):
+                value = self._from_parsed(parsed, {}, extra_repeats)
+                if (re.search(pattern, value) and len(value) >= min_length
+                        and (max_length is None or len(value) <= max_length)):
+                    return value
+        except (re.error, _UnsupportedPattern):
+            pass
+        raise ValueError("Cannot generate strings matching the pattern {!r} within the length "
+                         "bounds of the schema; list some in its examples".format(pattern))
+
+    def _from_parsed(self, parsed, groups, extra_repeats):
+        """Return a random string matched by a parsed regular expression
+
+        groups maps the numbers of the groups generated so far to their text;
+        repetitions are repeated at most extra_repeats times beyond their
+        minimum.
+        """
+        chunks = []
+        for op, av in parsed:
+            if op == sre_parse.LITERAL:
+                chunks.append(chr(av))
+            elif op == sre_parse.NOT_LITERAL:
+                chunks.append(self.rng.choice(_PATTERN_ALPHABET.replace(chr(av), '')))
+            elif op == sre_parse.ANY:
+                chunks.append(self.rng.choice(_PATTERN_ALPHABET))
+            elif op == sre_parse.IN:
+                chunks.append(self._from_set(av))
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+                        getattr(sre_parse, 'POSSESSIVE_REPEAT', None)):
+                low, high, subpattern = av
+                high = min(high, low + extra_repeats)
+                for _ in range(self.rng.randint(low, high)):
+                    chunks.append(self._from_parsed(subpattern, groups, extra_repeats))
+            elif op == sre_parse.SUBPATTERN:
+                group, subpattern = av[0], av[-1]
+                text = self._from_parsed(subpattern, groups, extra_repeats)
+                if group is not None:
+                    groups[group] = text
+                chunks.append(text)
+            elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+                chunks.append(self._from_parsed(av, groups, extra_repeats))
+            elif op == sre_parse.BRANCH:
+                chunks.append(self._from_parsed(self.rng.choice(av[1]), groups, extra_repeats))
+            elif op == sre_parse.GROUPREF:
+                chunks.append(groups.get(av, ''))
+            elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                # anchors and lookarounds match no text; whether they hold
+                # is checked once the whole string is generated
+                continue
+            else:
+                raise _UnsupportedPattern(op)
+        return ''.join(chunks)
+
+    def _from_set(self, items):
+        """Return a random character of a parsed character set, such as [a-z_]"""
+        if items and items[0][0] == sre_parse.NEGATE:
+            candidates = [char for char in _PATTERN_ALPHABET if not _in_set(items[1:], char)]
+        else:
+            op, av = self.rng.choice(items)
+            if op == sre_parse.LITERAL:
+                return chr(av)
+            elif op == sre_parse.RANGE:
+                return chr(self.rng.randint(*av))
+            candidates = [char for char in _PATTERN_ALPHABET if _in_set([(op, av)], char)]
+        if not candidates:
+            raise _UnsupportedPattern(items)
+        return self.rng.choice(candidates)
+
+    def _generate_multiple(self, schema, kind, low, high, exclusive_low, exclusive_high):
+        """Return a random multiple of the multipleOf of schema (or integer) within the bounds
+
+        The multiples are computed exactly; floats which the validator does
+        not consider multiples (e.g. 80.80000000000001 of 0.1, because of
+        rounding) are drawn again.
+        """
+        multiple = schema.get('multipleOf')
+        step = _exact(multiple) if multiple is not None else fractions.Fraction(1)
+        if kind == 'integer':
+            # the least common multiple of step and 1
+            step = fractions.Fraction(step.numerator)
+        low, high = _exact(low), _exact(high)
+        first = math.ceil(low / step)
+        last = math.floor(high / step)
+        if exclusive_low and first * step == low:
+            first += 1
+        if exclusive_high and last * step == high:
+            last -= 1
+        if first > last:
+            raise ValueError("Cannot generate {} multiples of {} between {} and {}".format(
+                kind, multiple if multiple is not None else 1, low, high))
+        as_int = kind == 'integer' or not isinstance(multiple, float)
+        keywords = {key: schema[key] for key in ('multipleOf', 'minimum', 'maximum', 'exclusiveMinimum',
+                                                 'exclusiveMaximum') if key in schema}
+        validator = self._validator_class(keywords)
+        for _ in range(_ATTEMPTS):
+            value = self.rng.randint(first, last) * step
+            value = int(value) if as_int and value.denominator == 1 else float(value)
+            if validator.is_valid(value):
+                return value
+        raise ValueError("Cannot generate {} multiples of {} between {} and {} which the validator "
+                         "accepts".format(kind, multiple, low, high))
+
+    def _random_text(self, length):
+        return ''.join(self.rng.choice(string.ascii_lowercase) for _ in range(length))
+
+    def _random_datetime(self):
+        start = datetime.datetime(2000, 1, 1)
+        return start + datetime.timedelta(seconds=self.rng.randrange(30 * 365 * 86400))
+
+    def _generate_number(self, schema, kind):
+        low, high = schema.get('minimum'), schema.get('maximum')
+        exclusive_low = exclusive_high = False
+        # draft 4 uses boolean exclusive bounds, later drafts numbers
+        minimum, maximum = schema.get('exclusiveMinimum'), schema.get('exclusiveMaximum')
+        if isinstance(minimum, bool):
+            exclusive_low = minimum
+        elif minimum is not None and (low is None or minimum >= low):
+            low, exclusive_low = minimum, True
+        if isinstance(maximum, bool):
+            exclusive_high = maximum
+        elif maximum is not None and (high is None or maximum <= high):
+            high, exclusive_high = maximum, True
+        if low is None:
+            low = 0 if high is None else high - 1000
+        if high is None:
+            high = low + 1000
+        multiple = schema.get('multipleOf')
+        if kind == 'integer' or multiple is not None:
+            return self._generate_multiple(schema, kind, low, high, exclusive_low, exclusive_high)
+        value = self.rng.uniform(low, high)
+        if (exclusive_low and value <= low) or (exclusive_high and value >= high):
+            value = (low + high) / 2
+        return value
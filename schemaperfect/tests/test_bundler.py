@@ -0,0 +1,84 @@
+import json
+
+import jsonschema
+import pytest
+
+from ..bundler import SchemaBundler, bundle_schema
+
+
+@pytest.fixture
+def schema_dir(tmp_path):
+    files = {
+        'main.json': {
+            'type': 'object',
+            'properties': {
+                'person': {'$ref': 'people.json#/definitions/Person'},
+                'address': {'$ref': 'common/address.json'},
+                'count': {'$ref': 'https://example.com/schemas/numbers.json#/definitions/Count'},
+            },
+            'definitions': {'Person': {'type': 'null'}, 'Tag': {'type': 'string'}},
+        },
+        'people.json': {
+            'definitions': {
+                'Person': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string'},
+                        'home': {'$ref': 'common/address.json'},
+                        'friend': {'$ref': '#/definitions/Person'},
+                        'tag': {'$ref': 'main.json#/definitions/Tag'},
+                    },
+                },
+            },
+        },
+        'common/address.json': {
+            'type': 'object',
+            'properties': {'street': {'type': 'string'}},
+        },
+        'numbers.json': {
+            '$id': 'https://example.com/schemas/numbers.json',
+            'definitions': {'Count': {'type': 'integer'}},
+        },
+    }
+    for name, schema in files.items():
+        path = tmp_path / 'schemas' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(schema))
+    return tmp_path / 'schemas'
+
+
+def test_bundle_schema(schema_dir):
+    schema = bundle_schema(schema_dir / 'main.json')
+    definitions = schema['definitions']
+    assert list(definitions) == ['Person', 'Tag', 'people_Person', 'address', 'Count']
+    assert schema['properties'] == {'person': {'$ref': '#/definitions/people_Person'},
+                                    'address': {'$ref': '#/definitions/address'},
+                                    'count': {'$ref': '#/definitions/Count'}}
+    assert definitions['people_Person']['properties']['friend'] == {'$ref': '#/definitions/people_Person'}
+    assert definitions['people_Person']['properties']['tag'] == {'$ref': '#/definitions/Tag'}
+
+    instance = {'person': {'name': 'Alice', 'home': {'street': 'Main'}, 'tag': 'a'}, 'count': 2}
+    jsonschema.validate(instance, schema)
+    with pytest.raises(jsonschema.ValidationError):
+        jsonschema.validate(dict(instance, count='two'), schema)
+
+
+def test_bundle_schema_errors(schema_dir):
+    (schema_dir / 'remote.json').write_text(json.dumps({'$ref': 'https://example.com/other.json'}))
+    with pytest.raises(ValueError, match='not fetched'):
+        bundle_schema(schema_dir / 'remote.json')
+    (schema_dir / 'outside.json').write_text(json.dumps({'$ref': '../elsewhere.json'}))
+    with pytest.raises(ValueError, match='outside the schema directory'):
+        bundle_schema(schema_dir / 'outside.json')
+
+
+def test_bundle_cache(schema_dir, tmp_path):
+    bundler = SchemaBundler(schema_dir, cache_dir=tmp_path / 'cache')
+    schema = bundler.bundle(schema_dir / 'main.json')
+    assert len(list((tmp_path / 'cache' / 'bundles').iterdir())) == 1
+    # a new bundler reads the cached bundle, until one of the files changes
+    assert SchemaBundler(schema_dir, cache_dir=tmp_path / 'cache').bundle(schema_dir / 'main.json') == schema
+    (schema_dir / 'common' / 'address.json').write_text(json.dumps({'type': 'string'}))
+    schema = SchemaBundler(schema_dir, cache_dir=tmp_path / 'cache').bundle(schema_dir / 'main.json')
+    assert schema['definitions']['address'] == {'type': 'string'}
+    assert len(list((tmp_path / 'cache' / 'bundles').iterdir())) == 2
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from ..cli import format_timings, main
+
+
+@pytest.fixture
+def schema_files(tmp_path):
+    schemas = {
+        'person.json': {'properties': {'name': {'type': 'string'}, 'age': {'type': 'integer'}}},
+        'pet-store.json': {'definitions': {'Pet': {'properties': {'name': {'type': 'string'}}}},
+                           'properties': {'pets': {'type': 'array', 'items': {'$ref': '#/definitions/Pet'}}}},
+    }
+    paths = []
+    for name, schema in schemas.items():
+        path = tmp_path / name
+        path.write_text(json.dumps(schema))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_generate(schema_files, tmp_path, capsys, jobs):
+    out = tmp_path / 'out'
+    assert main(['generate'] + schema_files + ['-o', str(out), '--jobs', str(jobs)]) == 0
+    assert (out / 'person.py').exists()
+    assert 'class Pet(SchemaBase)' in (out / 'pet_store.py').read_text()
+
+    lines = capsys.readouterr().out.splitlines()
+    header = next(line for line in lines if line.startswith('schema '))
+    assert header.split() == ['schema', 'loading', 'validation', 'analysis', 'docstrings', 'pretty_printing',
+                              'writing', 'other', 'total']
+    assert any(line.startswith(schema_files[1]) for line in lines)
+    assert any(line.startswith('(all)') for line in lines)
+
+
+def test_generate_package(schema_files, tmp_path):
+    out = tmp_path / 'out'
+    assert main(['generate', schema_files[1], '-o', str(out), '--package', '--quiet']) == 0
+    assert (out / 'pet_store' / '__init__.py').exists()
+
+
+def test_generate_error(schema_files, tmp_path, capsys):
+    invalid = tmp_path / 'invalid.json'
+    invalid.write_text(json.dumps({'type': 'nonsense'}))
+    assert main(['generate', str(invalid), schema_files[0], '-o', str(tmp_path / 'out'), '-q']) == 1
+    assert 'invalid.json: ValidationError' in capsys.readouterr().err
+    assert (tmp_path / 'out' / 'person.py').exists()
+
+
+def test_generate_duplicate_names(tmp_path, capsys):
+    paths = []
+    for directory in ['a', 'b']:
+        (tmp_path / directory).mkdir()
+        path = tmp_path / directory / 'schema.json'
+        path.write_text(json.dumps({'type': 'string'}))
+        paths.append(str(path))
+    out = tmp_path / 'out'
+    assert main(['generate'] + paths + ['-o', str(out), '-q']) == 1
+    assert 'would all be written to the module schema' in capsys.readouterr().err
+    assert not out.exists()
+
+
+def test_generate_unexpected_error(schema_files, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise KeyError('bug')
+    monkeypatch.setattr('schemaperfect.cli.generate_file', fail)
+    with pytest.raises(KeyError, match='bug'):
+        main(['generate', schema_files[0], '-o', str(tmp_path / 'out'), '-q'])
+
+
+def test_format_timings():
+    table = format_timings([('a.json', {'validation': 0.5, 'analysis': 0.25}, 1.0)])
+    header, row = table.splitlines()
+    assert row.split() == ['a.json', '0.000', '0.500', '0.250', '0.000', '0.000', '0.000', '0.250', '1.000']
@@ -1,5 +1,8 @@
+import sys
+
+import jsonschema
 import pytest
-from schemaperfect import SchemaBase, SchemaModuleGenerator
+from schemaperfect import SchemaBase, SchemaModuleGenerator, SchemaValidationError
 
 
 @pytest.fixture
@@ -80,3 +83,181 @@ def test_dynamic_module(schema):
     assert family3.dependants == 1
     assert not family3.has_pet
     assert family3.to_dict() == dct
+
+
+def test_module_code_cache(schema, tmp_path):
+    expected = SchemaModuleGenerator(schema, root_name='Family').module_code()
+
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    assert gen.module_code() == expected
+    assert (gen.cache_hits, gen.cache_misses) == (0, 2)
+
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    assert gen.module_code() == expected
+    assert (gen.cache_hits, gen.cache_misses) == (2, 0)
+
+    # changing the root schema only regenerates the root class
+    schema['properties']['family_name']['description'] = 'The name'
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    assert gen.module_code() == SchemaModuleGenerator(schema, root_name='Family').module_code()
+    assert (gen.cache_hits, gen.cache_misses) == (1, 1)
+
+    # changing a referenced definition regenerates the classes referencing it
+    schema['definitions']['Name'] = {'type': 'string'}
+    schema['definitions']['Person']['properties']['name'] = {'$ref': '#/definitions/Name'}
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    gen.module_code()
+    assert (gen.cache_hits, gen.cache_misses) == (0, 3)
+    schema['definitions']['Name']['maxLength'] = 10
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    assert gen.module_code() == SchemaModuleGenerator(schema, root_name='Family').module_code()
+    assert (gen.cache_hits, gen.cache_misses) == (0, 3)
+
+    # settings are part of the key
+    gen = SchemaModuleGenerator(schema, root_name='Household', cache_dir=tmp_path)
+    gen.module_code()
+    assert gen.cache_hits == 0
+
+
+def test_module_code_parallel(schema, tmp_path):
+    for i in range(10):
+        schema['definitions']['Thing{}'.format(i)] = {'type': 'object',
+                                                      'properties': {'size': {'type': 'integer'}}}
+    expected = SchemaModuleGenerator(schema).module_code()
+    assert SchemaModuleGenerator(schema, jobs=2).module_code() == expected
+
+    gen = SchemaModuleGenerator(schema, jobs=2, cache_dir=tmp_path)
+    assert gen.module_code() == expected
+    assert gen.cache_misses == 12
+    assert SchemaModuleGenerator(schema, jobs=2, cache_dir=tmp_path).module_code() == expected
+
+
+def test_write_package(schema, tmp_path, monkeypatch):
+    for i in range(5):
+        schema['definitions']['Thing{}'.format(i)] = {'type': 'object',
+                                                      'properties': {'size': {'type': 'integer'}}}
+    gen = SchemaModuleGenerator(schema, root_name='Family')
+    gen.write_package(tmp_path / 'familypkg', classes_per_module=2)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    import familypkg
+    try:
+        assert 'familypkg._definitions2' not in sys.modules
+        assert 'Thing4' in dir(familypkg)
+        assert set(familypkg.__all__) == {'Family', 'Person'} | {'Thing{}'.format(i) for i in range(5)}
+        with pytest.raises(AttributeError):
+            familypkg.Missing
+
+        from familypkg import Family
+        assert 'familypkg._definitions0' not in sys.modules
+        family = Family.from_dict({'family_name': 'Smith', 'people': [{'name': 'Alice', 'age': 25}]})
+        assert family.people[0].__class__ is familypkg.Person
+        assert 'familypkg._definitions2' in sys.modules
+        assert issubclass(familypkg.Thing4, SchemaBase)
+    finally:
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'familypkg':
+                del sys.modules[name]
+
+
+@pytest.mark.parametrize('sidecar', ['json', 'marshal'])
+def test_write_module_sidecar(schema, tmp_path, monkeypatch, sidecar):
+    gen = SchemaModuleGenerator(schema, root_name='Family')
+    modulename = 'family_{}'.format(sidecar)
+    gen.write_module(tmp_path / (modulename + '.py'), sidecar=sidecar, sidecar_docs=True)
+    assert (tmp_path / '{}.schema.{}'.format(modulename, sidecar)).exists()
+    code = (tmp_path / (modulename + '.py')).read_text()
+    assert "'type': 'string'" not in code
+    assert 'Person schema wrapper' not in code
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    module = __import__(modulename)
+    try:
+        Family, Person = module.Family, module.Person
+        sidecar = module._sidecar
+        assert not sidecar._schema._loaded and not sidecar._docs._loaded
+        assert Person.__doc__.startswith('Person schema wrapper')
+        assert not sidecar._schema._loaded
+
+        family = Family.from_dict({'family_name': 'Smith', 'people': [{'name': 'Alice', 'age': 25}]})
+        assert isinstance(family.people[0], Person)
+        assert Family._schema == schema
+        assert Person._rootschema is Family._schema
+        with pytest.raises(SchemaValidationError, match="'old' is not of type 'integer'"):
+            Person(name='Bob', age='old')
+    finally:
+        del sys.modules[modulename]
+
+
+def test_write_package_sidecar(schema, tmp_path, monkeypatch):
+    gen = SchemaModuleGenerator(schema, root_name='Family')
+    gen.write_package(tmp_path / 'sidecarpkg', sidecar='json')
+    assert (tmp_path / 'sidecarpkg' / '_schema.schema.json').exists()
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    import sidecarpkg
+    try:
+        family = sidecarpkg.Family.from_dict({'family_name': 'Smith'})
+        assert family.to_dict() == {'family_name': 'Smith'}
+        assert sidecarpkg.Person.__doc__.startswith('Person schema wrapper')
+    finally:
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'sidecarpkg':
+                del sys.modules[name]
+
+
+def test_import_as_cache(schema, tmp_path, monkeypatch):
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    module = gen.import_as('cachedmod', add_to_sys_modules=False)
+    assert len(list((tmp_path / 'modules').iterdir())) == 1
+
+    def fail(self):
+        raise AssertionError("should not be called")
+    monkeypatch.setattr(SchemaModuleGenerator, '_validate', fail)
+    monkeypatch.setattr(SchemaModuleGenerator, 'module_code', fail)
+    gen = SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path)
+    cached = gen.import_as('cachedmod', add_to_sys_modules=False)
+    assert gen.cache_hits == 1
+    assert cached.Family._schema == module.Family._schema
+    assert cached.Person(name='Alice', age=25).to_dict() == {'name': 'Alice', 'age': 25}
+
+    # a different schema is not served from the cache
+    schema['required'] = []
+    with pytest.raises(AssertionError):
+        SchemaModuleGenerator(schema, root_name='Family', cache_dir=tmp_path).import_as('cachedmod')
+
+
+def test_schema_validated_lazily():
+    gen = SchemaModuleGenerator({'type': 'nonsense'})
+    with pytest.raises(jsonschema.ValidationError):
+        gen.module_code()
+
+
+def test_dedupe(schema, tmp_path, monkeypatch):
+    definitions = schema['definitions']
+    definitions['Adult'] = dict(definitions['Person'], description='A grown-up person')
+    definitions['People'] = {'type': 'array', 'items': {'$ref': '#/definitions/Person'}}
+    definitions['Adults'] = {'type': 'array', 'items': {'$ref': '#/definitions/Adult'}, 'title': 'Adults'}
+    definitions['Pet'] = {'properties': {'name': {'type': 'string'}}}
+    schema['properties']['adults'] = {'$ref': '#/definitions/Adults'}
+
+    gen = SchemaModuleGenerator(schema, root_name='Family', dedupe=True)
+    code = gen.module_code()
+    assert 'class Adult(' not in code and 'class Adults(' not in code
+    assert 'class Pet(' in code
+    mod = gen.import_as('dedupedmod')
+    assert mod.Adult is mod.Person
+    assert mod.Adults is mod.People
+    family = mod.Family.from_dict({'family_name': 'Smith', 'adults': [{'name': 'Alice', 'age': 25}]})
+    assert family.adults.__class__ is mod.People
+    assert family.to_dict() == {'family_name': 'Smith', 'adults': [{'name': 'Alice', 'age': 25}]}
+
+    gen.write_package(tmp_path / 'dedupedpkg', classes_per_module=2)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import dedupedpkg
+    try:
+        assert dedupedpkg.Adults is dedupedpkg.People
+    finally:
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'dedupedpkg':
+                del sys.modules[name]
@@ -55,3 +55,31 @@ def test_stringarray_decorator():
     assert argspec.args == ['self']
     assert argspec.varargs == 'args'
     assert argspec.varkw is None
+
+
+def test_lazy_decorator():
+    @schemaclass(lazy=True)
+    class LazySchema(SchemaBase):
+        _schema = MySchema._schema
+
+    class LazySubclass(LazySchema):
+        pass
+
+    assert not inspect.isfunction(LazySchema.__dict__['__init__'])
+    # instantiating a subclass generates the __init__ of the decorated class
+    obj = LazySubclass({'foo': 'bar'}, ['foo', 'bar'])
+    assert obj.to_dict() == {'a': {'foo': 'bar'}, 'b': ['foo', 'bar']}
+    assert inspect.isfunction(LazySchema.__dict__['__init__'])
+    assert inspect.getfullargspec(LazySchema.__init__).args == ['self', 'a', 'b', 'a2', 'b2', 'c', 'd']
+    assert LazySchema.__doc__.startswith('LazySchema schema wrapper')
+    assert obj.__doc__ is None
+    assert LazySchema({}, []).__doc__ == LazySchema.__doc__
+
+    @schemaclass(lazy=True)
+    class LazyArray(SchemaBase):
+        _schema = StringArray._schema
+        _rootschema = StringArray._rootschema
+
+    # introspection also generates the __init__
+    assert inspect.getfullargspec(LazyArray.__init__).varargs == 'args'
+    assert LazyArray.from_dict(['a']).to_dict() == ['a']
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from .. import instrumentation
+from ..schemaperfect import Sample
+from .test_schemaperfect import Derived, DefinitionUnion, Foo
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def _name(cls):
+    return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+
+def test_disabled_by_default():
+    instrumentation.reset()
+    Derived(a=4).to_dict()
+    assert instrumentation.snapshot() == {}
+
+
+def test_counters(enabled):
+    obj = Derived(a=4, c=Foo(d='val'))
+    obj.to_dict()
+    obj.copy()
+    DefinitionUnion.from_dict({'d': 'yo'})
+
+    stats = instrumentation.snapshot()
+    derived = stats[_name(Derived)]
+    assert derived['instantiate']['count'] == 2  # including the copy
+    assert derived['to_dict']['count'] == 2  # including validation at instantiation
+    assert derived['copy']['count'] == 1
+    assert derived['validate']['count'] == 2
+    assert derived['to_dict']['seconds'] > 0
+
+    assert stats[_name(DefinitionUnion)]['from_dict']['count'] == 1
+    assert stats[_name(Foo)]['union_attempt']['count'] == 1
+
+
+def test_sampled_validation(enabled):
+    sample = Sample(0.5, seed=0)
+    for i in range(20):
+        Derived(a=4).to_dict(validate=sample)
+    assert sample.calls == 20 and 0 < sample.validated < 20
+    # only the validations which actually ran are counted, each once
+    counts = instrumentation.snapshot()[_name(Derived)]
+    assert counts['validate']['count'] == 20 + sample.validated  # including at instantiation
+
+    instrumentation.reset()
+    obj = Derived(a=4)
+    for i in range(3):
+        obj.to_dict(validate=Sample(0.0))
+    assert instrumentation.snapshot()[_name(Derived)]['validate']['count'] == 1
+
+
+def test_hooks(enabled):
+    calls = []
+    hook = instrumentation.add_hook(pre=lambda event, cls: calls.append(('pre', event, cls)),
+                                    post=lambda event, cls, seconds: calls.append(('post', event, cls)))
+    try:
+        Derived.validate({'a': 4})
+    finally:
+        instrumentation.remove_hook(hook)
+    Derived.validate({'a': 4})
+    assert calls == [('pre', 'validate', Derived), ('post', 'validate', Derived)]
+
+
+def test_prometheus(enabled):
+    Derived.validate({'a': 4})
+    stream = io.StringIO()
+    text = instrumentation.to_prometheus(stream)
+    assert stream.getvalue() == text
+    assert '# TYPE schemaperfect_calls_total counter' in text
+    assert 'schemaperfect_calls_total{{class="{}",event="validate"}} 1'.format(_name(Derived)) in text
+    assert 'schemaperfect_seconds_total{{class="{}",event="validate"}}'.format(_name(Derived)) in text
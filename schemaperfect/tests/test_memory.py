@@ -0,0 +1,64 @@
+import gc
+
+import pytest
+
+from .. import memory
+from ..schemaperfect import Undefined, debug_mode
+from .test_schemaperfect import Derived, Foo
+
+
+def _name(cls):
+    return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+
+@pytest.fixture
+def tracking():
+    memory.enable_tracking()
+    yield
+    memory.disable_tracking()
+
+
+def test_snapshot_tree():
+    obj = Derived(a=4, b=Undefined, c=Foo(d='val'))
+    obj2 = Derived(a=5, c=obj.c)
+    snap = memory.snapshot(obj, obj2)
+
+    derived = snap[_name(Derived)]
+    assert derived['instances'] == 2
+    assert derived['undefined'] == 1
+    assert derived['kwds_bytes'] > 0
+    assert derived['errors'] == 0
+    # the shared child is counted once
+    assert snap[_name(Foo)]['instances'] == 1
+
+    big = memory.snapshot(Foo(d='x' * 1000))
+    assert big[_name(Foo)]['kwds_bytes'] > 1000
+
+
+def test_snapshot_retained_error():
+    with debug_mode(False):
+        obj = Derived(a='not an int', b='x' * 1000)
+    assert not obj.is_valid
+    snap = memory.snapshot(obj)
+    assert snap[_name(Derived)]['errors'] == 1
+    assert snap[_name(Derived)]['error_bytes'] > 1000
+
+
+def test_tracking_and_diff(tracking):
+    before = memory.snapshot()
+    objs = [Foo(d=str(i)) for i in range(5)]
+    after = memory.snapshot()
+    growth = after.diff(before)
+    assert growth[_name(Foo)]['instances'] == 5
+    assert growth.total()['instances'] == 5
+    report = growth.report(limit=1).splitlines()
+    assert report[1].endswith(_name(Foo))
+
+    del objs
+    gc.collect()
+    assert after.diff(memory.snapshot())[_name(Foo)]['instances'] == 5
+
+
+def test_not_tracking_by_default():
+    obj = Foo(d='untracked')
+    assert all(live is not obj for live in memory.live_objects())
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+import schemaperfect
+from .test_schemaperfect import Derived, DefinitionUnion, Foo
+
+
+def test_profile_paths():
+    with schemaperfect.profile() as prof:
+        Derived.validate({'a': 4, 'c': {'d': 'val'}})
+        DefinitionUnion.validate('A')
+    Derived.validate({'a': 4})
+
+    assert prof.stats['#/properties'][0] == 1
+    assert prof.stats['#/properties/a/type'][0] == 1
+    assert prof.stats['#/properties/c/$ref'][0] == 1
+    assert prof.stats['#/definitions/Foo/properties/d/type'][0] == 1
+    assert prof.stats['<DefinitionUnion>/anyOf'][0] == 1
+    assert prof.stats['<DefinitionUnion>/anyOf/0/$ref'][0] == 1
+    assert prof.stats['#/definitions/Bar/enum'][0] == 1
+    for count, seconds, self_seconds in prof.stats.values():
+        assert 0 <= self_seconds <= seconds
+
+
+def test_profile_inactive():
+    with schemaperfect.profile() as prof:
+        pass
+    Foo.validate({'d': 'val'})
+    assert not prof.stats
+    assert prof.collapsed() == ''
+
+
+def test_profile_report():
+    with schemaperfect.profile() as prof:
+        DefinitionUnion.validate('B')
+    report = prof.report(sort='count', limit=3).splitlines()
+    assert report[0].split() == ['count', 'seconds', 'self', 'path']
+    assert len(report) == 4
+    with pytest.raises(ValueError):
+        prof.report(sort='path')
+
+
+def test_profile_collapsed():
+    with schemaperfect.profile() as prof:
+        Foo.validate({'d': 'val'})
+    stream = io.StringIO()
+    text = prof.collapsed(stream)
+    assert stream.getvalue() == text
+    stacks = [line.rsplit(' ', 1)[0] for line in text.splitlines()]
+    assert ('<Foo>/$ref;#/definitions/Foo/properties;'
+            '#/definitions/Foo/properties/d/type') in stacks
@@ -1,8 +1,18 @@
+import asyncio
+import concurrent.futures
+import pickle
+import sys
+
 import jsonschema
 import pytest
 
 from ..schemaperfect import (UndefinedType, SchemaBase, Undefined, _FromDict,
-                        SchemaValidationError)
+                        SchemaValidationError, register_converter, unregister_converter,
+                        get_converter, debug_mode, set_json_backend, get_json_backend,
+                        JSONBackend, set_async_executor, Sample, validation_level,
+                        set_validation_level, enable_validation_cache,
+                        disable_validation_cache, get_validation_cache, ValidationCache,
+                        InputLimits, InputLimitError, input_limits, get_input_limits)
 
 # Make tests inherit from _TestSchema, so that when we test from_dict it won't
 # try to use SchemaBase objects defined elsewhere as wrappers.
@@ -259,6 +269,73 @@ def test_to_from_json():
     assert new_dct == dct
 
 
+@pytest.mark.parametrize('backend', ['json', 'orjson'])
+def test_json_backends(backend):
+    if backend == 'orjson':
+        pytest.importorskip('orjson')
+    dct = {'a': {'foo': 'bar'}, 'b': ['a', 'b', 'c'], 'b2': [1, 2, 3], 'c': 42}
+    original = get_json_backend()
+    set_json_backend(backend)
+    try:
+        assert get_json_backend().name == backend
+        obj = MySchema.from_dict(dct)
+        json_str = obj.to_json()
+        assert json_str == JSONBackend().dumps(dct, indent=2, sort_keys=True)
+        json_bytes = obj.to_json_bytes()
+        assert isinstance(json_bytes, bytes)
+        assert MySchema.from_json(json_bytes).to_dict() == dct
+        assert MySchema.from_json(json_str).to_dict() == dct
+        # arguments the backend doesn't support fall back to the stdlib
+        assert obj.to_json(indent=4, separators=(',', ':')) == JSONBackend().dumps(
+            dct, indent=4, sort_keys=True, separators=(',', ':'))
+    finally:
+        set_json_backend(original)
+
+
+@pytest.mark.parametrize('obj', [
+    {'x': float('nan'), 'y': float('inf'), 'z': None},
+    {'name': 'caf\u00e9 \u2603', 'ascii': 'cafe'},
+    {'delete': '\x7f', 'controls': '\x00\x1f\x08\n', 'c1': '\x80\x9f'},
+    {'large': 1e16, 'larger': 1.2345678901234568e+17, 'small': 2.5e-07, 'plain': 0.1},
+])
+@pytest.mark.parametrize('kwargs', [{'indent': 2, 'sort_keys': True}, {}, {'separators': (',', ':')},
+                                    {'indent': 2, 'ensure_ascii': False}])
+def test_orjson_backend_matches_stdlib(obj, kwargs):
+    pytest.importorskip('orjson')
+    from ..schemaperfect import OrjsonBackend
+    stdlib, backend = JSONBackend(), OrjsonBackend()
+    assert backend.dumps(obj, **kwargs) == stdlib.dumps(obj, **kwargs)
+    assert backend.dumps_bytes(obj, **kwargs) == stdlib.dumps_bytes(obj, **kwargs)
+    text = stdlib.dumps(obj, **kwargs)
+    assert repr(backend.loads(text)) == repr(stdlib.loads(text))
+
+
+@pytest.mark.parametrize('text', ['18446744073709551616', '[-9223372036854775809, 18446744073709551615]',
+                                  '{"id": 123456789012345678901234567890, "n": 1}',
+                                  '"12345678901234567890"', '[1e400]'])
+def test_orjson_backend_parses_like_stdlib(text):
+    pytest.importorskip('orjson')
+    from ..schemaperfect import OrjsonBackend
+    stdlib, backend = JSONBackend(), OrjsonBackend()
+    for data in [text, text.encode('ascii')]:
+        assert repr(backend.loads(data)) == repr(stdlib.loads(data))
+
+
+def test_default_json_backend():
+    original = get_json_backend()
+    set_json_backend(None)
+    try:
+        # orjson is only used when requested, even if it is installed
+        assert get_json_backend().name == 'json'
+    finally:
+        set_json_backend(original)
+
+
+def test_unknown_json_backend():
+    with pytest.raises(ValueError):
+        set_json_backend('yaml')
+
+
 def test_class_with_no_schema():
     class BadSchema(SchemaBase):
         pass
@@ -293,3 +370,511 @@ def test_schema_validation_error():
     assert 'test_schemaperfect.MySchema->a' in message
     assert "validating {!r}".format(the_err.validator) in message
     assert the_err.message in message
+    assert message.count('Invalid specification') == 1
+
+
+def test_check():
+    assert MySchema(a={'foo': 'bar'}).check() == []
+
+    with debug_mode(False):
+        invalid = MySchema(a={'foo': 4}, b=[1, 'two'], c=[])
+    errors = invalid.check()
+    assert sorted(err.path for err in errors) == [('a', 'foo'), ('b', 0), ('c',)]
+    assert len(invalid.check(first=True)) == 1
+
+    err = min(errors, key=lambda err: err.path)
+    assert err.validator == 'type'
+    assert err.schema_path == ('properties', 'a', 'additionalProperties', 'type')
+    assert isinstance(err.to_exception(), SchemaValidationError)
+    assert "4 is not of type 'string'" in err.message
+
+    assert not invalid.is_valid
+    assert isinstance(invalid.validation_error, SchemaValidationError)
+
+
+def test_builtin_converters():
+    import datetime
+    import decimal
+    import uuid
+    dct = {'a': {'when': datetime.date(2020, 1, 2),
+                 'id': uuid.UUID(int=1),
+                 'price': decimal.Decimal('1.5')}}
+    with debug_mode(False):
+        myschema = MySchema(**dct)
+    assert myschema.to_dict(validate=False) == {
+        'a': {'when': '2020-01-02',
+              'id': '00000000-0000-0000-0000-000000000001',
+              'price': 1.5}}
+
+
+def test_decimal_converter():
+    import decimal
+    convert = get_converter(decimal.Decimal)
+    for text, value in [('1.5', 1.5), ('0.1', 0.1), ('-2.50', -2.5), ('1E+16', 1e16)]:
+        assert convert(decimal.Decimal(text)) == value
+    for text in ['0.10000000000000000001', '12345678901234567891', 'NaN']:
+        with pytest.raises(ValueError, match='without losing precision'):
+            convert(decimal.Decimal(text))
+    with debug_mode(False):
+        myschema = MySchema(a={'price': decimal.Decimal('0.1000000000000000000001')})
+    with pytest.raises(ValueError, match='without losing precision'):
+        myschema.to_dict(validate=False)
+
+
+def test_register_converter():
+    class Point(object):
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+
+    class Point3D(Point):
+        pass
+
+    register_converter(Point, lambda p: [p.x, p.y])
+    try:
+        assert get_converter(Point3D) is get_converter(Point)
+        assert MySchema(b2=Point3D(1, 2)).to_dict() == {'b2': [1, 2]}
+    finally:
+        unregister_converter(Point)
+    assert get_converter(Point3D) is None
+
+
+class NumericArrays(_TestSchema):
+    _schema = {
+        'type': 'object',
+        'properties': {
+            'values': {'type': 'array', 'items': {'type': 'number', 'minimum': 0}},
+            'counts': {'type': 'array', 'maxItems': 3,
+                       'items': {'type': 'integer', 'multipleOf': 2}},
+            'label': {'type': 'string'}
+        }
+    }
+
+
+def test_numpy_arrays_to_dict():
+    np = pytest.importorskip('numpy')
+    obj = NumericArrays(values=np.linspace(0, 1, 5), counts=np.array([0, 2, 4]),
+                        label='x')
+    dct = obj.to_dict()
+    assert dct == {'values': [0.0, 0.25, 0.5, 0.75, 1.0], 'counts': [0, 2, 4],
+                   'label': 'x'}
+    assert type(dct['counts'][0]) is int
+
+    assert NumericArrays(values=[np.float64(1.5)]).to_dict() == {'values': [1.5]}
+    assert NumericArrays(counts=np.array([2.0, 4.0])).to_dict() == {'counts': [2.0, 4.0]}
+
+
+@pytest.mark.parametrize('kwds,path,validator', [
+    ({'values': [0.5, -1.0]}, ['values', 1], 'minimum'),
+    ({'counts': [2, 3]}, ['counts', 1], 'multipleOf'),
+    ({'counts': [2.0, 2.5]}, ['counts', 1], 'type'),
+    ({'counts': [2, 4, 6, 8]}, ['counts'], 'maxItems'),
+])
+def test_numpy_arrays_validation(kwds, path, validator):
+    np = pytest.importorskip('numpy')
+    with pytest.raises(SchemaValidationError) as err:
+        NumericArrays(**{k: np.array(v) for k, v in kwds.items()})
+    assert list(err.value.path) == path
+    assert err.value.validator == validator
+
+    # the list equivalent fails in the same way under jsonschema
+    with pytest.raises(SchemaValidationError) as err:
+        NumericArrays(**kwds)
+    assert list(err.value.path) == path
+    assert err.value.validator == validator
+
+
+def test_async_api():
+    dct = {'a': {'foo': 'bar'}, 'b': ['a', 'b', 'c'], 'c': 42}
+
+    with debug_mode(False):
+        invalid = MySchema(c=[1])
+
+    async def run():
+        obj = await MySchema.afrom_json(MySchema.from_dict(dct).to_json())
+        results = await asyncio.gather(obj.ato_dict(), obj.ato_json(indent=None),
+                                       MySchema.avalidate(dct))
+        with pytest.raises(SchemaValidationError):
+            await invalid.ato_dict()
+        return results
+
+    # asyncio.run needs Python 3.7
+    loop = asyncio.new_event_loop()
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        set_async_executor(executor, max_concurrency=1)
+        try:
+            as_dict, as_json, validated = loop.run_until_complete(run())
+        finally:
+            set_async_executor()
+            loop.close()
+    assert as_dict == dct
+    assert MySchema.from_json(as_json).to_dict() == dct
+    assert validated is None
+
+
+def test_pickle_validation_error():
+    with pytest.raises(SchemaValidationError) as err:
+        MySchema(a={'foo': 4})
+    err2 = pickle.loads(pickle.dumps(err.value))
+    assert str(err2) == str(err.value)
+    assert err2.obj == err.value.obj
+
+
+def test_deep_validation():
+    obj = Derived(a=4, c=Foo(d='val'))
+    assert obj.to_dict(validate='deep') == {'a': 4, 'c': {'d': 'val'}}
+
+    # the child's subtree is not validated again by the parent...
+    pruned = obj._prune_validated(Derived._schema, obj._kwds)
+    assert pruned['properties']['c'] == {}
+    assert pruned['properties']['a'] == {'type': 'integer'}
+    assert Derived._schema['properties']['c'] == {"$ref": "#/definitions/Foo"}
+
+    # ...but the parent's own keywords are
+    with debug_mode(False):
+        obj = Derived(a='4', c=Foo(d='val'))
+        extra = Derived(c=Foo(d='val'), foo='bar')
+    for invalid, validator in [(obj, 'type'), (extra, 'additionalProperties')]:
+        with pytest.raises(SchemaValidationError) as err:
+            invalid.to_dict(validate='deep')
+        assert err.value.validator == validator
+        assert err.value.obj is invalid
+
+    # errors are still reported by the innermost invalid object
+    with debug_mode(False):
+        child = Foo(d=4)
+        obj = Derived(c=child)
+    with pytest.raises(SchemaValidationError) as err:
+        obj.to_dict(validate='deep')
+    assert err.value.obj is child
+
+
+def test_deep_validation_union_siblings():
+    # the keywords next to an anyOf are not implied by the branch a child matched
+    class Holder(_TestSchema):
+        _schema = {'type': 'object',
+                   'properties': {'c': {'anyOf': [{'$ref': '#/definitions/Foo'}, {'type': 'null'}],
+                                        'required': ['d']}}}
+        _rootschema = Derived._schema
+
+    with debug_mode(False):
+        obj = Holder(c=Foo())
+    for validate in [True, 'deep']:
+        with pytest.raises(SchemaValidationError) as err:
+            obj.to_dict(validate=validate)
+        assert err.value.validator == 'required'
+    pruned = obj._prune_validated(Holder._schema, obj._kwds)
+    assert pruned['properties']['c'] == {'required': ['d']}
+    assert Holder(c=Foo(d='val')).to_dict(validate='deep') == {'c': {'d': 'val'}}
+
+
+def test_deep_validation_arrays():
+    class Items(_TestSchema):
+        _schema = {'type': 'array', 'items': {'$ref': '#/definitions/Foo'},
+                   'maxItems': 2}
+        _rootschema = Derived._schema
+
+    obj = Items([Foo(d='a'), Foo(d='b')])
+    assert obj.to_dict(validate='deep') == [{'d': 'a'}, {'d': 'b'}]
+    assert obj._prune_validated(Items._schema, obj._args[0])['items'] == {}
+    # a plain dict among the items must still be validated by the parent
+    assert obj._prune_validated(Items._schema, [Foo(d='a'), {'d': 4}]) is Items._schema
+
+    with debug_mode(False):
+        obj = Items([Foo(d='a'), Foo(d='b'), Foo(d='c')])
+    with pytest.raises(SchemaValidationError) as err:
+        obj.to_dict(validate='deep')
+    assert err.value.validator == 'maxItems'
+
+
+class Tree(_TestSchema):
+    _schema = {
+        'type': 'object',
+        'properties': {
+            'value': {'type': 'integer'},
+            'children': {'type': 'array', 'items': {'$ref': '#'}}
+        }
+    }
+
+
+def test_deeply_nested():
+    def values(tree):
+        # comparing nested dicts directly would itself hit the recursion limit
+        result = []
+        while tree is not None:
+            result.append(tree['value'])
+            tree = tree['children'][0] if 'children' in tree else None
+        return result
+
+    depth = 3 * sys.getrecursionlimit()
+    dct = {'value': 0}
+    for i in range(1, depth):
+        dct = {'value': i, 'children': [dct]}
+    expected = list(range(depth - 1, -1, -1))
+
+    # jsonschema itself recurses, so validation is turned off throughout
+    with debug_mode(False):
+        tree = Tree.from_dict(dct, validate=False)
+        nested = Tree(value=0)
+        for i in range(1, depth):
+            nested = Tree(value=i, children=[nested])
+
+    assert isinstance(tree, Tree)
+    assert values(tree.to_dict(validate=False)) == expected
+    assert values(tree.copy().to_dict(validate=False)) == expected
+    assert values(nested.to_dict(validate=False)) == expected
+    copy = nested.copy()
+    assert isinstance(copy['children'][0], Tree)
+    assert copy['children'][0] is not nested['children'][0]
+    assert values(copy.to_dict(validate=False)) == expected
+
+
+def test_to_dict_preserves_order():
+    dct = {'d': ['x', 'y', 'z'], 'c': 42, 'a': {'foo': 'bar', 'baz': 'qux'},
+           'b': ['a', 'b', 'c']}
+    obj = MySchema.from_dict(dct)
+    assert list(obj.to_dict()) == list(dct)
+    assert list(obj.to_dict()['a']) == ['foo', 'baz']
+    assert list(obj.copy().to_dict()) == list(dct)
+
+
+def test_shallow_validation():
+    assert Derived._shallow_schema()['properties'] == {
+        'a': {'type': 'integer'}, 'b': {'type': 'string'}, 'c': {'type': 'object'}}
+    assert MySchema._shallow_schema()['properties']['d'] == {'type': ['object', 'array']}
+
+    with debug_mode(False):
+        nested_error = Derived(a=4, c={'d': 5})
+        child_type_error = Derived(a=4, c='foo')
+        extra = Derived(foo='bar')
+    assert nested_error.to_dict(validate='shallow') == {'a': 4, 'c': {'d': 5}}
+    with pytest.raises(SchemaValidationError):
+        nested_error.to_dict()
+    for invalid in [child_type_error, extra]:
+        with pytest.raises(SchemaValidationError):
+            invalid.to_dict(validate='shallow')
+
+    with debug_mode(False):
+        obj = Derived.from_dict({'c': {'d': 5}}, validate='shallow')
+    assert obj.to_dict(validate=False) == {'c': {'d': 5}}
+    with pytest.raises(jsonschema.ValidationError):
+        Derived.from_dict({'c': 5}, validate='shallow')
+
+
+def test_sampled_validation():
+    with debug_mode(False):
+        invalid = Derived(a='4')
+
+    sample = Sample(0.5, seed=42)
+    for i in range(100):
+        assert invalid.to_dict(validate=sample) == {'a': '4'}
+    assert sample.calls == 100
+    assert 0 < sample.validated < 100
+    assert sample.failures == sample.validated
+    assert isinstance(sample.last_error, SchemaValidationError)
+
+    with pytest.raises(SchemaValidationError):
+        invalid.to_dict(validate=Sample(1, raise_errors=True))
+
+    with pytest.raises(ValueError):
+        Sample(1.5)
+
+
+def test_validation_level_settings():
+    sample = Sample(1)
+    with validation_level(sample):
+        Derived(a='4')
+        assert Derived.from_dict({'a': '4'}).to_dict(validate=False) == {'a': '4'}
+    assert sample.failures == 3
+    with pytest.raises(SchemaValidationError):
+        Derived(a='4')
+
+    class LenientDerived(Derived):
+        _validation_level = 'shallow'
+
+    assert LenientDerived(c={'d': 5}).to_dict() == {'c': {'d': 5}}
+    # explicitly requested levels take precedence over the class level
+    with pytest.raises(SchemaValidationError):
+        LenientDerived(c={'d': 5}).to_dict(validate='deep')
+
+    with pytest.raises(ValueError):
+        set_validation_level('everything')
+
+
+@pytest.fixture
+def validation_cache():
+    cache = enable_validation_cache(maxsize=8)
+    yield cache
+    disable_validation_cache()
+
+
+def test_validation_cache(validation_cache):
+    dct = {'a': 4, 'c': {'d': 'hey'}}
+    Derived.validate(dct)
+    assert validation_cache.info() == {'hits': 0, 'misses': 1, 'evictions': 0,
+                                       'size': 1, 'maxsize': 8}
+    Derived.validate({'c': {'d': 'hey'}, 'a': 4})
+    assert validation_cache.hits == 1
+
+    # failures are cached, but still raise
+    for i in range(2):
+        with pytest.raises(jsonschema.ValidationError):
+            Derived.validate({'a': 'four'})
+    assert (validation_cache.hits, validation_cache.misses) == (2, 2)
+    assert not Derived._is_valid_instance({'a': 'four'})
+    assert validation_cache.hits == 3
+
+    # union branches tried by from_dict
+    validation_cache.clear()
+    for i in range(3):
+        assert isinstance(DefinitionUnion.from_dict("A"), Bar)
+    assert validation_cache.hits > 0
+
+    # to_dict with the unmodified class schema
+    validation_cache.clear()
+    obj = Derived(a=4)
+    obj.to_dict()
+    assert validation_cache.hits == 1
+    assert obj.check() == []
+
+
+def test_validation_cache_eviction(validation_cache):
+    for i in range(10):
+        SimpleUnion.validate(i)
+    assert len(validation_cache) == 8
+    assert validation_cache.evictions == 2
+    SimpleUnion.validate(9)
+    assert validation_cache.hits == 1
+    SimpleUnion.validate(0)
+    assert validation_cache.hits == 1
+
+
+def test_validation_cache_fingerprint():
+    fingerprint = ValidationCache.fingerprint
+    assert fingerprint({'a': 1, 'b': [2]}) == fingerprint({'b': [2], 'a': 1})
+    distinct = [({'a': None}, {'a': float('nan')}), ([1], (1,)), ({1: 'a'}, {'1': 'a'}),
+                ({True: 'a'}, {1: 'a'}), (1, 1.0), (True, 1), ([[1]], [{'list': [1]}])]
+    for first, second in distinct:
+        assert fingerprint(first) != fingerprint(second)
+    cycle = []
+    cycle.append(cycle)
+    for instance in [{1, 2}, cycle, [Undefined]]:
+        assert fingerprint(instance) is None
+
+
+def test_validation_cache_json_backend(validation_cache):
+    # NaN is not None, whatever the backend encodes it as
+    pytest.importorskip('orjson')
+
+    class NullValue(_TestSchema):
+        _schema = {'type': 'object', 'properties': {'a': {'type': 'null'}}}
+
+    original = get_json_backend()
+    set_json_backend('orjson')
+    try:
+        NullValue.validate({'a': None})
+        with pytest.raises(jsonschema.ValidationError):
+            NullValue.validate({'a': float('nan')})
+    finally:
+        set_json_backend(original)
+
+
+def test_validation_cache_union_fingerprint(validation_cache, monkeypatch):
+    calls = []
+    fingerprint = ValidationCache.fingerprint
+
+    def counting_fingerprint(instance):
+        calls.append(instance)
+        return fingerprint(instance)
+
+    monkeypatch.setattr(ValidationCache, 'fingerprint', staticmethod(counting_fingerprint))
+    converter = _FromDict(DefinitionUnion._default_wrapper_classes())
+    obj = converter.from_dict(DefinitionUnion, DefinitionUnion, DefinitionUnion._schema, "A")
+    assert isinstance(obj, Bar)
+    # once for both branches of the union, and once when Bar("A") validates
+    assert converter.union_attempts == 2
+    assert calls == ["A", "A"]
+
+
+def test_validation_cache_disabled_by_default():
+    assert get_validation_cache() is None
+
+
+def test_input_limits():
+    limits = InputLimits(max_depth=2, max_nodes=6, max_string_length=5, max_array_length=3)
+    limits.check({'a': [1, 2, 3], 'b': 'short'})
+    cases = [({'a': [[1]]}, 'max_depth', ('a', 0)),
+             ([1, 2, 3, 4], 'max_array_length', ()),
+             ({'a': [1, 2], 'b': [3], 'c': 4}, 'max_nodes', ('b', 0)),
+             ({'a': ['toolong']}, 'max_string_length', ('a', 0)),
+             ({'toolong': 1}, 'max_string_length', ('toolong',))]
+    for instance, limit, path in cases:
+        with pytest.raises(InputLimitError) as err:
+            limits.check(instance)
+        assert err.value.limit == limit
+        assert err.value.path == path
+    assert isinstance(err.value, ValueError)
+    limits.check(4)
+    limits.check('short')
+    assert pickle.loads(pickle.dumps(err.value)).limit == 'max_string_length'
+
+    # huge containers fail before their items are walked
+    limits = InputLimits(max_nodes=10)
+    for instance, path in [(list(range(10 ** 6)), (9,)),
+                           (dict.fromkeys(map(str, range(10 ** 6))), ('9',))]:
+        with pytest.raises(InputLimitError) as err:
+            limits.check(instance)
+        assert err.value.path == path
+
+
+def test_from_dict_input_limits():
+    with pytest.raises(InputLimitError):
+        Derived.from_dict({'a': 4, 'c': {'d': 'x' * 100}}, limits=InputLimits(max_string_length=10))
+
+    # 'A' fails the Foo branch before matching the Bar branch
+    assert DefinitionUnion.from_dict('A', limits=InputLimits(max_union_attempts=2)) == Bar('A')
+    with pytest.raises(InputLimitError) as err:
+        DefinitionUnion.from_dict('A', limits=InputLimits(max_union_attempts=1))
+    assert err.value.limit == 'max_union_attempts'
+
+    with input_limits(max_depth=1):
+        assert get_input_limits().max_depth == 1
+        with pytest.raises(InputLimitError):
+            Derived.from_json('{"a": 4, "c": {"d": "val"}}')
+        Derived.from_json('{"a": 4}')
+    assert get_input_limits() is None
+    Derived.from_json('{"a": 4, "c": {"d": "val"}}')
+
+
+@pytest.mark.parametrize('backend', ['json', 'orjson'])
+def test_from_json_input_limits(backend):
+    if backend == 'orjson':
+        pytest.importorskip('orjson')
+    original = get_json_backend()
+    set_json_backend(backend)
+    try:
+        # the text is rejected before the parser recurses into it
+        deep = '[' * 200000 + ']' * 200000
+        for text in [deep, deep.encode('ascii')]:
+            with pytest.raises(InputLimitError) as err:
+                SimpleUnion.from_json(text, limits=InputLimits(max_depth=10))
+            assert err.value.limit == 'max_depth'
+        with pytest.raises(InputLimitError) as err:
+            Derived.from_json('{"a": 4}', limits=InputLimits(max_json_length=5))
+        assert err.value.limit == 'max_json_length'
+
+        # brackets within strings do not count
+        limits = InputLimits(max_depth=2)
+        obj = Derived.from_json(r'{"c": {"d": "[[[{{\\\"[["}}', limits=limits)
+        assert obj.c.d == '[[[{{\\"[['
+    finally:
+        set_json_backend(original)
+
+
+def test_json_nesting():
+    # text which may be within max_depth passes; the parsed value is checked later
+    limits = InputLimits(max_depth=2)
+    for text in ['[[1]]', '[[[1]]]', '{"a": [{"b": "[[[["}]}', '1', '', ']]]]', '[[1], [[]], {"a": [3]}]']:
+        limits.check_json(text)
+    for text in ['[[[[]]]]', '[[[[', '{"a": [{"b": {}}]}', '["\\\\", [[[1]]]]']:
+        with pytest.raises(InputLimitError):
+            limits.check_json(text)
@@ -0,0 +1,175 @@
+import io
+import json
+import re
+
+import jsonschema
+import pytest
+
+from ..synthetic import InstanceGenerator
+from .test_schemaperfect import Derived, DefinitionUnion, MySchema
+
+SCHEMA = {
+    'definitions': {
+        'Node': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'minLength': 3, 'maxLength': 5},
+                'size': {'type': 'integer', 'minimum': 10, 'exclusiveMaximum': 20},
+                'ratio': {'type': 'number', 'exclusiveMinimum': 0, 'maximum': 1},
+                'step': {'type': 'number', 'multipleOf': 0.5, 'minimum': 1, 'maximum': 3},
+                'kind': {'enum': ['a', 'b', 'c']},
+                'when': {'type': 'string', 'format': 'date-time'},
+                'id': {'type': 'string', 'format': 'uuid'},
+                'flag': {'type': ['boolean', 'null']},
+                'children': {'type': 'array', 'items': {'$ref': '#/definitions/Node'},
+                             'maxItems': 3},
+                'tags': {'type': 'array', 'items': {'enum': ['x', 'y', 'z']},
+                         'uniqueItems': True, 'minItems': 2},
+                'value': {'anyOf': [{'type': 'integer'}, {'$ref': '#/definitions/Node'}]},
+            },
+            'required': ['name', 'size'],
+            'additionalProperties': False,
+        },
+        'Base': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'minLength': 3, 'maxLength': 5},
+                'size': {'type': 'integer', 'minimum': 10, 'exclusiveMaximum': 20},
+                'kind': {'enum': ['a', 'b', 'c']},
+            },
+            'required': ['name', 'size'],
+        },
+        'Extended': {
+            'allOf': [{'$ref': '#/definitions/Base'},
+                      {'properties': {'extra': {'const': 1}}, 'required': ['extra']}]
+        },
+    },
+    'type': 'array',
+    'items': {'$ref': '#/definitions/Node'},
+    'minItems': 1,
+}
+
+
+def _node(name):
+    return {'$ref': '#/definitions/' + name}
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_generated_instances_are_valid(seed):
+    gen = InstanceGenerator(SCHEMA, seed=seed, max_depth=3)
+    jsonschema.validate(gen.generate(), SCHEMA)
+    gen = InstanceGenerator(_node('Extended'), SCHEMA, seed=seed, optional_probability=0)
+    instance = gen.generate()
+    assert sorted(instance) == ['extra', 'name', 'size']
+
+
+def test_schema_classes():
+    for cls in [Derived, DefinitionUnion, MySchema]:
+        for instance in InstanceGenerator(cls, seed=0).iter_instances(10):
+            cls.validate(instance)
+
+
+def test_seed_is_reproducible():
+    first = list(InstanceGenerator(SCHEMA, seed=1).iter_instances(5))
+    second = list(InstanceGenerator(SCHEMA, seed=1).iter_instances(5))
+    assert first == second
+    assert first != list(InstanceGenerator(SCHEMA, seed=2).iter_instances(5))
+
+
+def test_knobs():
+    gen = InstanceGenerator(SCHEMA, seed=0, min_items=4, max_items=4, optional_probability=1,
+                            max_depth=2, branch='first')
+    instance = gen.generate()
+    assert len(instance) == 4
+    assert all(isinstance(node['value'], int) for node in instance)
+    assert all(len(node['children']) == 3 for node in instance)  # capped by maxItems
+
+    def last(infos, rng):
+        return len(infos) - 1
+    node = InstanceGenerator(_node('Node'), SCHEMA, seed=0, optional_probability=1,
+                             max_depth=1, branch=last).generate()
+    assert isinstance(node['value'], dict)
+
+    with pytest.raises(ValueError):
+        InstanceGenerator(SCHEMA, branch='middle')
+
+
+def test_streaming():
+    stream = io.StringIO()
+    InstanceGenerator(SCHEMA, seed=3, max_items=50).write_json(stream)
+    instance = json.loads(stream.getvalue())
+    jsonschema.validate(instance, SCHEMA)
+    assert instance == InstanceGenerator(SCHEMA, seed=3, max_items=50).generate()
+
+    chunks = list(InstanceGenerator(_node('Node'), SCHEMA, seed=0).iter_json(count=3))
+    instances = json.loads(''.join(chunks))
+    assert len(chunks) == 5 and len(instances) == 3
+    for instance in instances:
+        jsonschema.validate(instance, dict(SCHEMA, **_node('Node')))
+
+
+PATTERNS = ['^[A-Z]+$', '^[a-z0-9._-]+@[a-z]+\\.(com|org)$', '\\d{3}-\\d{4}', '^(ab|cd)*\\1?x$',
+            '^[^a-z]{2,}\\s\\w+$', '^\\S\\D\\W.?$', 'v[0-9]+(\\.[0-9]+){0,2}', '(?i)^[a-f]+$']
+
+SCHEMAS = [
+    {'type': 'object',
+     'properties': {'a': {'type': 'integer'}},
+     'patternProperties': {'^x-': {'type': 'string'}},
+     'required': ['a', 'x-extra'],
+     'additionalProperties': False},
+    {'type': 'object',
+     'required': ['extra'],
+     'additionalProperties': {'type': 'array', 'items': {'type': 'boolean'}}},
+    {'type': 'array', 'items': {'type': 'string', 'pattern': '^[a-z]{2}_[0-9]+$',
+                                'maxLength': 6}},
+    {'type': 'number', 'multipleOf': 0.1, 'minimum': 0, 'maximum': 100},
+    {'type': 'number', 'multipleOf': 0.01},
+    {'type': 'number', 'multipleOf': 0.3, 'exclusiveMinimum': 0.3, 'exclusiveMaximum': 3},
+    {'type': 'integer', 'multipleOf': 0.5, 'minimum': 0.5},
+    {'type': 'integer', 'multipleOf': 1.5, 'maximum': -1},
+    {'type': 'integer', 'minimum': 0, 'maximum': 3, 'not': {'enum': [0]}},
+    {'type': 'object', 'properties': {'a': {'type': 'integer'}, 'b': {'type': 'string'}},
+     'minProperties': 3, 'maxProperties': 4},
+    {'type': 'object', 'properties': {'a': {'type': 'integer'}, 'b': {'type': 'string'},
+                                      'c': {'type': 'null'}},
+     'required': ['a'], 'maxProperties': 1}]
+
+
+@pytest.mark.parametrize('schema', [{'type': 'string', 'pattern': pattern} for pattern in PATTERNS]
+                         + SCHEMAS)
+def test_every_instance_is_valid(schema):
+    for instance in InstanceGenerator(schema, seed=0, optional_probability=1).iter_instances(200):
+        jsonschema.validate(instance, schema)
+    for instance in InstanceGenerator(schema, seed=0, optional_probability=0).iter_instances(20):
+        jsonschema.validate(instance, schema)
+
+
+@pytest.mark.parametrize('schema, message', [
+    ({'type': 'integer', 'multipleOf': 2, 'minimum': 3, 'maximum': 3}, 'Cannot generate integer multiples'),
+    ({'type': 'object', 'properties': {'a': {}}, 'minProperties': 2, 'additionalProperties': False},
+     "minProperties requires the additional property 'property0'"),
+    ({'type': 'object', 'required': ['a', 'b'], 'maxProperties': 1}, 'at most 1 properties'),
+    ({'type': 'integer', 'minimum': 0, 'maximum': 1, 'not': {'type': 'integer'}},
+     'Cannot generate instances valid against the schema'),
+])
+def test_unsatisfiable(schema, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        InstanceGenerator(schema, seed=0).generate()
+
+
+def test_pattern():
+    schema = {'type': 'string', 'pattern': '^[A-Z]+$'}
+    assert InstanceGenerator(dict(schema, examples=['ABC'])).generate() == 'ABC'
+    value = InstanceGenerator(dict(schema, minLength=6, maxLength=6)).generate()
+    assert len(value) == 6 and value.isupper()
+    for pattern in ['^a(?=b)c$', '^[A-Z]{5}$', '^(unclosed']:
+        with pytest.raises(ValueError, match='Cannot generate strings matching the pattern'):
+            InstanceGenerator({'type': 'string', 'pattern': pattern, 'maxLength': 3}).generate()
+
+
+def test_unsatisfiable_required():
+    schema = {'type': 'object', 'properties': {'a': {'type': 'integer'}},
+              'required': ['a', 'b'], 'additionalProperties': False}
+    for gen in [InstanceGenerator(schema).generate, lambda: list(InstanceGenerator(schema).iter_json())]:
+        with pytest.raises(ValueError, match="'b' is not allowed by additionalProperties"):
+            gen()
@@ -3,7 +3,7 @@ from textwrap import dedent
 
 import pytest
 
-from ..utils import CustomPrettyPrinter, get_valid_identifier, load_metaschema
+from ..utils import CustomPrettyPrinter, SchemaGraph, SchemaInfo, get_valid_identifier, load_metaschema
 from ..schemaperfect import _FromDict, set_metaschema_version
 
 
@@ -60,3 +60,24 @@ def test_custom_pretty_printer(refschema):
     }
     """).strip('\n')
 
+
+
+def test_schema_info_graph(refschema):
+    schema = {
+        'type': 'object',
+        'properties': {'a': {'$ref': '#/definitions/Foo'},
+                       'b': {'anyOf': [{'$ref': '#/definitions/Baz'}, {'type': 'null'}]}},
+        'definitions': refschema['definitions'],
+    }
+    info = SchemaInfo(schema)
+    # nodes are interned, and their references resolved through the root
+    assert info.properties['a'] is info.properties['a']
+    assert info.properties['a'].schema == {'type': 'string'}
+    assert info.properties['b'].anyOf[0] is info.child(schema['properties']['b']['anyOf'][0])
+    assert info.properties['b'].short_description == 'anyOf(:class:`Baz`, None)'
+    # properties are not copied to carry the definitions of the root
+    assert info.properties['a'].raw_schema is schema['properties']['a']
+
+    graph = SchemaGraph(schema)
+    assert graph.info(schema['properties']['a']) is graph.info(schema['properties']['a'])
+    assert graph.resolve({'$ref': '#/definitions/Foo'}) is schema['definitions']['Baz']
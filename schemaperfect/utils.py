@@ -1,5 +1,6 @@
 """Utilities for working with schemas"""
 
+import functools
 import json
 import keyword
 import pkgutil
@@ -22,6 +23,22 @@ def load_metaschema():
     return json.loads(schema)
 
 
+# validators of the metaschemas, by metaschema version
+_metaschema_validators = {}
+
+
+def get_metaschema_validator():
+    """Return a validator of the current metaschema, shared by all callers"""
+    from schemaperfect.schemaperfect import get_metaschema_version
+    version = get_metaschema_version()
+    validator = _metaschema_validators.get(version)
+    if validator is None:
+        metaschema = load_metaschema()
+        validator = jsonschema.validators.validator_for(metaschema)(metaschema)
+        _metaschema_validators[version] = validator
+    return validator
+
+
 def resolve_references(schema, root=None):
     """Resolve References within a JSON schema"""
     resolver = jsonschema.RefResolver.from_schema(root or schema)
@@ -89,13 +106,67 @@ def is_valid_identifier(var, allow_unicode=False):
     return is_valid and not keyword.iskeyword(var)
 
 
+class SchemaGraph(object):
+    """Index of the SchemaInfo nodes of a root schema
+
+    Nodes are interned by the identity of their schema, and references are
+    resolved once per schema with a single resolver, so that walking a
+    schema through SchemaInfo objects costs time linear in its size. The
+    schemas must not be modified while the graph is in use.
+    """
+
+    def __init__(self, rootschema):
+        self.rootschema = rootschema
+        self._resolver = jsonschema.RefResolver.from_schema(rootschema)
+        # both map id(schema) to (schema, value), keeping schema alive so that
+        # its id is not reused
+        self._nodes = {}
+        self._resolved = {}
+
+    def info(self, schema, cls=None):
+        """Return the SchemaInfo of schema, creating it on first use"""
+        entry = self._nodes.get(id(schema))
+        if entry is None:
+            info = (cls or SchemaInfo)(schema, self.rootschema, graph=self)
+            entry = self._nodes[id(schema)] = (schema, info)
+        return entry[1]
+
+    def resolve(self, schema):
+        """Return schema with its references resolved"""
+        entry = self._resolved.get(id(schema))
+        if entry is None:
+            resolved = schema
+            while '$ref' in resolved:
+                with self._resolver.resolving(resolved['$ref']) as target:
+                    resolved = target
+            entry = self._resolved[id(schema)] = (schema, resolved)
+        return entry[1]
+
+
+def _memoized(func):
+    """Decorator caching the value of a SchemaInfo property on the node"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self):
+        try:
+            return self._memo[name]
+        except KeyError:
+            value = self._memo[name] = func(self)
+            return value
+    return property(wrapper)
+
+
 class SchemaProperties(object):
     """A wrapper for properties within a schema"""
 
-    def __init__(self, properties, schema, rootschema=None):
+    def __init__(self, properties, schema, rootschema=None, graph=None):
         self._properties = properties
         self._schema = schema
         self._rootschema = rootschema or schema
+        if graph is None or graph.rootschema is not self._rootschema:
+            graph = SchemaGraph(self._rootschema)
+        self._graph = graph
 
     def __bool__(self):
         return bool(self._properties)
@@ -110,10 +181,7 @@ class SchemaProperties(object):
             return super().__getattr__(attr)
 
     def __getitem__(self, attr):
-        dct = self._properties[attr]
-        if 'definitions' in self._schema and 'definitions' not in dct:
-            dct = dict(definitions=self._schema['definitions'], **dct)
-        return SchemaInfo(dct, self._rootschema)
+        return self._graph.info(self._properties[attr])
 
     def __iter__(self):
         return iter(self._properties)
@@ -129,26 +197,32 @@ class SchemaProperties(object):
 
 
 class SchemaInfo(object):
-    """A wrapper for inspecting a JSON schema"""
+    """A wrapper for inspecting a JSON schema
+
+    SchemaInfo objects reached from one another (through ``child``,
+    ``properties``, ``anyOf``, etc.) share a SchemaGraph, which interns them
+    and caches resolved references and derived descriptions.
+    """
 
-    def __init__(self, schema, rootschema=None, validate=False):
+    def __init__(self, schema, rootschema=None, validate=False, graph=None):
         if hasattr(schema, '_schema'):
-            if hasattr(schema, '_rootschema'):
-                schema, rootschema = schema._schema, schema._rootschema
-            else:
-                schema, rootschema = schema._schema, schema._schema
+            schema, rootschema = schema._schema, getattr(schema, '_rootschema', None) or schema._schema
         elif not rootschema:
             rootschema = schema
         if validate:
             metaschema = load_metaschema()
             jsonschema.validate(schema, metaschema)
             jsonschema.validate(rootschema, metaschema)
+        if graph is None or graph.rootschema is not rootschema:
+            graph = SchemaGraph(rootschema)
         self.raw_schema = schema
         self.rootschema = rootschema
-        self.schema = resolve_references(schema, rootschema)
+        self.schema = graph.resolve(schema)
+        self._graph = graph
+        self._memo = {}
 
     def child(self, schema):
-        return self.__class__(schema, rootschema=self.rootschema)
+        return self._graph.info(schema, self.__class__)
 
     def __repr__(self):
         keys = []
@@ -171,7 +245,7 @@ class SchemaInfo(object):
         else:
             return ''
 
-    @property
+    @_memoized
     def short_description(self):
         if self.title:
             # use RST syntax for generated sphinx docs
@@ -179,7 +253,7 @@ class SchemaInfo(object):
         else:
             return self.medium_description
 
-    @property
+    @_memoized
     def medium_description(self):
         _simple_types = {'string': 'string',
                          'number': 'float',
@@ -204,11 +278,8 @@ class SchemaInfo(object):
         elif self.is_not():
             return 'not {}'.format(self.not_.short_description)
         elif isinstance(self.type, typing.Sequence) and not isinstance(self.type, str):
-            options = []
-            subschema = SchemaInfo(dict(**self.schema))
-            for typ_ in self.type:
-                subschema.schema['type'] = typ_
-                options.append(subschema.short_description)
+            options = [SchemaInfo(dict(self.schema, type=typ_), self.rootschema).short_description
+                       for typ_ in self.type]
             return "anyOf({})".format(', '.join(options))
         elif self.is_object():
             return "Mapping(required=[{}])".format(', '.join(self.required))
@@ -227,15 +298,15 @@ class SchemaInfo(object):
         # TODO
         return 'Long description including arguments and their types'
 
-    @property
+    @_memoized
     def properties(self):
         return SchemaProperties(self.schema.get('properties', {}),
-                                self.schema, self.rootschema)
+                                self.schema, self.rootschema, self._graph)
 
-    @property
+    @_memoized
     def definitions(self):
         return SchemaProperties(self.schema.get('definitions', {}),
-                                self.schema, self.rootschema)
+                                self.schema, self.rootschema, self._graph)
 
     @property
     def required(self):
@@ -253,15 +324,15 @@ class SchemaInfo(object):
     def type(self):
         return self.schema.get('type', None)
 
-    @property
+    @_memoized
     def anyOf(self):
         return [self.child(s) for s in self.schema.get('anyOf', [])]
 
-    @property
+    @_memoized
     def oneOf(self):
         return [self.child(s) for s in self.schema.get('oneOf', [])]
 
-    @property
+    @_memoized
     def allOf(self):
         return [self.child(s) for s in self.schema.get('allOf', [])]
 
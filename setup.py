@@ -142,13 +142,16 @@ def setup_package():
         install_requires=["jsonschema"],
         python_requires='>3.6',
         tests_require=["pytest"],
+        entry_points={
+            'console_scripts': ['schemaperfect = schemaperfect.cli:main'],
+        },
         cmdclass={
             'test': PyTest,
         },
     )
 
     metadata['version'] = get_version_info()[0]
-    metadata['packages'] = find_packages()
+    metadata['packages'] = find_packages(exclude=['benchmarks', 'benchmarks.*'])
 
     setup(**metadata)
 